@@ -1,14 +1,18 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 import auth
 import database as db
 import floor_price as fp
 import document_export as doc_export
+import bulk_verification
+import reference_format
+import price_check_writer
 from config import Config
 import config_manager as cm
 import json
 import base64
+import shlex
 
 # Page config
 st.set_page_config(
@@ -250,8 +254,8 @@ def perform_price_check_v2(customer_type, speed, distance, equipment_list,
         margin_new = fp.calculate_comprehensive_margin(proposed_price, floor_new, discount_percent)
         margin_weighted = fp.calculate_comprehensive_margin(proposed_price, floor_weighted, discount_percent)
         
-        # 4. บันทึกลง database
-        log = db.log_price_check_comprehensive(
+        # 4. บันทึกลง database (write-behind ถ้าเปิด PRICE_CHECK_WRITE_BEHIND)
+        log = price_check_writer.log_price_check(
             user_email=st.session_state.user_email,
             customer_type=customer_type,
             speed=speed,
@@ -280,6 +284,9 @@ def perform_price_check_v2(customer_type, speed, distance, equipment_list,
             floor_price=floor_weighted,
             notes=notes
         )
+        # เอกสารและ QR ด้านล่างมีลิงก์ตรวจสอบที่เปิดได้ทันที จึงรอให้แถวถูกบันทึกก่อนแสดง
+        if not price_check_writer.flush(timeout=10):
+            st.warning("⚠️ ยังบันทึกผลการตรวจสอบไม่สำเร็จ Reference ID นี้อาจยังตรวจสอบไม่ได้ชั่วคราว")
         
         # 5. แสดงผลลัพธ์
         st.write("---")
@@ -362,11 +369,11 @@ def perform_price_check_v2(customer_type, speed, distance, equipment_list,
         # Export Document Button
         st.write("---")
         
-        col_export1, col_export2, col_export3 = st.columns([1, 1, 1])
+        col_export1, col_export_pdf, col_export2, col_export3 = st.columns([1, 1, 1, 1])
         
         with col_export1:
             # HTML Export
-            html_content = doc_export.generate_verification_document_html(log)
+            html_content = doc_export.render_document(log, 'html')
             st.download_button(
                 label="📄 ดาวน์โหลดเอกสาร HTML",
                 data=html_content,
@@ -375,6 +382,16 @@ def perform_price_check_v2(customer_type, speed, distance, equipment_list,
                 width='stretch'
             )
         
+        with col_export_pdf:
+            # PDF Export (สร้างเมื่อกดดาวน์โหลด)
+            st.download_button(
+                label="📑 ดาวน์โหลดเอกสาร PDF",
+                data=lambda: doc_export.render_document(log, 'pdf'),
+                file_name=f"floor_price_{log.reference_id[:8]}.pdf",
+                mime="application/pdf",
+                width='stretch'
+            )
+        
         with col_export2:
             # Text Summary
             text_summary = doc_export.generate_simple_summary_text(log)
@@ -389,6 +406,7 @@ def perform_price_check_v2(customer_type, speed, distance, equipment_list,
         with col_export3:
             # Mark as exported
             if st.button("✅ บันทึกว่าได้ Export แล้ว", width="stretch", key=f"btn_mark_export_{log.reference_id}"):
+                price_check_writer.flush()
                 db.mark_as_exported(log.reference_id, st.session_state.user_email)
                 st.success("บันทึกสำเร็จ!")
         
@@ -414,29 +432,50 @@ def user_history_interface():
     """แสดงประวัติการตรวจสอบของ user (Version 2.0 - รองรับ weighted floor)"""
     st.header("📊 ประวัติการตรวจสอบของคุณ")
     
-    logs = db.get_user_logs(st.session_state.user_email)
+    summary = db.get_price_check_summary(user_email=st.session_state.user_email)
     
-    if not logs:
+    if not summary['total']:
         st.info("ยังไม่มีประวัติการตรวจสอบ")
         return
     
-    # Summary metrics
-    total_checks = len(logs)
-    valid_checks = sum(1 for log in logs if log.is_valid_weighted)
-    invalid_checks = total_checks - valid_checks
-    
+    # Summary metrics (คำนวณฝั่ง database จากประวัติทั้งหมด)
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("ตรวจสอบทั้งหมด", total_checks)
-    col2.metric("ผ่าน ✅", valid_checks)
-    col3.metric("ไม่ผ่าน ❌", invalid_checks)
-    col4.metric("Pass Rate", f"{(valid_checks/total_checks*100):.1f}%")
+    col1.metric("ตรวจสอบทั้งหมด", summary['total'])
+    col2.metric("ผ่าน ✅", summary['valid'])
+    col3.metric("ไม่ผ่าน ❌", summary['invalid'])
+    col4.metric("Pass Rate", f"{summary['pass_rate']:.1f}%")
     
     st.write("---")
     
-    # Table
+    # Table (แบ่งหน้าแบบ keyset หรือผลค้นหาเรียงตามความเกี่ยวข้อง)
+    search_text = st.text_input(
+        "🔍 ค้นหา (หมายเหตุ / อุปกรณ์)",
+        placeholder="เช่น F612, ชื่อโครงการ",
+        key="user_history_search"
+    )
+    filters = history_filters_ui("user_history")
+    if search_text.strip():
+        page_logs = db.search_price_checks(
+            search_text, limit=50, user_email=st.session_state.user_email,
+            columns=db.HISTORY_COLUMNS, **filters
+        )
+    else:
+        page_logs = keyset_pager_ui(
+            "user_history",
+            lambda cursor: db.get_price_checks_page(
+                limit=50, cursor=cursor, user_email=st.session_state.user_email,
+                columns=db.HISTORY_COLUMNS, **filters
+            ),
+            filters
+        )
+    
+    if not page_logs:
+        st.info("ไม่พบรายการตามเงื่อนไขที่เลือก")
+        return
+    
     df = pd.DataFrame([{
         'วันที่': log.checked_at.strftime('%Y-%m-%d %H:%M'),
-        'Ref ID': log.reference_id[:8] + '...',
+        'Ref ID': reference_format.display(log.reference_id),
         'ประเภท': '🏠' if log.customer_type == 'residential' else '🏢',
         'ความเร็ว': f"{log.speed} Mbps",
         'ราคาเสนอ': f"{log.proposed_price:,.0f} ฿",
@@ -445,20 +484,102 @@ def user_history_interface():
         'Margin': f"{log.margin_weighted_percent:.1f}%",
         'ผล': '✅ ผ่าน' if log.is_valid_weighted else '❌ ไม่ผ่าน',
         'Export': '📄' if log.exported_at else '-'
-    } for log in logs])
+    } for log in page_logs])
     
     st.dataframe(df, width='stretch', hide_index=True)
     
     # Export
     csv = df.to_csv(index=False).encode('utf-8-sig')
     st.download_button(
-        label="📥 ดาวน์โหลดประวัติ CSV",
+        label="📥 ดาวน์โหลดประวัติ CSV (หน้านี้)",
         data=csv,
         file_name=f"my_history_{datetime.now().strftime('%Y%m%d')}.csv",
         mime="text/csv"
     )
 
 
+def history_filters_ui(key_prefix, include_user=False):
+    """ฟอร์ม filter ของตารางประวัติ (คืนค่าเป็น kwargs สำหรับ db.get_price_checks_page)"""
+    cols = st.columns(4 if include_user else 3)
+    
+    customer_type = cols[0].selectbox(
+        "ประเภทลูกค้า",
+        options=[None, 'residential', 'business'],
+        format_func=lambda x: "ทั้งหมด" if x is None else Config.CUSTOMER_TYPES.get(x, x),
+        key=f"{key_prefix}_filter_customer_type"
+    )
+    
+    is_valid = cols[1].selectbox(
+        "ผลการตรวจสอบ",
+        options=[None, True, False],
+        format_func=lambda x: "ทั้งหมด" if x is None else ('✅ ผ่าน' if x else '❌ ไม่ผ่าน'),
+        key=f"{key_prefix}_filter_is_valid"
+    )
+    
+    date_range = cols[2].date_input(
+        "ช่วงวันที่",
+        value=(),
+        key=f"{key_prefix}_filter_dates"
+    )
+    
+    filters = {
+        'customer_type': customer_type,
+        'is_valid': is_valid,
+        'date_from': None,
+        'date_to': None
+    }
+    
+    if len(date_range) >= 1:
+        filters['date_from'] = datetime.combine(date_range[0], datetime.min.time())
+    if len(date_range) == 2:
+        filters['date_to'] = datetime.combine(date_range[1], datetime.min.time()) + timedelta(days=1)
+    
+    if include_user:
+        user_email = cols[3].text_input("User (email)", key=f"{key_prefix}_filter_user")
+        filters['user_email'] = user_email.strip() or None
+    
+    filters['equipment'] = st.selectbox(
+        "อุปกรณ์",
+        options=[None] + db.get_equipment_skus(),
+        format_func=lambda x: "ทั้งหมด" if x is None else x,
+        key=f"{key_prefix}_filter_equipment"
+    )
+    
+    return filters
+
+
+def keyset_pager_ui(key_prefix, fetch_page, filters):
+    """
+    แสดงปุ่มเลื่อนหน้าสำหรับ API แบบ keyset
+    
+    fetch_page(cursor) ต้องคืน (logs, next_cursor); cursor ของแต่ละหน้าเก็บเป็น stack ใน session
+    """
+    stack_key = f"{key_prefix}_cursors"
+    filters_key = f"{key_prefix}_filters"
+    
+    # เปลี่ยน filter แล้วต้องเริ่มที่หน้าแรกใหม่
+    if st.session_state.get(filters_key) != filters or stack_key not in st.session_state:
+        st.session_state[filters_key] = filters
+        st.session_state[stack_key] = [None]
+    
+    cursors = st.session_state[stack_key]
+    logs, next_cursor = fetch_page(cursors[-1])
+    
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("⬅️ ก่อนหน้า", disabled=len(cursors) == 1, key=f"{key_prefix}_prev"):
+            cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"หน้า {len(cursors)}")
+    with col_next:
+        if st.button("ถัดไป ➡️", disabled=next_cursor is None, key=f"{key_prefix}_next"):
+            cursors.append(next_cursor)
+            st.rerun()
+    
+    return logs
+
+
 def document_verification_interface():
     """หน้าสำหรับตรวจสอบเอกสารด้วย Reference ID"""
     st.header("🔍 ตรวจสอบเอกสาร")
@@ -470,16 +591,27 @@ def document_verification_interface():
         reference_id = st.text_input(
             "Reference ID",
             placeholder="xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx",
-            help="กรอก Reference ID ที่ได้จากเอกสาร"
+            help="กรอก Reference ID ที่ได้จากเอกสาร หรืออย่างน้อย 8 ตัวอักษรแรก (ตามที่แสดงในประวัติ)"
         )
         
         if st.button("🔍 ตรวจสอบ", type="primary", key="btn_verify_document"):
             if not reference_id:
                 st.error("❌ กรุณากรอก Reference ID")
             else:
-                log = db.get_price_check_by_reference(reference_id)
-                
+                price_check_writer.flush()
+                log = db.get_price_check_by_reference(reference_id.strip())
+                matches = []
                 if not log:
+                    # ค้นด้วย prefix เช่น 8 ตัวแรกที่ตารางประวัติแสดง
+                    matches = db.find_reference_ids_by_prefix(reference_id)
+                    if len(matches) == 1:
+                        log = db.get_price_check_by_reference(matches[0])
+                
+                if not log and len(matches) > 1:
+                    st.warning("⚠️ Reference ID นี้ตรงกับหลายเอกสาร กรุณากรอกให้ยาวขึ้น")
+                    for match in matches:
+                        st.write(f"• `{match}`")
+                elif not log:
                     st.error("❌ ไม่พบเอกสารนี้ในระบบ")
                 else:
                     st.success("✅ พบเอกสารในระบบ - ข้อมูลถูกต้อง")
@@ -551,10 +683,10 @@ def document_verification_interface():
                     
                     # Re-export
                     st.write("---")
-                    col_reexport1, col_reexport2 = st.columns(2)
+                    col_reexport1, col_reexport_pdf, col_reexport2 = st.columns(3)
                     
                     with col_reexport1:
-                        html_content = doc_export.generate_verification_document_html(log)
+                        html_content = doc_export.render_document(log, 'html')
                         st.download_button(
                             label="📄 ดาวน์โหลดเอกสาร HTML อีกครั้ง",
                             data=html_content,
@@ -563,6 +695,15 @@ def document_verification_interface():
                             width='stretch'
                         )
                     
+                    with col_reexport_pdf:
+                        st.download_button(
+                            label="📑 ดาวน์โหลดเอกสาร PDF อีกครั้ง",
+                            data=lambda: doc_export.render_document(log, 'pdf'),
+                            file_name=f"floor_price_{log.reference_id[:8]}.pdf",
+                            mime="application/pdf",
+                            width='stretch'
+                        )
+                    
                     with col_reexport2:
                         text_summary = doc_export.generate_simple_summary_text(log)
                         st.download_button(
@@ -587,6 +728,15 @@ def document_verification_interface():
         - สามารถตรวจสอบได้ตลอดเวลา
         - ข้อมูลจะตรงกับที่บันทึกในระบบ
         """)
+    
+    st.write("---")
+    bulk_verification_interface()
+
+
+def bulk_verification_interface():
+    """ตรวจสอบหลายเอกสารพร้อมกันจากรายการ Reference ID ที่วางหรืออัปโหลด"""
+    st.subheader("📋 ตรวจสอบหลายเอกสารพร้อมกัน")
+    bulk_verification.render_bulk_verification()
 
 
 def comparison_table_interface():
@@ -1092,22 +1242,87 @@ def admin_dashboard():
     """Admin dashboard - แสดง floor price และ log ทั้งหมด"""
     st.header("🔧 Admin Dashboard")
     
-    # Summary
-    all_logs = db.get_all_logs(limit=500)
+    # Summary (คำนวณฝั่ง database จากทุกรายการ)
+    summary = db.get_price_check_summary()
     
-    if not all_logs:
+    if not summary['total']:
         st.info("ยังไม่มีข้อมูล")
         return
     
-    total = len(all_logs)
-    valid = sum(1 for log in all_logs if log.is_valid_weighted)
-    invalid = total - valid
-    
-    col1, col2, col3, col4 = st.columns(4)
-    col1.metric("ตรวจสอบทั้งหมด", total)
-    col2.metric("ผ่าน ✅", valid)
-    col3.metric("ไม่ผ่าน ❌", invalid)
-    col4.metric("Pass Rate", f"{(valid/total*100):.1f}%")
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("ตรวจสอบทั้งหมด", summary['total'])
+    col2.metric("ผ่าน ✅", summary['valid'])
+    col3.metric("ไม่ผ่าน ❌", summary['invalid'])
+    col4.metric("Pass Rate", f"{summary['pass_rate']:.1f}%")
+    col5.metric("Margin เฉลี่ย", f"{summary['avg_margin_percent']:.1f}%")
+    
+    with st.expander("📊 สถิติแยกตามมิติ"):
+        dimension_labels = {
+            'customer_type': 'ประเภทลูกค้า',
+            'speed': 'ความเร็ว',
+            'contract_months': 'ระยะสัญญา',
+            'user_email': 'ผู้ตรวจสอบ',
+            'equipment': 'อุปกรณ์'
+        }
+        dimension = st.selectbox(
+            "แยกตาม",
+            options=list(dimension_labels.keys()),
+            format_func=lambda x: dimension_labels[x],
+            key='admin_breakdown_dimension'
+        )
+        breakdown = db.get_price_check_breakdown(dimension)
+        df_breakdown = pd.DataFrame([{
+            dimension_labels[dimension]: row['value'],
+            'ทั้งหมด': row['total'],
+            'ผ่าน': row['valid'],
+            'ไม่ผ่าน': row['invalid'],
+            'Pass Rate (%)': round(row['pass_rate'], 1),
+            'Margin เฉลี่ย (%)': round(row['avg_margin_percent'], 1),
+            'Margin เฉลี่ย (บาท)': round(row['avg_margin_baht'], 2)
+        } for row in breakdown])
+        st.dataframe(df_breakdown, width='stretch', hide_index=True)
+    
+    with st.expander("📈 แนวโน้มรายวัน (1 ปีล่าสุด)"):
+        if st.button("🔄 อัปเดต Rollup", key="btn_refresh_daily_stats"):
+            with st.spinner("กำลังรวมข้อมูล..."):
+                processed = db.refresh_daily_stats()
+            st.success(f"✅ รวมข้อมูลเพิ่ม {processed:,} รายการ")
+        
+        daily_stats = db.get_daily_stats(
+            group_by=('day',),
+            date_from=(datetime.utcnow() - timedelta(days=365)).date()
+        )
+        
+        if not daily_stats:
+            st.info("ยังไม่มีข้อมูลใน rollup (กด อัปเดต Rollup เพื่อรวมข้อมูลเดิม)")
+        else:
+            import plotly.graph_objects as go
+            
+            df_daily = pd.DataFrame(daily_stats)
+            
+            fig = go.Figure()
+            fig.add_trace(go.Bar(
+                x=df_daily['day'],
+                y=df_daily['total'],
+                name='จำนวนตรวจสอบ'
+            ))
+            fig.add_trace(go.Scatter(
+                x=df_daily['day'],
+                y=df_daily['pass_rate'],
+                name='Pass Rate (%)',
+                mode='lines',
+                yaxis='y2',
+                line=dict(color='green', width=2)
+            ))
+            fig.update_layout(
+                xaxis_title="วันที่",
+                yaxis=dict(title="จำนวนตรวจสอบ"),
+                yaxis2=dict(title="Pass Rate (%)", overlaying='y', side='right', range=[0, 100]),
+                hovermode='x unified',
+                height=400
+            )
+            
+            st.plotly_chart(fig, config={'responsive': True})
     
     st.write("---")
     
@@ -1238,9 +1453,32 @@ def admin_dashboard():
     
     st.write("---")
     
-    # All logs
+    # All logs (แบ่งหน้าแบบ keyset)
     st.subheader("📋 Log ทั้งหมด")
     
+    search_text = st.text_input(
+        "🔍 ค้นหา (หมายเหตุ / อุปกรณ์ / อีเมล)",
+        placeholder="เช่น F612, somchai, ชื่อโครงการ",
+        key="admin_logs_search"
+    )
+    filters = history_filters_ui("admin_logs", include_user=True)
+    if search_text.strip():
+        page_logs = db.search_price_checks(
+            search_text, limit=100, columns=db.ADMIN_LOG_COLUMNS, **filters
+        )
+    else:
+        page_logs = keyset_pager_ui(
+            "admin_logs",
+            lambda cursor: db.get_price_checks_page(
+                limit=100, cursor=cursor, columns=db.ADMIN_LOG_COLUMNS, **filters
+            ),
+            filters
+        )
+    
+    if not page_logs:
+        st.info("ไม่พบรายการตามเงื่อนไขที่เลือก")
+        return
+    
     df = pd.DataFrame([{
         'วันที่': log.checked_at.strftime('%Y-%m-%d %H:%M'),
         'User': log.user_email.split('@')[0],
@@ -1255,18 +1493,53 @@ def admin_dashboard():
         'ผ่าน': '✅' if log.is_valid_weighted else '❌',
         'Margin%': round(log.margin_weighted_percent, 1) if log.margin_weighted_percent else 0,
         'หมายเหตุ': log.notes or '-'
-    } for log in all_logs])
+    } for log in page_logs])
     
     st.dataframe(df, width='stretch', hide_index=True)
     
     # Export
     csv = df.to_csv(index=False).encode('utf-8-sig')
     st.download_button(
-        label="📥 ดาวน์โหลด CSV",
+        label="📥 ดาวน์โหลด CSV (หน้านี้)",
         data=csv,
         file_name=f'floor_price_logs_{datetime.now().strftime("%Y%m%d")}.csv',
         mime='text/csv'
     )
+    
+    # ไฟล์ export ทั้งหมดอาจใหญ่มาก: st.download_button เก็บข้อมูลทั้งก้อนไว้ในหน่วยความจำของ server
+    # จึงให้คำสั่งสำหรับรันบน server แทน (เขียนลงไฟล์แบบ streaming)
+    with st.expander("📦 Export audit log ทั้งหมด (ตาม filter ด้านบน)"):
+        st.caption("รันบน server (รวมข้อมูลที่ archive แล้ว) - ไฟล์ถูกเขียนแบบ streaming โดยไม่โหลดทั้งหมดเข้าหน่วยความจำ")
+        st.code(export_command(
+            "export_price_checks.py", "floor_price_audit.csv.gz", filters, "--format csv --gzip"
+        ), language="bash")
+    
+    with st.expander("🗂️ Export เอกสารยืนยัน (ZIP) ตาม filter ด้านบน"):
+        st.caption("รันบน server - สร้างเอกสารด้วยหลาย process และบันทึกสถานะ export ทุกรายการ")
+        st.code(export_command(
+            "export_documents.py", "floor_price_documents.zip", filters,
+            f"--formats html,pdf --exported-by {shlex.quote(st.session_state.user_email)}"
+        ), language="bash")
+
+
+def export_command(script, output, filters, extra_args=""):
+    """คำสั่ง CLI ของ export_price_checks.py / export_documents.py ตาม filter ของหน้าจอ"""
+    args = ["python", script, output]
+    if filters.get('date_from'):
+        args += ["--from", filters['date_from'].strftime('%Y-%m-%d')]
+    if filters.get('date_to'):
+        # date_to ของ filter ไม่รวมวันนั้น ส่วน --to ของ CLI รวม
+        args += ["--to", (filters['date_to'] - timedelta(days=1)).strftime('%Y-%m-%d')]
+    if filters.get('user_email'):
+        args += ["--user", filters['user_email']]
+    if filters.get('customer_type'):
+        args += ["--customer-type", filters['customer_type']]
+    if filters.get('is_valid') is not None:
+        args += ["--result", "pass" if filters['is_valid'] else "fail"]
+    if filters.get('equipment'):
+        args += ["--equipment", filters['equipment']]
+    command = " ".join(shlex.quote(arg) for arg in args)
+    return f"{command} {extra_args}".strip()
 
 
 # Main entry point
@@ -0,0 +1,54 @@
+import argparse
+from datetime import datetime, timedelta
+import database as db
+from config import Config
+
+def main():
+    """ย้าย price_checks เก่าไป archive รายปี ล้าง OTP หมดอายุ และคืนพื้นที่ไฟล์ฐานข้อมูล"""
+    parser = argparse.ArgumentParser(description="Archive old price checks and reclaim space")
+    parser.add_argument("--older-than-days", type=int, default=Config.PRICE_CHECK_RETENTION_DAYS,
+                        help="archive รายการที่เก่ากว่านี้ (วัน)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="จำนวนแถวต่อ transaction")
+    parser.add_argument("--purge-legacy", action="store_true",
+                        help="ลบ price_checks_legacy ที่ migrate เข้า v2 แล้ว")
+    parser.add_argument("--vacuum-pages", type=int, default=None,
+                        help="จำนวนหน้าสูงสุดที่ incremental vacuum คืนในครั้งนี้ (ไม่ระบุ = ทั้งหมด)")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="เปิด incremental vacuum (VACUUM ทั้งไฟล์หนึ่งครั้ง - ควรรันนอกเวลาทำการ)")
+    args = parser.parse_args()
+
+    if args.enable_incremental_vacuum:
+        print("🔄 กำลังเปิด incremental vacuum (VACUUM ทั้งไฟล์)...")
+        if db.enable_incremental_vacuum():
+            print("✅ เปิด incremental vacuum แล้ว")
+        else:
+            print("⚠️  รองรับเฉพาะ SQLite")
+
+    before = datetime.utcnow() - timedelta(days=args.older_than_days)
+    print(f"🔄 กำลัง archive รายการก่อน {before:%d/%m/%Y}...")
+    archived = db.archive_price_checks(
+        before,
+        chunk_size=args.chunk_size,
+        progress=lambda total: print(f"   ... archive แล้ว {total:,} รายการ")
+    )
+    if archived:
+        print(f"✅ Archive {archived:,} รายการ")
+    else:
+        print("⚠️  ไม่มีรายการที่ต้อง archive")
+
+    for entry in db.get_price_check_archives():
+        print(f"   📦 {entry.table_name}: {entry.row_count:,} รายการ")
+
+    print(f"✅ ลบ OTP ที่หมดอายุ {db.purge_expired_otps():,} รายการ")
+
+    if args.purge_legacy:
+        print(f"✅ ลบ price_checks_legacy ที่ย้ายแล้ว {db.purge_migrated_legacy_checks():,} รายการ")
+
+    pages = db.reclaim_space(args.vacuum_pages)
+    if pages is None:
+        print("⚠️  ข้าม incremental vacuum (ยังไม่ได้เปิด - ใช้ --enable-incremental-vacuum)")
+    else:
+        print(f"✅ คืนพื้นที่ {pages:,} หน้า")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import http.client
+import itertools
+import os
+import random
+import threading
+import time
+from wsgiref.util import setup_testing_defaults
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] * 1000
+
+
+def _report(label, latencies, elapsed, statuses):
+    print(f"✅ {label}: {len(latencies) / elapsed:,.0f} req/s "
+          f"(p50 {_percentile(latencies, 0.5):.2f} ms, p99 {_percentile(latencies, 0.99):.2f} ms) "
+          f"สถานะ {dict(sorted(statuses.items()))}")
+
+
+def _paths(reference_ids, requests, miss_ratio):
+    paths = []
+    for i in range(requests):
+        if random.random() < miss_ratio:
+            paths.append(f"/verify/missing-{i}")
+        elif i % 2:
+            paths.append(f"/api/verify/{random.choice(reference_ids)}")
+        else:
+            paths.append(f"/verify/{random.choice(reference_ids)}")
+    return paths
+
+
+def bench_wsgi(service, paths, label="WSGI (in-process)"):
+    """เรียก WSGI application ตรงๆ (ไม่นับ network/HTTP parsing)"""
+    latencies, statuses = [], {}
+
+    def start_response(status, headers):
+        code = status.split()[0]
+        statuses[code] = statuses.get(code, 0) + 1
+
+    started = time.perf_counter()
+    for path in paths:
+        environ = {'PATH_INFO': path, 'HTTP_ACCEPT_ENCODING': 'gzip'}
+        setup_testing_defaults(environ)
+        request_started = time.perf_counter()
+        b''.join(service.application(environ, start_response))
+        latencies.append(time.perf_counter() - request_started)
+    _report(label, latencies, time.perf_counter() - started, statuses)
+
+
+def bench_http(service, paths, concurrency):
+    """ยิง HTTP ผ่าน threaded WSGI server ของ standard library ด้วย client หลาย thread"""
+    server = service.make_threaded_server('127.0.0.1', 0, quiet=True)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    queue = iter(paths)
+    queue_lock = threading.Lock()
+    latencies, statuses = [], {}
+    results_lock = threading.Lock()
+
+    def worker():
+        local_latencies, local_statuses = [], {}
+        while True:
+            with queue_lock:
+                path = next(queue, None)
+            if path is None:
+                break
+            request_started = time.perf_counter()
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+            conn.request('GET', path, headers={'Accept-Encoding': 'gzip'})
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            local_latencies.append(time.perf_counter() - request_started)
+            local_statuses[str(response.status)] = local_statuses.get(str(response.status), 0) + 1
+        with results_lock:
+            latencies.extend(local_latencies)
+            for code, count in local_statuses.items():
+                statuses[code] = statuses.get(code, 0) + count
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    _report(f"HTTP ({concurrency} connections)", latencies, elapsed, statuses)
+
+
+def main():
+    """วัด throughput ของ verify_service.py ด้วย reference ID ที่มีอยู่ในฐานข้อมูล"""
+    parser = argparse.ArgumentParser(description="Benchmark the verification service")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--sample", type=int, default=1000, help="จำนวน reference ID ที่สุ่มใช้")
+    parser.add_argument("--miss-ratio", type=float, default=0.1, help="สัดส่วน request ที่ใช้ ID ที่ไม่มีอยู่")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--database-url", default=os.getenv('DATABASE_URL'),
+                        help="ฐานข้อมูลที่มี price checks อยู่แล้ว (ค่าเริ่มต้น = DATABASE_URL)")
+    args = parser.parse_args()
+
+    # ไม่ใช้ค่าเริ่มต้นของ Config: import database จะสร้าง floor_price.db ว่างขึ้นมาใน working directory
+    if not args.database_url:
+        print("❌ ระบุ --database-url หรือ DATABASE_URL ของฐานข้อมูลที่จะวัด")
+        return
+    os.environ['DATABASE_URL'] = args.database_url
+    import database as db
+    import verify_service
+
+    reference_ids = [reference_id for _, reference_id in itertools.islice(db.iter_reference_ids(), args.sample)]
+    if not reference_ids:
+        print("⚠️  ไม่มี price check ในฐานข้อมูล")
+        return
+
+    paths = _paths(reference_ids, args.requests, args.miss_ratio)
+    print(f"🔄 {args.requests:,} requests, {len(reference_ids):,} reference IDs")
+    # รอบแรกเติม cache (เหมือน service ที่รันมาสักพัก)
+    bench_wsgi(verify_service, [f"/verify/{reference_id}" for reference_id in reference_ids], "WSGI (cold cache)")
+    bench_wsgi(verify_service, paths)
+    if not args.skip_http:
+        bench_http(verify_service, paths, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
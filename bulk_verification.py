@@ -0,0 +1,187 @@
+"""
+ตรวจสอบเอกสารหลายฉบับพร้อมกัน จากรายการ reference ID ที่วางหรืออัปโหลด (ทีละบรรทัด, CSV หรือลิงก์ตรวจสอบ)
+
+อ่านจาก database ด้วย IN (...) ทีละ chunk ผ่าน db.get_verification_records แทนการค้นทีละ ID
+"""
+import csv
+import io
+import re
+from datetime import datetime
+from urllib.parse import parse_qs, unquote, urlsplit
+import streamlit as st
+from config import Config
+import database as db
+import price_check_writer
+import reference_format
+import verification_token
+
+_SEPARATORS = re.compile(r'[\s,;"\']+')
+
+REPORT_COLUMNS = (
+    ('reference_id', 'Reference ID'),
+    ('status', 'สถานะ'),
+    ('checked_at', 'วันที่ตรวจสอบ'),
+    ('user_email', 'ผู้ออกเอกสาร'),
+    ('customer_type', 'ประเภทลูกค้า'),
+    ('speed', 'ความเร็ว (Mbps)'),
+    ('contract_months', 'สัญญา (เดือน)'),
+    ('proposed_price', 'ราคาเสนอ'),
+    ('floor_existing', 'Floor ลูกค้าเดิม'),
+    ('floor_new', 'Floor ลูกค้าใหม่'),
+    ('floor_weighted', 'Floor ถัวเฉลี่ย'),
+    ('is_valid_existing', 'ผ่าน (ลูกค้าเดิม)'),
+    ('is_valid_new', 'ผ่าน (ลูกค้าใหม่)'),
+    ('is_valid_weighted', 'ผ่าน (ถัวเฉลี่ย)'),
+    ('export_count', 'จำนวนครั้งที่ export'),
+    ('exported_at', 'Export ล่าสุด'),
+)
+
+STATUS_PASS = 'ผ่าน'
+STATUS_FAIL = 'ไม่ผ่าน'
+STATUS_NOT_FOUND = 'ไม่พบในระบบ'
+
+
+def _reference_from_token(value):
+    """reference ID จากลิงก์ตรวจสอบ (?reference_id=, ?t=, /verify/<id>) หรือค่าเดิม"""
+    if '/' not in value and '?' not in value:
+        return value
+    parts = urlsplit(value)
+    query = parse_qs(parts.query)
+    if query.get('reference_id'):
+        return query['reference_id'][0]
+    if query.get('t'):
+        claims = verification_token.decode_token(query['t'][0])
+        return claims.reference_id if claims else value
+    segments = [segment for segment in parts.path.split('/') if segment]
+    if len(segments) >= 2 and segments[-2] == 'verify':
+        return unquote(segments[-1])
+    return value
+
+
+def parse_reference_ids(text):
+    """
+    แยก reference ID จากข้อความ/ไฟล์ (คั่นด้วยบรรทัด, ช่องว่าง, comma หรือ ;) ตัดตัวซ้ำโดยคงลำดับเดิม
+
+    รับ bytes ได้ (ไฟล์อัปโหลด) และข้ามหัวคอลัมน์ reference_id ของไฟล์ CSV
+    """
+    if isinstance(text, bytes):
+        text = text.decode('utf-8-sig', errors='replace')
+    reference_ids = {}
+    for value in _SEPARATORS.split(text or ''):
+        if not value or value.lower().replace(' ', '_') in ('reference_id', 'referenceid'):
+            continue
+        reference_ids.setdefault(reference_format.normalize(_reference_from_token(value)), None)
+    return list(reference_ids)
+
+
+def verify_reference_ids(reference_ids, bind=None, chunk_size=500):
+    """
+    ผลตรวจสอบของ reference ID ตามลำดับที่ส่งมา
+
+    Returns:
+        list ของ dict ตาม REPORT_COLUMNS (ID ที่ไม่พบมีเฉพาะ reference_id และ status)
+
+    Raises:
+        ValueError: จำนวน ID เกิน BULK_VERIFY_MAX_IDS
+    """
+    if len(reference_ids) > Config.BULK_VERIFY_MAX_IDS:
+        raise ValueError(f"Too many reference IDs ({len(reference_ids)} > {Config.BULK_VERIFY_MAX_IDS})")
+
+    records = db.get_verification_records(reference_ids, bind=bind, chunk_size=chunk_size)
+    results = []
+    for reference_id in reference_ids:
+        row = records.get(reference_id)
+        if row is None:
+            results.append({'reference_id': reference_id, 'status': STATUS_NOT_FOUND})
+            continue
+        result = dict(row._mapping)
+        result['status'] = STATUS_PASS if row.is_valid_weighted else STATUS_FAIL
+        result['export_count'] = row.export_count or 0
+        results.append(result)
+    return results
+
+
+def summarize(results):
+    """จำนวนเอกสารแยกตามสถานะ"""
+    summary = {STATUS_PASS: 0, STATUS_FAIL: 0, STATUS_NOT_FOUND: 0}
+    for result in results:
+        summary[result['status']] += 1
+    return summary
+
+
+def report_rows(results):
+    """แถวสำหรับแสดงเป็นตาราง (หัวคอลัมน์ภาษาไทย, วันที่เป็นข้อความ)"""
+    rows = []
+    for result in results:
+        row = {}
+        for key, label in REPORT_COLUMNS:
+            value = result.get(key)
+            if hasattr(value, 'strftime'):
+                value = value.strftime('%Y-%m-%d %H:%M')
+            elif isinstance(value, bool):
+                value = STATUS_PASS if value else STATUS_FAIL
+            row[label] = value
+        rows.append(row)
+    return rows
+
+
+def report_csv(results):
+    """รายงาน CSV (utf-8-sig ให้ Excel อ่านภาษาไทยได้)"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow([label for _, label in REPORT_COLUMNS])
+    for row in report_rows(results):
+        writer.writerow(['' if value is None else value for value in row.values()])
+    return output.getvalue().encode('utf-8-sig')
+
+
+def render_bulk_verification(bind=None):
+    """
+    ส่วน Streamlit ของการตรวจสอบหลายเอกสาร (ช่องวาง/อัปโหลด, สรุปผล, ตาราง, ดาวน์โหลด CSV)
+    ใช้ร่วมกันทั้ง app.py และ verify_app.py
+
+    Args:
+        bind: engine ที่ใช้อ่าน (None = read replica/snapshot ตามปกติ แล้วค่อย primary)
+    """
+    col_input1, col_input2 = st.columns(2)
+    with col_input1:
+        pasted = st.text_area(
+            "Reference ID หรือลิงก์ตรวจสอบ (บรรทัดละรายการ)",
+            height=150,
+            key="bulk_verify_text"
+        )
+    with col_input2:
+        uploaded = st.file_uploader("หรืออัปโหลดไฟล์ (TXT/CSV)", type=["txt", "csv"], key="bulk_verify_file")
+
+    if not st.button("🔍 ตรวจสอบทั้งหมด", key="btn_bulk_verify"):
+        return
+
+    reference_ids = parse_reference_ids(pasted)
+    if uploaded is not None:
+        reference_ids = list(dict.fromkeys(reference_ids + parse_reference_ids(uploaded.getvalue())))
+    if not reference_ids:
+        st.error("❌ กรุณาระบุ Reference ID อย่างน้อยหนึ่งรายการ")
+        return
+
+    # รายการที่ยังค้างใน write-behind ของ process นี้ต้องถูกบันทึกก่อนค้น
+    price_check_writer.flush()
+    try:
+        results = verify_reference_ids(reference_ids, bind=bind)
+    except ValueError:
+        st.error(f"❌ ตรวจสอบได้ไม่เกินครั้งละ {Config.BULK_VERIFY_MAX_IDS:,} รายการ")
+        return
+
+    summary = summarize(results)
+    col_pass, col_fail, col_missing = st.columns(3)
+    col_pass.metric("✅ ผ่าน", f"{summary[STATUS_PASS]:,}")
+    col_fail.metric("❌ ไม่ผ่าน", f"{summary[STATUS_FAIL]:,}")
+    col_missing.metric("⚠️ ไม่พบในระบบ", f"{summary[STATUS_NOT_FOUND]:,}")
+
+    st.dataframe(report_rows(results), width='stretch', hide_index=True)
+    st.download_button(
+        label="📥 ดาวน์โหลดรายงาน (CSV)",
+        data=report_csv(results),
+        file_name=f'bulk_verification_{datetime.now().strftime("%Y%m%d_%H%M")}.csv',
+        mime='text/csv',
+        key="btn_bulk_verify_download"
+    )
@@ -20,6 +20,49 @@ class Config:
     # Database
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///floor_price.db')
     
+    # Read replica สำหรับ query อ่านหนัก (verification, dashboard, export, ประวัติ)
+    # READ_DATABASE_URL = replica ของ server database
+    # READ_SNAPSHOT_PATH = ไฟล์ snapshot ของ SQLite (อัปเดตด้วย refresh_read_snapshot.py)
+    READ_DATABASE_URL = os.getenv('READ_DATABASE_URL')
+    READ_SNAPSHOT_PATH = os.getenv('READ_SNAPSHOT_PATH')
+    
+    # ลิงก์/QR ตรวจสอบเอกสาร (VERIFY_SIGNED_TOKENS=true ใส่ token ลงลายเซ็นด้วย SECRET_KEY)
+    VERIFY_BASE_URL = os.getenv('VERIFY_BASE_URL', 'https://floorprice.example.com')
+    VERIFY_SIGNED_TOKENS = os.getenv('VERIFY_SIGNED_TOKENS', 'false').lower() == 'true'
+    
+    # Cache ของหน้า verification (verification_lookup.py)
+    VERIFY_CACHE_SIZE = int(os.getenv('VERIFY_CACHE_SIZE', 10000))
+    VERIFY_NEGATIVE_TTL_SECONDS = int(os.getenv('VERIFY_NEGATIVE_TTL_SECONDS', 60))
+    VERIFY_EXPORT_TTL_SECONDS = int(os.getenv('VERIFY_EXPORT_TTL_SECONDS', 30))
+    VERIFY_MMAP_SIZE = int(os.getenv('VERIFY_MMAP_SIZE', 256 * 1024 * 1024))
+    # รูปแบบ reference ID ใหม่: uuid4 หรือ compact (UUIDv7 เรียงตามเวลา แบบ Base32 26 ตัวอักษร, reference_format.py)
+    REFERENCE_ID_FORMAT = os.getenv('REFERENCE_ID_FORMAT', 'uuid4').lower()
+    # QR ในเอกสาร (document_export.py): cache ในหน่วยความจำ, โฟลเดอร์ cache บน disk ('' = ไม่ใช้),
+    # และรูปแบบ QR ในเอกสาร HTML (png หรือ svg แบบ vector)
+    QR_CACHE_SIZE = int(os.getenv('QR_CACHE_SIZE', 2000))
+    QR_CACHE_DIR = os.getenv('QR_CACHE_DIR', '')
+    QR_HTML_FORMAT = os.getenv('QR_HTML_FORMAT', 'png').lower()
+    # จำนวน reference ID สูงสุดต่อการตรวจสอบหลายเอกสาร (bulk_verification.py)
+    BULK_VERIFY_MAX_IDS = int(os.getenv('BULK_VERIFY_MAX_IDS', 20000))
+    
+    # Bloom filter ของ reference ID (reference_bloom.py) - ปฏิเสธ ID ที่ไม่มีอยู่โดยไม่ถาม database
+    REFERENCE_BLOOM_ENABLED = os.getenv('REFERENCE_BLOOM_ENABLED', 'true').lower() == 'true'
+    REFERENCE_BLOOM_PATH = os.getenv('REFERENCE_BLOOM_PATH', 'reference_ids.bloom')
+    REFERENCE_BLOOM_CAPACITY = int(os.getenv('REFERENCE_BLOOM_CAPACITY', 1000000))
+    REFERENCE_BLOOM_ERROR_RATE = float(os.getenv('REFERENCE_BLOOM_ERROR_RATE', 0.001))
+    
+    # Write-behind logging ของ price checks (group commit แทน commit ทีละรายการ)
+    PRICE_CHECK_WRITE_BEHIND = os.getenv('PRICE_CHECK_WRITE_BEHIND', 'false').lower() == 'true'
+    WRITE_BEHIND_MAX_DELAY_MS = int(os.getenv('WRITE_BEHIND_MAX_DELAY_MS', 200))
+    WRITE_BEHIND_MAX_BATCH = int(os.getenv('WRITE_BEHIND_MAX_BATCH', 500))
+    WRITE_BEHIND_MAX_QUEUE = int(os.getenv('WRITE_BEHIND_MAX_QUEUE', 10000))
+    # batch ที่ล้มเหลวเกินจำนวนครั้งนี้จะบันทึกทีละแถว แถวที่ยังล้มเหลวถูกเขียนลงไฟล์ dead-letter (JSONL)
+    WRITE_BEHIND_MAX_RETRIES = int(os.getenv('WRITE_BEHIND_MAX_RETRIES', 3))
+    WRITE_BEHIND_DEAD_LETTER_PATH = os.getenv('WRITE_BEHIND_DEAD_LETTER_PATH', 'price_check_dead_letters.jsonl')
+    
+    # Archive: price_checks ที่เก่ากว่านี้ย้ายไปตาราง archive รายปี (archive_price_checks.py)
+    PRICE_CHECK_RETENTION_DAYS = int(os.getenv('PRICE_CHECK_RETENTION_DAYS', 730))
+    
     # Security
     SECRET_KEY = os.getenv('SECRET_KEY')
     OTP_EXPIRY_MINUTES = int(os.getenv('OTP_EXPIRY_MINUTES', 5))
@@ -1,15 +1,54 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, Text, inspect, text
+from sqlalchemy import exc, create_engine, Column, Integer, String, Float, Date, DateTime, Boolean, Text, LargeBinary, Index, UniqueConstraint, event, inspect, text, tuple_, func, case, select, insert, update, delete, bindparam, MetaData, Table, table, column, literal_column, or_
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 from datetime import datetime, timedelta
+import csv
+import gzip
+import io
+import json
+import os
 import secrets
-import uuid
+import sqlite3
+import time
+from collections import defaultdict
+from types import SimpleNamespace
 from config import Config
+import reference_format
 
 Base = declarative_base()
 engine = create_engine(Config.DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine)
 
+def _create_read_engine():
+    """
+    Engine สำหรับ query อ่านหนัก (verification, dashboard, export, ประวัติ)
+
+    READ_DATABASE_URL = replica ของ server database, READ_SNAPSHOT_PATH = ไฟล์ snapshot ของ SQLite
+    (สร้างด้วย refresh_read_snapshot) ไม่ตั้งค่าทั้งสอง = อ่านจาก primary
+    """
+    if Config.READ_DATABASE_URL:
+        return create_engine(Config.READ_DATABASE_URL)
+    if Config.READ_SNAPSHOT_PATH and engine.dialect.name == 'sqlite':
+        # read-only และไม่ pool connection: session ใหม่เปิดไฟล์ snapshot ล่าสุดเสมอหลัง refresh
+        snapshot_path = os.path.abspath(Config.READ_SNAPSHOT_PATH)
+        return create_engine(f"sqlite:///file:{snapshot_path}?mode=ro&uri=true", poolclass=NullPool)
+    return engine
+
+read_engine = _create_read_engine()
+ReadSessionLocal = sessionmaker()
+
+def _read_bind():
+    """read_engine ถ้าพร้อมใช้ (snapshot ถูกสร้างแล้ว) ไม่เช่นนั้น primary"""
+    if read_engine is not engine and read_engine.dialect.name == 'sqlite' and not Config.READ_DATABASE_URL:
+        if not os.path.exists(Config.READ_SNAPSHOT_PATH):
+            return engine
+    return read_engine
+
+def _read_session():
+    """Session สำหรับ query อ่านอย่างเดียว (ห้ามใช้เขียน - replica/snapshot อาจเป็น read-only)"""
+    return ReadSessionLocal(bind=_read_bind())
+
 class User(Base):
     __tablename__ = 'users'
     
@@ -45,6 +84,8 @@ class PriceCheck(Base):
     customer_type = Column(String, nullable=False)
     speed = Column(Integer, nullable=False)
     distance = Column(Float, nullable=False)
+    # ชื่อ SKU ตามลำดับที่เลือก (แสดงในเอกสาร, index ใน price_checks_fts และเก็บใน archive ที่ไม่มี
+    # price_check_equipment) - filter/สถิติตามอุปกรณ์ใช้ตาราง link แทน
     equipment = Column(String, nullable=False)
     contract_months = Column(Integer, nullable=False)
     has_fixed_ip = Column(Boolean, default=False)
@@ -89,6 +130,31 @@ class PriceCheck(Base):
     # Notes
     notes = Column(Text)
 
+# Indexes สำหรับ query ที่ใช้บ่อย (ประวัติผู้ใช้, log ทั้งหมด, filter ผ่าน/ไม่ผ่าน)
+# (checked_at, id) เป็น key ของการแบ่งหน้าแบบ keyset จึงต้องอยู่ใน index ทั้งคู่
+Index('idx_price_checks_user_checked_at_id', PriceCheck.user_email, PriceCheck.checked_at.desc(), PriceCheck.id.desc())
+Index('idx_price_checks_checked_at', PriceCheck.checked_at)
+Index('idx_price_checks_valid_checked_at', PriceCheck.is_valid_weighted, PriceCheck.checked_at)
+
+# Index รุ่นก่อนที่ถูกแทนที่แล้ว (ลบทิ้งตอน migrate)
+OBSOLETE_PRICE_CHECK_INDEXES = ['idx_price_checks_user_checked_at']
+
+class EquipmentSku(Base):
+    """พจนานุกรมชื่ออุปกรณ์ (SKU) ที่ปรากฏใน price_checks.equipment"""
+    __tablename__ = 'equipment_skus'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+class PriceCheckEquipment(Base):
+    """อุปกรณ์ของแต่ละ price check (หนึ่งแถวต่อ SKU) ให้ filter/สถิติแยกตามอุปกรณ์ใช้ index แทน LIKE"""
+    __tablename__ = 'price_check_equipment'
+
+    price_check_id = Column(Integer, primary_key=True)
+    sku_id = Column(Integer, primary_key=True)
+
+Index('idx_price_check_equipment_sku', PriceCheckEquipment.sku_id, PriceCheckEquipment.price_check_id)
+
 # Backward compatibility - เก็บ model เดิมไว้
 class PriceCheckLegacy(Base):
     __tablename__ = 'price_checks_legacy'
@@ -99,6 +165,8 @@ class PriceCheckLegacy(Base):
     has_fixed_ip = Column(Boolean, default=False)   
     speed = Column(Integer, nullable=False)
     distance = Column(Float, nullable=False)
+    # ชื่อ SKU ตามลำดับที่เลือก (แสดงในเอกสาร, index ใน price_checks_fts และเก็บใน archive ที่ไม่มี
+    # price_check_equipment) - filter/สถิติตามอุปกรณ์ใช้ตาราง link แทน
     equipment = Column(String, nullable=False)
     contract_months = Column(Integer, nullable=False)
     proposed_price = Column(Float, nullable=False)
@@ -109,18 +177,114 @@ class PriceCheckLegacy(Base):
     ip_address = Column(String)
     notes = Column(Text)
 
-# Create tables and ensure schema compatibility
-Base.metadata.create_all(engine)
+class PriceCheckDailyStats(Base):
+    """Rollup รายวันของ price_checks สำหรับกราฟแนวโน้มและรายงาน (ไม่ต้อง scan ตารางหลัก)"""
+    __tablename__ = 'price_check_daily_stats'
+    __table_args__ = (
+        UniqueConstraint('day', 'user_email', 'customer_type', 'speed', 'contract_months',
+                         name='uq_price_check_daily_stats_key'),
+    )
 
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)  # วันที่ตรวจสอบ (UTC ตาม checked_at)
+    user_email = Column(String, nullable=False)
+    customer_type = Column(String, nullable=False)
+    speed = Column(Integer, nullable=False)
+    contract_months = Column(Integer, nullable=False)
 
-def ensure_price_checks_schema():
-    """Ensure legacy databases include all required columns for price_checks."""
-    inspector = inspect(engine)
-    if 'price_checks' not in inspector.get_table_names():
-        return
+    check_count = Column(Integer, nullable=False, default=0)  # จำนวนการตรวจสอบ
+    valid_count = Column(Integer, nullable=False, default=0)  # จำนวนที่ผ่าน (ถัวเฉลี่ย)
+    proposed_price_sum = Column(Float, nullable=False, default=0.0)
+    margin_weighted_baht_sum = Column(Float, nullable=False, default=0.0)
+    margin_weighted_percent_sum = Column(Float, nullable=False, default=0.0)
 
-    existing_columns = {column['name'] for column in inspector.get_columns('price_checks')}
+class RollupWatermark(Base):
+    """price_checks.id ล่าสุดที่ถูกรวมเข้า rollup แล้ว (ต่อ rollup)"""
+    __tablename__ = 'rollup_watermarks'
+
+    name = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+DAILY_STATS_ROLLUP = 'price_check_daily_stats'
+
+class DataMigrationCheckpoint(Base):
+    """ความคืบหน้าของ data migration ที่ทำทีละ chunk (resume ต่อจาก last_id ได้)"""
+    __tablename__ = 'data_migration_checkpoints'
+
+    name = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)  # id ล่าสุดของตารางต้นทางที่ย้ายแล้ว
+    rows_done = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PriceCheckArchive(Base):
+    """ทะเบียนตาราง archive รายปีของ price_checks (price_checks_archive_<ปี>)"""
+    __tablename__ = 'price_check_archives'
+
+    year = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)
+    row_count = Column(Integer, nullable=False, default=0)
+    first_checked_at = Column(DateTime)
+    last_checked_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RenderedDocument(Base):
+    """
+    เอกสารที่ render แล้ว (บีบอัด gzip) ข้อมูลของ price check ไม่เปลี่ยนหลังบันทึก จึงใช้ซ้ำได้ตลอด
 
+    cache_key = reference_id:รูปแบบ:template version:variant (variant เปลี่ยนตามลิงก์ตรวจสอบ/รูปแบบ QR)
+    """
+    __tablename__ = 'rendered_documents'
+
+    cache_key = Column(String, primary_key=True)
+    reference_id = Column(String, nullable=False, index=True)
+    format = Column(String, nullable=False)
+    template_version = Column(Integer, nullable=False)
+    content = Column(LargeBinary, nullable=False)
+    etag = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)  # ขนาดก่อนบีบอัด
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class SchemaVersion(Base):
+    """ประวัติ migration ที่ถูก apply แล้ว (version สูงสุด = schema ปัจจุบัน)"""
+    __tablename__ = 'schema_version'
+
+    version = Column(Integer, primary_key=True)
+    description = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+
+def _add_missing_columns(conn, table_name, required_columns):
+    """ALTER TABLE เพิ่มคอลัมน์ที่ยังไม่มี (required_columns: ชื่อ -> DDL) คืนรายชื่อที่เพิ่ม"""
+    existing_columns = {column['name'] for column in inspect(conn).get_columns(table_name)}
+    columns_added = []
+    for column_name, ddl in required_columns.items():
+        if column_name not in existing_columns:
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}"))
+            columns_added.append(column_name)
+    return columns_added
+
+
+def migrate_users_is_active(conn):
+    """เพิ่ม column is_active ให้ user เดิม (เดิมคือ migrate_db.py)"""
+    _add_missing_columns(conn, 'users', {'is_active': 'BOOLEAN DEFAULT TRUE'})
+    conn.execute(text("UPDATE users SET is_active = TRUE WHERE is_active IS NULL"))
+
+
+def migrate_price_checks_customer_type(conn):
+    """เพิ่ม columns customer_type และ has_fixed_ip (เดิมคือ migrate_db_v2.py)"""
+    _add_missing_columns(conn, 'price_checks', {
+        'customer_type': "VARCHAR DEFAULT 'residential'",
+        'has_fixed_ip': 'BOOLEAN DEFAULT FALSE',
+    })
+    conn.execute(text(
+        "UPDATE price_checks SET customer_type = 'residential' WHERE customer_type IS NULL"
+    ))
+
+
+def ensure_price_checks_schema(conn):
+    """Ensure legacy databases include all required columns for price_checks."""
     # column_name -> (DDL snippet, default value)
     required_columns = {
         'reference_id': ('TEXT', None),
@@ -150,47 +314,225 @@ def ensure_price_checks_schema():
         'notes': ('TEXT', '')
     }
 
-    columns_added = []
-
-    with engine.begin() as conn:
-        for column_name, (ddl, _) in required_columns.items():
-            if column_name not in existing_columns:
-                conn.execute(text(f"ALTER TABLE price_checks ADD COLUMN {column_name} {ddl}"))
-                columns_added.append(column_name)
-
-        # Populate defaults for nullable columns (including freshly added ones)
-        for column_name, (_, default_value) in required_columns.items():
-            if default_value is None and column_name != 'reference_id':
-                continue
-            if column_name == 'reference_id':
-                rows = conn.execute(text(
-                    "SELECT id FROM price_checks WHERE reference_id IS NULL OR reference_id = ''"
-                )).fetchall()
-                for row in rows:
-                    conn.execute(
-                        text("UPDATE price_checks SET reference_id = :ref WHERE id = :id"),
-                        {"ref": str(uuid.uuid4()), "id": row.id}
-                    )
-            else:
-                conn.execute(
-                    text(
-                        f"UPDATE price_checks SET {column_name} = :default "
-                        f"WHERE {column_name} IS NULL"
-                    ),
-                    {"default": default_value}
-                )
+    _add_missing_columns(conn, 'price_checks', {
+        column_name: ddl for column_name, (ddl, _) in required_columns.items()
+    })
 
-        # Ensure unique index for reference IDs once column exists
-        if 'reference_id' in existing_columns or 'reference_id' in columns_added:
+    # Populate defaults for nullable columns (including freshly added ones)
+    for column_name, (_, default_value) in required_columns.items():
+        if default_value is None and column_name != 'reference_id':
+            continue
+        if column_name == 'reference_id':
+            _backfill_reference_ids(conn)
+        else:
             conn.execute(
                 text(
-                    "CREATE UNIQUE INDEX IF NOT EXISTS idx_price_checks_reference_id "
-                    "ON price_checks(reference_id)"
-                )
+                    f"UPDATE price_checks SET {column_name} = :default "
+                    f"WHERE {column_name} IS NULL"
+                ),
+                {"default": default_value}
             )
 
+    # Ensure unique index for reference IDs
+    conn.execute(
+        text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_price_checks_reference_id "
+            "ON price_checks(reference_id)"
+        )
+    )
+
+
+def _backfill_reference_ids(conn, chunk_size=1000):
+    """เติม reference_id ที่ว่างทีละ chunk ด้วย executemany (แทน UPDATE ทีละแถว)"""
+    last_id = 0
+    while True:
+        ids = conn.execute(
+            text(
+                "SELECT id FROM price_checks "
+                "WHERE id > :last_id AND (reference_id IS NULL OR reference_id = '') "
+                "ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": chunk_size}
+        ).scalars().all()
+        if not ids:
+            return
+        conn.execute(
+            text("UPDATE price_checks SET reference_id = :ref WHERE id = :id"),
+            [{"ref": ref, "id": row_id} for ref, row_id in zip(new_reference_ids(len(ids)), ids)]
+        )
+        last_id = ids[-1]
+
+
+def ensure_price_checks_indexes(conn):
+    """สร้าง index ของ price_checks ที่ยังไม่มี (คืนรายชื่อ index ที่สร้างใหม่)"""
+    inspector = inspect(conn)
+    existing_indexes = {index['name'] for index in inspector.get_indexes('price_checks')}
+    existing_columns = {column['name'] for column in inspector.get_columns('price_checks')}
+    created = []
+
+    for index in PriceCheck.__table__.indexes:
+        # index บนคอลัมน์ที่ migration ถัดไปจะเพิ่ม จะถูกสร้างโดย migration นั้น
+        if not {column.name for column in index.columns} <= existing_columns:
+            continue
+        if index.name not in existing_indexes:
+            index.create(bind=conn, checkfirst=True)
+            created.append(index.name)
 
-ensure_price_checks_schema()
+    for index_name in OBSOLETE_PRICE_CHECK_INDEXES:
+        if index_name in existing_indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+    return created
+
+
+def create_daily_stats_tables(conn):
+    """ตาราง rollup รายวันและ watermark"""
+    PriceCheckDailyStats.__table__.create(bind=conn, checkfirst=True)
+    RollupWatermark.__table__.create(bind=conn, checkfirst=True)
+
+
+def create_data_migration_checkpoints(conn):
+    """ตาราง checkpoint ของ data migration แบบ chunk"""
+    DataMigrationCheckpoint.__table__.create(bind=conn, checkfirst=True)
+
+
+def create_price_check_archives(conn):
+    """ตารางทะเบียน archive รายปี (ตาราง archive แต่ละปีสร้างตอน archive ครั้งแรก)"""
+    PriceCheckArchive.__table__.create(bind=conn, checkfirst=True)
+
+
+def create_rendered_documents(conn):
+    """ตาราง cache ของเอกสารที่ render แล้ว"""
+    RenderedDocument.__table__.create(bind=conn, checkfirst=True)
+
+
+PRICE_CHECKS_FTS = 'price_checks_fts'
+PRICE_CHECKS_FTS_COLUMNS = ('notes', 'equipment', 'user_email')
+
+def create_price_checks_fts(conn):
+    """
+    FTS5 index (external content) ของ notes / equipment / user_email พร้อม trigger ให้ sync กับ price_checks
+
+    ใช้ tokenizer trigram (SQLite 3.34+) เพื่อค้นคำบางส่วนได้ รวมถึงข้อความภาษาไทยที่ไม่เว้นวรรค
+    ฐานข้อมูลที่ไม่ใช่ SQLite หรือ SQLite ที่ไม่มี FTS5 จะข้ามไป (search_price_checks ใช้ LIKE แทน)
+    """
+    if conn.dialect.name != 'sqlite':
+        return
+    tokenizer = 'trigram' if sqlite3.sqlite_version_info >= (3, 34) else 'unicode61'
+    columns = ', '.join(PRICE_CHECKS_FTS_COLUMNS)
+    new_values = ', '.join(f'new.{name}' for name in PRICE_CHECKS_FTS_COLUMNS)
+    old_values = ', '.join(f'old.{name}' for name in PRICE_CHECKS_FTS_COLUMNS)
+
+    try:
+        conn.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {PRICE_CHECKS_FTS} USING fts5("
+            f"{columns}, content='price_checks', content_rowid='id', tokenize='{tokenizer}')"
+        )
+    except exc.OperationalError:
+        # SQLite ที่ compile มาโดยไม่มี FTS5
+        return
+
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {PRICE_CHECKS_FTS}_ai AFTER INSERT ON price_checks BEGIN "
+        f"INSERT INTO {PRICE_CHECKS_FTS}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {PRICE_CHECKS_FTS}_ad AFTER DELETE ON price_checks BEGIN "
+        f"INSERT INTO {PRICE_CHECKS_FTS}({PRICE_CHECKS_FTS}, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {old_values}); END"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {PRICE_CHECKS_FTS}_au AFTER UPDATE OF {columns} ON price_checks BEGIN "
+        f"INSERT INTO {PRICE_CHECKS_FTS}({PRICE_CHECKS_FTS}, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {PRICE_CHECKS_FTS}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+    )
+    # index แถวที่มีอยู่แล้ว
+    conn.exec_driver_sql(f"INSERT INTO {PRICE_CHECKS_FTS}({PRICE_CHECKS_FTS}) VALUES ('rebuild')")
+
+
+def add_price_check_dictionaries(conn):
+    """
+    ตาราง equipment_skus / price_check_equipment
+
+    เติมข้อมูลแถวเดิมด้วย backfill_price_check_dictionaries() (ทีละ chunk นอก migration)
+    """
+    EquipmentSku.__table__.create(bind=conn, checkfirst=True)
+    PriceCheckEquipment.__table__.create(bind=conn, checkfirst=True)
+    ensure_price_checks_indexes(conn)
+
+
+# Migration ตามลำดับ: (version, คำอธิบาย, function(conn))
+# ทุก migration ต้อง idempotent (รันซ้ำบน schema ที่มีอยู่แล้วได้) และห้ามแก้ version ที่ปล่อยไปแล้ว
+# เพิ่ม migration ใหม่ต่อท้ายเสมอ
+MIGRATIONS = [
+    (1, "users.is_active", migrate_users_is_active),
+    (2, "price_checks.customer_type / has_fixed_ip", migrate_price_checks_customer_type),
+    (3, "price_checks v2 columns and reference_id", ensure_price_checks_schema),
+    (4, "price_checks history indexes", ensure_price_checks_indexes),
+    (5, "price_check_daily_stats rollup", create_daily_stats_tables),
+    (6, "data_migration_checkpoints", create_data_migration_checkpoints),
+    (7, "price_check_archives registry", create_price_check_archives),
+    (8, "price_checks_fts full-text index", create_price_checks_fts),
+    (9, "equipment SKU link table", add_price_check_dictionaries),
+    (10, "rendered_documents cache", create_rendered_documents),
+]
+
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version():
+    """
+    version ปัจจุบันของ schema (0 = ยังไม่เคย migrate ด้วยระบบ version)
+
+    คืน 0 เฉพาะเมื่อยังไม่มีตาราง schema_version - error อื่น (เช่น database is locked) ถูกส่งต่อ
+    เพื่อไม่ให้ run_migrations() apply migration ทั้งหมดซ้ำบนฐานข้อมูลที่ไม่ว่าง
+    """
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(SchemaVersion.__tablename__):
+            return 0
+        return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+
+def run_migrations(verbose=False):
+    """
+    Apply migration ที่ยังไม่ได้ apply ตามลำดับ (แต่ละ migration เป็น transaction ของตัวเอง)
+
+    ถ้า schema เป็นเวอร์ชันล่าสุดแล้วจะอ่านแค่ version number แล้วจบ
+
+    Returns:
+        list: (version, description) ของ migration ที่ apply ในครั้งนี้
+    """
+    current_version = get_schema_version()
+    if current_version >= LATEST_SCHEMA_VERSION:
+        return []
+
+    # สร้างตารางที่ยังไม่มี (ฐานข้อมูลใหม่จะได้ schema ล่าสุดทั้งหมดจากขั้นตอนนี้)
+    Base.metadata.create_all(engine)
+
+    applied = []
+    for version, description, migration in MIGRATIONS:
+        if version <= current_version:
+            continue
+        if verbose:
+            print(f"🔄 Migration {version}: {description}")
+        with engine.begin() as conn:
+            migration(conn)
+            # process อื่นอาจ apply version นี้ไปพร้อมกัน (migration idempotent จึงไม่เป็นไร)
+            already_applied = conn.execute(
+                text("SELECT 1 FROM schema_version WHERE version = :version"),
+                {"version": version}
+            ).first()
+            if not already_applied:
+                conn.execute(insert(SchemaVersion.__table__).values(
+                    version=version, description=description, applied_at=datetime.utcnow()
+                ))
+        applied.append((version, description))
+
+    return applied
+
+
+run_migrations()
 
 def get_db():
     db = SessionLocal()
@@ -247,6 +589,76 @@ def verify_otp(email, otp_code):
     finally:
         db.close()
 
+def new_reference_id():
+    """สร้าง reference ID ใหม่ (UUID4 หรือ compact ตาม REFERENCE_ID_FORMAT)"""
+    return reference_format.new_reference_ids(1)[0]
+
+def new_reference_ids(count):
+    """สร้าง reference ID หลายตัวในครั้งเดียว (แบบ compact เรียงตามลำดับใน list)"""
+    return reference_format.new_reference_ids(count)
+
+def price_check_row(
+    user_email, customer_type, speed, distance, equipment, 
+    contract_months, has_fixed_ip, proposed_price, discount_percent,
+    floor_existing, floor_new, floor_weighted,
+    existing_customer_ratio, new_customer_ratio,
+    net_revenue, regulator_fee,
+    is_valid_existing, is_valid_new, is_valid_weighted,
+    margin_existing_baht, margin_existing_percent,
+    margin_new_baht, margin_new_percent,
+    margin_weighted_baht, margin_weighted_percent,
+    floor_price=None,
+    ip_address=None, notes=None,
+    reference_id=None, checked_at=None
+):
+    """
+    สร้าง dict ค่าคอลัมน์ของ price_checks หนึ่งแถว
+
+    reference_id / checked_at ไม่ระบุ = สร้างใหม่ / เวลาปัจจุบัน (ระบุได้สำหรับ import ข้อมูลย้อนหลัง)
+    """
+    return {
+        'reference_id': reference_id or new_reference_id(),
+        'user_email': user_email,
+        'checked_at': checked_at or datetime.utcnow(),
+        'customer_type': customer_type,
+        'speed': speed,
+        'distance': distance,
+        'equipment': equipment,
+        'contract_months': contract_months,
+        'has_fixed_ip': has_fixed_ip,
+        'proposed_price': proposed_price,
+        'discount_percent': discount_percent,
+        'floor_existing': floor_existing,
+        'floor_new': floor_new,
+        'floor_weighted': floor_weighted,
+        'existing_customer_ratio': existing_customer_ratio,
+        'new_customer_ratio': new_customer_ratio,
+        'net_revenue': net_revenue,
+        'regulator_fee': regulator_fee,
+        'is_valid_existing': is_valid_existing,
+        'is_valid_new': is_valid_new,
+        'is_valid_weighted': is_valid_weighted,
+        'margin_existing_baht': margin_existing_baht,
+        'margin_existing_percent': margin_existing_percent,
+        'margin_new_baht': margin_new_baht,
+        'margin_new_percent': margin_new_percent,
+        'margin_weighted_baht': margin_weighted_baht,
+        'margin_weighted_percent': margin_weighted_percent,
+        'is_valid': is_valid_weighted,
+        'floor_price': floor_price if floor_price is not None else floor_weighted,
+        'ip_address': ip_address,
+        'notes': notes,
+        'export_count': 0
+    }
+
+def build_price_check(**fields):
+    """
+    สร้าง PriceCheck (ยังไม่บันทึก) พร้อม reference ID และเวลาตรวจสอบ
+
+    รับ keyword arguments เดียวกับ price_check_row()
+    """
+    return PriceCheck(**price_check_row(**fields))
+
 def log_price_check_comprehensive(
     user_email, customer_type, speed, distance, equipment, 
     contract_months, has_fixed_ip, proposed_price, discount_percent,
@@ -258,57 +670,252 @@ def log_price_check_comprehensive(
     margin_new_baht, margin_new_percent,
     margin_weighted_baht, margin_weighted_percent,
     floor_price=None,
-    ip_address=None, notes=None
+    ip_address=None, notes=None,
+    reference_id=None, checked_at=None
 ):
     """
     บันทึกการตรวจสอบราคาแบบครบถ้วน (รองรับระบบใหม่)
     """
     db = SessionLocal()
     try:
-        # Generate unique reference ID
-        reference_id = str(uuid.uuid4())
-        
-        log = PriceCheck(
-            reference_id=reference_id,
-            user_email=user_email,
-            customer_type=customer_type,
-            speed=speed,
-            distance=distance,
-            equipment=equipment,
-            contract_months=contract_months,
-            has_fixed_ip=has_fixed_ip,
-            proposed_price=proposed_price,
-            discount_percent=discount_percent,
-            floor_existing=floor_existing,
-            floor_new=floor_new,
-            floor_weighted=floor_weighted,
-            existing_customer_ratio=existing_customer_ratio,
-            new_customer_ratio=new_customer_ratio,
-            net_revenue=net_revenue,
-            regulator_fee=regulator_fee,
-            is_valid_existing=is_valid_existing,
-            is_valid_new=is_valid_new,
+        log = build_price_check(
+            user_email=user_email, customer_type=customer_type, speed=speed, distance=distance,
+            equipment=equipment, contract_months=contract_months, has_fixed_ip=has_fixed_ip,
+            proposed_price=proposed_price, discount_percent=discount_percent,
+            floor_existing=floor_existing, floor_new=floor_new, floor_weighted=floor_weighted,
+            existing_customer_ratio=existing_customer_ratio, new_customer_ratio=new_customer_ratio,
+            net_revenue=net_revenue, regulator_fee=regulator_fee,
+            is_valid_existing=is_valid_existing, is_valid_new=is_valid_new,
             is_valid_weighted=is_valid_weighted,
-            margin_existing_baht=margin_existing_baht,
-            margin_existing_percent=margin_existing_percent,
-            margin_new_baht=margin_new_baht,
-            margin_new_percent=margin_new_percent,
-            margin_weighted_baht=margin_weighted_baht,
-            margin_weighted_percent=margin_weighted_percent,
-            is_valid=is_valid_weighted,
-            floor_price=floor_price if floor_price is not None else floor_weighted,
-            ip_address=ip_address,
-            notes=notes
+            margin_existing_baht=margin_existing_baht, margin_existing_percent=margin_existing_percent,
+            margin_new_baht=margin_new_baht, margin_new_percent=margin_new_percent,
+            margin_weighted_baht=margin_weighted_baht, margin_weighted_percent=margin_weighted_percent,
+            floor_price=floor_price, ip_address=ip_address, notes=notes,
+            reference_id=reference_id, checked_at=checked_at
         )
         
         db.add(log)
+        db.flush()  # เพื่อดึง ID กลับมา
+        _link_equipment(db, [log])
+        _advance_daily_stats(db, [log])
+        _notify_reference_listeners([log.reference_id])
         db.commit()
-        db.refresh(log)  # เพื่อดึง ID กลับมา
+        db.refresh(log)
         
         return log
     finally:
         db.close()
 
+def price_check_values(log):
+    """แปลง PriceCheck เป็น dict ของค่าคอลัมน์ (ส่งข้าม thread/process ได้อย่างปลอดภัย)"""
+    return {column.key: getattr(log, column.key) for column in PriceCheck.__table__.columns}
+
+def _insert_price_check_rows(db, rows, chunk_size=1000):
+    """INSERT หลายแถวด้วย Core executemany (ไม่สร้าง ORM object / ไม่ refresh) พร้อมอัปเดต rollup"""
+    table = PriceCheck.__table__
+    statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        ids = db.execute(statement, chunk).scalars().all()
+        logs = [SimpleNamespace(id=row_id, **row) for row_id, row in zip(ids, chunk)]
+        _link_equipment(db, logs)
+        _advance_daily_stats(db, logs)
+        _notify_reference_listeners([row['reference_id'] for row in chunk])
+
+# callback(reference_ids) ที่ถูกเรียกเมื่อมี price check ใหม่ใน process นี้ (เช่น Bloom filter ของ reference ID)
+# เรียกก่อน commit: ถ้า transaction ถูก rollback ผู้รับจะเห็น ID ที่ไม่มีอยู่จริง จึงใช้ได้กับโครงสร้างที่ยอมให้ false positive เท่านั้น
+_reference_listeners = []
+
+def add_reference_listener(callback):
+    """ลงทะเบียน callback(reference_ids) สำหรับ price check ที่บันทึกใน process นี้"""
+    _reference_listeners.append(callback)
+
+def _notify_reference_listeners(reference_ids):
+    for callback in _reference_listeners:
+        callback(reference_ids)
+
+def iter_reference_ids(after_id=0, batch_size=10000, include_archives=False, bind=None):
+    """
+    (id, reference_id) ของ price_checks ที่ id > after_id เรียงตาม id แบบ stream
+
+    Args:
+        include_archives: รวม reference ID ในตาราง archive รายปีด้วย (ส่งออกก่อนตารางหลัก)
+        bind: engine ที่ใช้อ่าน (None = primary - ต้องเห็นรายการล่าสุดเสมอ)
+    """
+    table = PriceCheck.__table__
+    with (bind or engine).connect() as conn:
+        conn = conn.execution_options(stream_results=True, yield_per=batch_size)
+        statements = []
+        if include_archives:
+            for year in conn.execute(select(PriceCheckArchive.year)).scalars().all():
+                archive = archive_table(year)
+                statements.append(select(archive.c.id, archive.c.reference_id))
+        statements.append(
+            select(table.c.id, table.c.reference_id).where(table.c.id > after_id).order_by(table.c.id)
+        )
+        for statement in statements:
+            for partition in conn.execute(statement).partitions():
+                yield from partition
+
+# cache ชื่ออุปกรณ์ -> equipment_skus.id (ค่าไม่เปลี่ยนหลังสร้าง) เก็บเฉพาะ SKU ที่ commit แล้ว
+_equipment_sku_cache = {}
+
+@event.listens_for(Session, 'after_commit')
+def _cache_committed_equipment_skus(session):
+    _equipment_sku_cache.update(session.info.pop('equipment_skus', {}))
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_uncommitted_equipment_skus(session):
+    session.info.pop('equipment_skus', None)
+
+def get_equipment_skus():
+    """ชื่ออุปกรณ์ทั้งหมดที่เคยถูกใช้ใน price checks (สำหรับตัวเลือก filter)"""
+    db = _read_session()
+    try:
+        return db.execute(select(EquipmentSku.name).order_by(EquipmentSku.name)).scalars().all()
+    finally:
+        db.close()
+
+def split_equipment(equipment):
+    """แยก price_checks.equipment (ชื่อ SKU คั่นด้วย comma) เป็น list ไม่ซ้ำ"""
+    names = [name.strip() for name in (equipment or '').split(',')]
+    return list(dict.fromkeys(name for name in names if name))
+
+def _equipment_sku_ids(db, names):
+    """
+    map ชื่ออุปกรณ์ -> equipment_skus.id (สร้าง SKU ใหม่ให้ชื่อที่ยังไม่มี)
+
+    id ที่อ่านใน transaction นี้เก็บใน db.info ก่อน และเข้า cache ของ process หลัง commit เท่านั้น
+    (ถ้า rollback SKU ที่เพิ่งสร้างจะไม่มีอยู่จริง)
+    """
+    pending = db.info.setdefault('equipment_skus', {})
+    missing = [name for name in names if name not in _equipment_sku_cache and name not in pending]
+    if missing:
+        table = EquipmentSku.__table__
+        # INSERT ... SELECT ... WHERE NOT EXISTS ใช้ได้ทุก database (ไม่ต้องใช้ OR IGNORE / ON CONFLICT)
+        name_param = bindparam('name', type_=String)
+        db.execute(
+            insert(table).from_select(
+                ['name'], select(name_param).where(~select(table.c.id).where(table.c.name == name_param).exists())
+            ),
+            [{'name': name} for name in missing]
+        )
+        pending.update(db.execute(
+            select(table.c.name, table.c.id).where(table.c.name.in_(missing))
+        ).all())
+    return {name: _equipment_sku_cache.get(name) or pending[name] for name in names}
+
+def _link_equipment(db, logs):
+    """เพิ่มแถว price_check_equipment ของ price check ที่เพิ่ง insert (ต้องมี id และ equipment)"""
+    equipment_by_id = {log.id: split_equipment(log.equipment) for log in logs}
+    sku_ids = _equipment_sku_ids(db, {name for names in equipment_by_id.values() for name in names})
+    links = [
+        {'price_check_id': price_check_id, 'sku_id': sku_ids[name]}
+        for price_check_id, names in equipment_by_id.items()
+        for name in names
+    ]
+    if links:
+        # แถวใหม่หรือแถวที่ยังไม่มี link (backfill) และ split_equipment ตัดชื่อซ้ำแล้ว จึงไม่ชน primary key
+        db.execute(insert(PriceCheckEquipment.__table__), links)
+
+DICTIONARY_BACKFILL = 'price_check_dictionaries'
+
+def backfill_price_check_dictionaries(chunk_size=5000, progress=None):
+    """
+    เติม price_check_equipment ให้ price_checks ที่บันทึกก่อน migration 9
+
+    ทีละ chunk ตาม id พร้อม checkpoint (หยุดแล้วรันต่อได้) แถวที่มีอยู่แล้วไม่ถูกเขียนซ้ำ
+
+    Returns:
+        int: จำนวนแถวที่ประมวลผลในครั้งนี้
+    """
+    table = PriceCheck.__table__
+    processed = 0
+
+    while True:
+        db = SessionLocal()
+        try:
+            checkpoint = _get_or_create_checkpoint(db, DICTIONARY_BACKFILL)
+            rows = db.execute(
+                select(table.c.id, table.c.equipment)
+                .where(table.c.id > checkpoint.last_id)
+                .where(~select(PriceCheckEquipment.price_check_id)
+                       .where(PriceCheckEquipment.price_check_id == table.c.id).exists())
+                .order_by(table.c.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                db.commit()
+                return processed
+
+            _link_equipment(db, rows)
+
+            checkpoint.last_id = rows[-1].id
+            checkpoint.rows_done = (checkpoint.rows_done or 0) + len(rows)
+            checkpoint.updated_at = datetime.utcnow()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        processed += len(rows)
+        if progress:
+            progress(processed)
+
+def persist_price_checks(rows):
+    """
+    บันทึกการตรวจสอบหลายรายการ (dict จาก price_check_values) ใน transaction เดียว
+
+    ใช้โดย write-behind logger (price_check_writer.py) เพื่อ group commit
+    """
+    if not rows:
+        return
+    db = SessionLocal()
+    try:
+        _insert_price_check_rows(db, [
+            {key: value for key, value in row.items() if key != 'id'} for row in rows
+        ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def log_price_checks_bulk(rows, chunk_size=1000):
+    """
+    บันทึกการตรวจสอบจำนวนมากใน transaction เดียว (เช่น import ข้อมูลย้อนหลัง / ผลตรวจแบบ batch)
+
+    Args:
+        rows: list ของ dict ที่มี keyword arguments แบบเดียวกับ log_price_check_comprehensive
+              (ระบุ checked_at ได้สำหรับข้อมูลย้อนหลัง)
+
+    Returns:
+        list: reference_id ของแต่ละแถวตามลำดับ input
+    """
+    if not rows:
+        return []
+
+    reference_ids = new_reference_ids(len(rows))
+    values = [
+        price_check_row(**dict(row, reference_id=row.get('reference_id') or reference_id))
+        for row, reference_id in zip(rows, reference_ids)
+    ]
+
+    db = SessionLocal()
+    try:
+        _insert_price_check_rows(db, values, chunk_size)
+        db.commit()
+        return [row['reference_id'] for row in values]
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
 def log_price_check(user_email, customer_type, speed, distance, equipment, 
                    contract_months, proposed_price, floor_price, is_valid, 
                    margin_percent, has_fixed_ip=False, ip_address=None, notes=None):
@@ -338,14 +945,514 @@ def log_price_check(user_email, customer_type, speed, distance, equipment,
     finally:
         db.close()
 
-def get_price_check_by_reference(reference_id):
-    """ดึงข้อมูลการตรวจสอบจาก reference ID"""
+LEGACY_MIGRATION = 'price_checks_legacy_to_v2'
+
+def _legacy_to_price_check_row(legacy):
+    """
+    แปลง price_checks_legacy หนึ่งแถวเป็นแถว v2 โดยคำนวณรายได้สุทธิ/margin ใหม่ตามกติกา v2
+
+    ระบบเดิมมี floor เดียว (ไม่รวมค่าติดตั้ง) จึงใช้เป็น floor ทั้งสามแบบ และสัดส่วนลูกค้าเดิม 100%
+    """
+    import floor_price as fp
+
+    floor = legacy.floor_price
+    margin = fp.calculate_comprehensive_margin(legacy.proposed_price, floor, 0)
+    revenue = margin['revenue_details']
+
+    return price_check_row(
+        user_email=legacy.user_email,
+        customer_type=legacy.customer_type,
+        speed=legacy.speed,
+        distance=legacy.distance,
+        equipment=legacy.equipment,
+        contract_months=legacy.contract_months,
+        has_fixed_ip=bool(legacy.has_fixed_ip),
+        proposed_price=legacy.proposed_price,
+        discount_percent=0.0,
+        floor_existing=floor,
+        floor_new=floor,
+        floor_weighted=floor,
+        existing_customer_ratio=1.0,
+        new_customer_ratio=0.0,
+        net_revenue=revenue['net_revenue'],
+        regulator_fee=revenue['regulator_fee'],
+        is_valid_existing=margin['is_valid'],
+        is_valid_new=margin['is_valid'],
+        is_valid_weighted=margin['is_valid'],
+        margin_existing_baht=margin['margin_baht'],
+        margin_existing_percent=margin['margin_percent'],
+        margin_new_baht=margin['margin_baht'],
+        margin_new_percent=margin['margin_percent'],
+        margin_weighted_baht=margin['margin_baht'],
+        margin_weighted_percent=margin['margin_percent'],
+        floor_price=floor,
+        ip_address=legacy.ip_address,
+        notes=legacy.notes,
+        checked_at=legacy.checked_at
+    )
+
+def _get_or_create_checkpoint(db, name):
+    checkpoint = db.query(DataMigrationCheckpoint).filter(DataMigrationCheckpoint.name == name).first()
+    if checkpoint is None:
+        checkpoint = DataMigrationCheckpoint(name=name, last_id=0, rows_done=0)
+        db.add(checkpoint)
+    return checkpoint
+
+def get_data_migration_checkpoint(name=LEGACY_MIGRATION):
+    """อ่าน checkpoint ของ data migration (None = ยังไม่เคยเริ่ม)"""
+    db = SessionLocal()
+    try:
+        return db.query(DataMigrationCheckpoint).filter(DataMigrationCheckpoint.name == name).first()
+    finally:
+        db.close()
+
+def migrate_legacy_price_checks(chunk_size=1000, max_chunks=None, pause_seconds=0.0, progress=None):
+    """
+    ย้าย price_checks_legacy เข้า price_checks (v2) ทีละ chunk
+
+    แต่ละ chunk เป็น transaction สั้นๆ ที่ insert แถว v2 และเลื่อน checkpoint ไปพร้อมกัน
+    จึงหยุดกลางทาง (Ctrl+C / error) แล้วรันใหม่ต่อจากเดิมได้โดยไม่ย้ายซ้ำ
+
+    Args:
+        max_chunks: จำนวน chunk สูงสุดในการรันครั้งนี้ (None = จนหมด)
+        pause_seconds: พักระหว่าง chunk เพื่อให้ transaction อื่นได้เขียนฐานข้อมูล
+        progress: callback(rows_done, rows_remaining, rows_per_second) หลังแต่ละ chunk
+
+    Returns:
+        dict: migrated (ครั้งนี้), rows_done (สะสม), remaining, rows_per_second
+    """
+    started = time.monotonic()
+    migrated = 0
+    chunks = 0
+
+    # นับแถวที่เหลือครั้งเดียว แล้วลดตามขนาดแต่ละ chunk (COUNT ทุก chunk ทำให้ทั้งงานเป็น O(n²))
     db = SessionLocal()
     try:
-        return db.query(PriceCheck).filter(PriceCheck.reference_id == reference_id).first()
+        checkpoint = _get_or_create_checkpoint(db, LEGACY_MIGRATION)
+        db.commit()
+        rows_done = checkpoint.rows_done or 0
+        remaining = db.query(func.count(PriceCheckLegacy.id)).filter(
+            PriceCheckLegacy.id > checkpoint.last_id
+        ).scalar()
     finally:
         db.close()
 
+    while remaining and (max_chunks is None or chunks < max_chunks):
+        db = SessionLocal()
+        try:
+            checkpoint = _get_or_create_checkpoint(db, LEGACY_MIGRATION)
+
+            legacy_rows = db.query(PriceCheckLegacy).filter(
+                PriceCheckLegacy.id > checkpoint.last_id
+            ).order_by(PriceCheckLegacy.id).limit(chunk_size).all()
+
+            if legacy_rows:
+                _insert_price_check_rows(db, [_legacy_to_price_check_row(row) for row in legacy_rows])
+                checkpoint.last_id = legacy_rows[-1].id
+                checkpoint.rows_done = (checkpoint.rows_done or 0) + len(legacy_rows)
+                checkpoint.updated_at = datetime.utcnow()
+
+            db.commit()
+
+            rows_done = checkpoint.rows_done
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        if not legacy_rows:
+            remaining = 0
+            break
+
+        migrated += len(legacy_rows)
+        remaining = max(remaining - len(legacy_rows), 0)
+        chunks += 1
+        rate = migrated / max(time.monotonic() - started, 1e-9)
+        if progress:
+            progress(rows_done, remaining, rate)
+        if remaining and pause_seconds:
+            time.sleep(pause_seconds)
+
+    return {
+        'migrated': migrated,
+        'rows_done': rows_done,
+        'remaining': remaining,
+        'rows_per_second': migrated / max(time.monotonic() - started, 1e-9)
+    }
+
+# ตาราง archive รายปีไม่อยู่ใน Base.metadata (create_all จะได้ไม่สร้างทุกปีล่วงหน้า)
+_archive_metadata = MetaData()
+_archive_tables = {}
+
+def archive_table(year):
+    """Table ของ price_checks_archive_<ปี> (คอลัมน์เดียวกับ price_checks, reference_id unique)"""
+    table = _archive_tables.get(year)
+    if table is None:
+        table = Table(
+            f'price_checks_archive_{int(year)}', _archive_metadata,
+            *[column._copy() for column in PriceCheck.__table__.columns]
+        )
+        _archive_tables[year] = table
+    return table
+
+def _archive_years(db):
+    """ปีที่มีตาราง archive (ใหม่สุดก่อน เพราะเอกสารที่ถูกตรวจสอบมักเป็นของปีล่าสุด)"""
+    return db.execute(
+        select(PriceCheckArchive.year).order_by(PriceCheckArchive.year.desc())
+    ).scalars().all()
+
+def archive_price_checks(before, chunk_size=1000, progress=None):
+    """
+    ย้าย price_checks ที่ checked_at < before ไปตาราง archive รายปี ทีละ chunk
+
+    แต่ละ chunk เป็น transaction เดียว (insert เข้า archive + ลบจากตารางหลัก + อัปเดตทะเบียน)
+    rollup รายวันไม่ถูกแตะ กราฟแนวโน้มจึงยังรวมข้อมูลที่ archive แล้ว
+
+    Args:
+        progress: callback(rows_archived) หลังแต่ละ chunk
+
+    Returns:
+        int: จำนวนแถวที่ archive
+    """
+    price_checks = PriceCheck.__table__
+    archived = 0
+
+    while True:
+        db = SessionLocal()
+        try:
+            # ไม่ archive แถวที่มี id สูงสุด: SQLite จะนำ id ที่ถูกลบกลับมาใช้ใหม่
+            # ซึ่งทำให้ watermark ของ rollup และ id ใน archive ชนกันได้
+            max_id = db.execute(select(func.max(price_checks.c.id))).scalar()
+            if max_id is None:
+                break
+
+            rows = db.execute(
+                select(price_checks)
+                .where(price_checks.c.checked_at < before, price_checks.c.id < max_id)
+                .order_by(price_checks.c.id)
+                .limit(chunk_size)
+            ).mappings().all()
+            if not rows:
+                break
+
+            rows_by_year = defaultdict(list)
+            for row in rows:
+                rows_by_year[row['checked_at'].year].append(dict(row))
+
+            for year, year_rows in rows_by_year.items():
+                table = archive_table(year)
+                table.create(bind=db.connection(), checkfirst=True)
+                db.execute(insert(table), year_rows)
+
+                entry = db.get(PriceCheckArchive, year)
+                if entry is None:
+                    entry = PriceCheckArchive(year=year, table_name=table.name, row_count=0)
+                    db.add(entry)
+                first_checked_at = min(row['checked_at'] for row in year_rows)
+                last_checked_at = max(row['checked_at'] for row in year_rows)
+                entry.row_count = (entry.row_count or 0) + len(year_rows)
+                entry.first_checked_at = min(filter(None, [entry.first_checked_at, first_checked_at]))
+                entry.last_checked_at = max(filter(None, [entry.last_checked_at, last_checked_at]))
+
+            archived_ids = [row['id'] for row in rows]
+            db.execute(delete(price_checks).where(price_checks.c.id.in_(archived_ids)))
+            db.execute(delete(PriceCheckEquipment.__table__).where(
+                PriceCheckEquipment.price_check_id.in_(archived_ids)
+            ))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        archived += len(rows)
+        if progress:
+            progress(archived)
+
+    return archived
+
+def get_price_check_archives():
+    """ทะเบียน archive รายปี (สำหรับรายงาน/CLI)"""
+    db = SessionLocal()
+    try:
+        return db.query(PriceCheckArchive).order_by(PriceCheckArchive.year).all()
+    finally:
+        db.close()
+
+def purge_expired_otps(grace=timedelta(days=1)):
+    """ลบ OTP ที่หมดอายุเกิน grace แล้ว (ใช้ยืนยันไม่ได้อีก) คืนจำนวนแถวที่ลบ"""
+    db = SessionLocal()
+    try:
+        result = db.execute(delete(OTP.__table__).where(OTP.expires_at < datetime.utcnow() - grace))
+        db.commit()
+        return result.rowcount
+    finally:
+        db.close()
+
+def purge_migrated_legacy_checks(chunk_size=5000):
+    """
+    ลบ price_checks_legacy ที่ migrate_legacy_price_checks() ย้ายเข้า v2 แล้ว (ตาม checkpoint)
+
+    Returns:
+        int: จำนวนแถวที่ลบ
+    """
+    checkpoint = get_data_migration_checkpoint()
+    if checkpoint is None:
+        return 0
+
+    legacy = PriceCheckLegacy.__table__
+    purged = 0
+    while True:
+        db = SessionLocal()
+        try:
+            ids = db.execute(
+                select(legacy.c.id).where(legacy.c.id <= checkpoint.last_id)
+                .order_by(legacy.c.id).limit(chunk_size)
+            ).scalars().all()
+            if not ids:
+                return purged
+            db.execute(delete(legacy).where(legacy.c.id.in_(ids)))
+            db.commit()
+            purged += len(ids)
+        finally:
+            db.close()
+
+def enable_incremental_vacuum():
+    """
+    เปิด auto_vacuum=INCREMENTAL ของ SQLite (ต้อง VACUUM ทั้งไฟล์หนึ่งครั้ง ซึ่ง lock ฐานข้อมูลระหว่างทำ)
+
+    Returns:
+        bool: False ถ้าไม่ใช่ SQLite
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+    return True
+
+def reclaim_space(max_pages=None):
+    """
+    คืนพื้นที่ว่างของไฟล์ SQLite ด้วย incremental_vacuum (ทีละไม่เกิน max_pages หน้า)
+
+    Returns:
+        int | None: จำนวนหน้าที่คืน (None = ไม่ใช่ SQLite หรือยังไม่ได้เปิด incremental vacuum)
+    """
+    if engine.dialect.name != 'sqlite':
+        return None
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            return None
+        free_before = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        pages = f"({int(max_pages)})" if max_pages else ""
+        # sqlite3.execute() step แค่ครั้งเดียว (คืนได้ทีละหน้า) ส่วน executescript() รันจนจบ
+        conn.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum{pages}")
+        return free_before - conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+
+def _find_archived_price_check(db, reference_id):
+    """ค้น reference ID ในตาราง archive รายปี คืน PriceCheck (transient) หรือ None"""
+    for year in _archive_years(db):
+        table = archive_table(year)
+        row = db.execute(select(table).where(table.c.reference_id == reference_id)).mappings().first()
+        if row:
+            return PriceCheck(**row)
+    return None
+
+def get_price_check_by_reference(reference_id):
+    """
+    ดึงข้อมูลการตรวจสอบจาก reference ID (ค้นต่อใน archive รายปีถ้าไม่อยู่ในตารางหลัก)
+
+    อ่านจาก replica/snapshot ก่อน ถ้าไม่พบ (เช่น เอกสารที่เพิ่งออก ยังไม่เข้า snapshot) ค้นซ้ำที่ primary
+    """
+    reference_id = reference_format.normalize(reference_id)
+    binds = [_read_bind()]
+    if binds[0] is not engine:
+        binds.append(engine)
+
+    for bind in binds:
+        db = ReadSessionLocal(bind=bind)
+        try:
+            log = db.query(PriceCheck).filter(PriceCheck.reference_id == reference_id).first()
+            if log is None:
+                log = _find_archived_price_check(db, reference_id)
+            if log is not None:
+                return log
+        finally:
+            db.close()
+    return None
+
+# คอลัมน์ที่หน้า verification และเอกสารดาวน์โหลดแสดง (ไม่รวม ip_address / id ภายใน)
+VERIFICATION_COLUMNS = (
+    'reference_id', 'user_email', 'checked_at', 'customer_type', 'speed', 'distance', 'equipment',
+    'contract_months', 'has_fixed_ip', 'proposed_price', 'discount_percent',
+    'floor_existing', 'floor_new', 'floor_weighted', 'existing_customer_ratio', 'new_customer_ratio',
+    'net_revenue', 'regulator_fee', 'is_valid_existing', 'is_valid_new', 'is_valid_weighted',
+    'margin_existing_baht', 'margin_existing_percent', 'margin_new_baht', 'margin_new_percent',
+    'margin_weighted_baht', 'margin_weighted_percent', 'exported_at', 'exported_by', 'notes'
+)
+EXPORT_STATUS_COLUMNS = ('exported_at', 'exported_by')
+
+def _lookup_by_reference(db, reference_id, columns):
+    """Row ของคอลัมน์ที่ระบุจากตารางหลัก หรือ archive รายปี (None = ไม่พบ)"""
+    row = db.execute(
+        _projected_select(columns).where(PriceCheck.reference_id == reference_id)
+    ).first()
+    if row is not None:
+        return row
+    for year in _archive_years(db):
+        table = archive_table(year)
+        row = db.execute(
+            select(*[table.c[name] for name in columns]).where(table.c.reference_id == reference_id)
+        ).first()
+        if row is not None:
+            return row
+    return None
+
+def get_verification_record(reference_id, bind=None, columns=VERIFICATION_COLUMNS):
+    """
+    อ่านเฉพาะคอลัมน์ที่หน้า verification ใช้ (Row) จาก reference ID
+
+    Args:
+        bind: engine ที่ใช้อ่าน (None = replica/snapshot แล้วค้นซ้ำที่ primary ถ้าไม่พบ)
+    """
+    reference_id = reference_format.normalize(reference_id)
+    binds = [bind] if bind is not None else [_read_bind()]
+    if bind is None and binds[0] is not engine:
+        binds.append(engine)
+
+    for current in binds:
+        db = ReadSessionLocal(bind=current)
+        try:
+            row = _lookup_by_reference(db, reference_id, columns)
+            if row is not None:
+                return row
+        finally:
+            db.close()
+    return None
+
+# คอลัมน์ของตารางผลตรวจสอบหลายเอกสาร
+BULK_VERIFICATION_COLUMNS = (
+    'reference_id', 'user_email', 'checked_at', 'customer_type', 'speed', 'contract_months',
+    'proposed_price', 'floor_existing', 'floor_new', 'floor_weighted',
+    'is_valid_existing', 'is_valid_new', 'is_valid_weighted', 'exported_at', 'export_count'
+)
+
+def _lookup_by_references(db, reference_ids, columns, chunk_size, found):
+    """เติม found (reference_id -> Row) จากตารางหลักแล้ว archive รายปี ด้วย IN (...) ทีละ chunk"""
+    tables = [PriceCheck.__table__] + [archive_table(year) for year in _archive_years(db)]
+    for table in tables:
+        remaining = [reference_id for reference_id in reference_ids if reference_id not in found]
+        if not remaining:
+            return
+        statement = select(*[table.c[name] for name in columns])
+        for start in range(0, len(remaining), chunk_size):
+            chunk = remaining[start:start + chunk_size]
+            for row in db.execute(statement.where(table.c.reference_id.in_(chunk))):
+                found[row.reference_id] = row
+
+def get_verification_records(reference_ids, bind=None, columns=BULK_VERIFICATION_COLUMNS, chunk_size=500):
+    """
+    อ่านข้อมูลการตรวจสอบของหลาย reference ID ด้วย query แบบ IN (...) ทีละ chunk_size
+
+    Args:
+        bind: engine ที่ใช้อ่าน (None = replica/snapshot แล้วค้น ID ที่ไม่พบซ้ำที่ primary)
+
+    Returns:
+        dict: reference_id -> Row (ID ที่ไม่พบไม่อยู่ใน dict)
+    """
+    if 'reference_id' not in columns:
+        columns = ('reference_id',) + tuple(columns)
+    reference_ids = list(dict.fromkeys(reference_format.normalize(reference_id) for reference_id in reference_ids))
+
+    binds = [bind] if bind is not None else [_read_bind()]
+    if bind is None and binds[0] is not engine:
+        binds.append(engine)
+
+    found = {}
+    for current in binds:
+        db = ReadSessionLocal(bind=current)
+        try:
+            _lookup_by_references(db, reference_ids, columns, chunk_size, found)
+        finally:
+            db.close()
+        if len(found) == len(reference_ids):
+            break
+    return found
+
+# prefix สั้นสุดที่ค้นได้ (ตรงกับ reference_id[:8] ที่หน้าประวัติแสดง) กันการไล่เดา ID ด้วย prefix สั้นๆ
+REFERENCE_PREFIX_MIN_LENGTH = 8
+
+def find_reference_ids_by_prefix(prefix, limit=10, bind=None, min_length=REFERENCE_PREFIX_MIN_LENGTH):
+    """
+    reference ID ที่ขึ้นต้นด้วย prefix (เรียงตามตัวอักษร ไม่เกิน limit รายการ)
+
+    ใช้ range query reference_id >= prefix AND reference_id < prefix ถัดไป บน unique index ของ
+    reference_id (O(log n) ต่อตาราง) ทั้งตารางหลักและ archive รายปี
+    ได้มากกว่าหนึ่งรายการ = prefix กำกวม, prefix สั้นกว่า min_length คืน []
+
+    Args:
+        bind: engine ที่ใช้อ่าน (None = replica/snapshot แล้วค้นซ้ำที่ primary ถ้าไม่พบ)
+    """
+    prefix = reference_format.normalize_prefix(prefix)
+    if len(prefix) < min_length or not reference_format.is_valid_prefix(prefix):
+        return []
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+    binds = [bind] if bind is not None else [_read_bind()]
+    if bind is None and binds[0] is not engine:
+        binds.append(engine)
+
+    for current in binds:
+        db = ReadSessionLocal(bind=current)
+        try:
+            matches = set()
+            for table in [PriceCheck.__table__] + [archive_table(year) for year in _archive_years(db)]:
+                matches.update(db.execute(
+                    select(table.c.reference_id)
+                    .where(table.c.reference_id >= prefix, table.c.reference_id < upper)
+                    .order_by(table.c.reference_id)
+                    .limit(limit)
+                ).scalars())
+            if matches:
+                return sorted(matches)[:limit]
+        finally:
+            db.close()
+    return []
+
+def refresh_read_snapshot(pages=1024, sleep=0.05):
+    """
+    สร้าง/อัปเดตไฟล์ snapshot (READ_SNAPSHOT_PATH) จาก primary ด้วย SQLite online backup API
+
+    เขียนลงไฟล์ชั่วคราวแล้ว rename ทับ: session อ่านที่เปิดอยู่ใช้ไฟล์เดิมจนจบ ส่วน session ใหม่เห็น snapshot ใหม่
+
+    Args:
+        pages: จำนวน page ที่คัดลอกต่อ step (ปล่อย read lock ระหว่าง step ให้ผู้เขียนทำงานได้)
+        sleep: วินาทีที่พักระหว่าง step
+
+    Returns:
+        bool: False ถ้าไม่ได้ตั้ง READ_SNAPSHOT_PATH หรือ primary ไม่ใช่ SQLite
+    """
+    if not Config.READ_SNAPSHOT_PATH or engine.dialect.name != 'sqlite':
+        return False
+
+    snapshot_path = os.path.abspath(Config.READ_SNAPSHOT_PATH)
+    temp_path = f"{snapshot_path}.tmp"
+    source = engine.raw_connection()
+    try:
+        target = sqlite3.connect(temp_path)
+        try:
+            # คัดลอกทีละ step เพื่อไม่ถือ read lock ของ primary ตลอดการคัดลอกไฟล์ใหญ่
+            # ถ้ามีการเขียนระหว่าง step SQLite จะเริ่ม backup ใหม่เอง ผลลัพธ์จึงยัง consistent
+            source.driver_connection.backup(target, pages=pages, sleep=sleep)
+        finally:
+            target.close()
+    finally:
+        source.close()
+    os.replace(temp_path, snapshot_path)
+    return True
+
 def mark_as_exported(reference_id, exported_by):
     """บันทึกว่ามีการ export เอกสารแล้ว"""
     db = SessionLocal()
@@ -357,13 +1464,118 @@ def mark_as_exported(reference_id, exported_by):
             log.export_count = (log.export_count or 0) + 1
             db.commit()
             return True
+
+        # เอกสารที่ archive แล้ว
+        for year in _archive_years(db):
+            table = archive_table(year)
+            result = db.execute(
+                update(table).where(table.c.reference_id == reference_id).values(
+                    exported_at=datetime.utcnow(),
+                    exported_by=exported_by,
+                    export_count=func.coalesce(table.c.export_count, 0) + 1
+                )
+            )
+            if result.rowcount:
+                db.commit()
+                return True
         return False
     finally:
         db.close()
 
+def get_rendered_document(cache_key, bind=None):
+    """
+    เอกสารที่ render แล้วจาก cache (Row ของ content แบบ gzip, etag, size) หรือ None
+
+    Args:
+        bind: engine ที่ใช้อ่าน (None = replica/snapshot แล้วค้นซ้ำที่ primary ถ้าไม่พบ)
+    """
+    table = RenderedDocument.__table__
+    binds = [bind] if bind is not None else [_read_bind()]
+    if bind is None and binds[0] is not engine:
+        binds.append(engine)
+
+    for current in binds:
+        with current.connect() as conn:
+            row = conn.execute(
+                select(table.c.content, table.c.etag, table.c.size).where(table.c.cache_key == cache_key)
+            ).first()
+        if row is not None:
+            return row
+    return None
+
+def save_rendered_document(cache_key, reference_id, fmt, template_version, content, etag, size):
+    """บันทึกเอกสารที่ render แล้ว (มีอยู่แล้ว = ไม่เขียนทับ เพราะเนื้อหาเหมือนกัน)"""
+    db = SessionLocal()
+    try:
+        db.execute(
+            insert(RenderedDocument.__table__).prefix_with('OR IGNORE', dialect='sqlite').values(
+                cache_key=cache_key, reference_id=reference_id, format=fmt,
+                template_version=template_version, content=content, etag=etag, size=size, created_at=datetime.utcnow()
+            )
+        )
+        db.commit()
+    except exc.IntegrityError:
+        # database อื่นที่ไม่มี OR IGNORE: process อื่นบันทึกไปก่อนแล้ว
+        db.rollback()
+    finally:
+        db.close()
+
+def purge_rendered_documents(template_version=None):
+    """
+    ลบเอกสารใน cache (template_version = ลบเฉพาะที่ไม่ใช่เวอร์ชันนี้ หลังเปลี่ยน template)
+
+    Returns:
+        int: จำนวนที่ลบ
+    """
+    table = RenderedDocument.__table__
+    statement = delete(table)
+    if template_version is not None:
+        statement = statement.where(table.c.template_version != template_version)
+    db = SessionLocal()
+    try:
+        deleted = db.execute(statement).rowcount
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+def mark_many_as_exported(reference_ids, exported_by, chunk_size=500):
+    """
+    บันทึกการ export หลายเอกสารด้วย UPDATE ... WHERE reference_id IN (...) ทีละ chunk
+    (ตารางหลักก่อน แล้ว archive รายปีเมื่อยังอัปเดตไม่ครบ)
+
+    Returns:
+        int: จำนวนแถวที่อัปเดต
+    """
+    reference_ids = list(dict.fromkeys(reference_ids))
+    exported_at = datetime.utcnow()
+    updated = 0
+    db = SessionLocal()
+    try:
+        tables = [PriceCheck.__table__] + [archive_table(year) for year in _archive_years(db)]
+        for start in range(0, len(reference_ids), chunk_size):
+            chunk = reference_ids[start:start + chunk_size]
+            remaining = len(chunk)
+            for table in tables:
+                result = db.execute(
+                    update(table).where(table.c.reference_id.in_(chunk)).values(
+                        exported_at=exported_at,
+                        exported_by=exported_by,
+                        export_count=func.coalesce(table.c.export_count, 0) + 1
+                    )
+                )
+                remaining -= result.rowcount
+                updated += result.rowcount
+                if remaining <= 0:
+                    break
+            db.commit()
+        return updated
+    finally:
+        db.close()
+
 def get_all_logs(limit=100):
     """ดึง log ทั้งหมด (แบบใหม่)"""
-    db = SessionLocal()
+    db = _read_session()
     try:
         return db.query(PriceCheck).order_by(PriceCheck.checked_at.desc()).limit(limit).all()
     finally:
@@ -371,7 +1583,7 @@ def get_all_logs(limit=100):
 
 def get_all_logs_legacy(limit=100):
     """ดึง log ทั้งหมด (แบบเดิม)"""
-    db = SessionLocal()
+    db = _read_session()
     try:
         return db.query(PriceCheckLegacy).order_by(PriceCheckLegacy.checked_at.desc()).limit(limit).all()
     finally:
@@ -379,7 +1591,7 @@ def get_all_logs_legacy(limit=100):
 
 def get_user_logs(email, limit=50):
     """แสดงประวัติการตรวจสอบของ user (แบบใหม่)"""
-    db = SessionLocal()
+    db = _read_session()
     try:
         return db.query(PriceCheck).filter(
             PriceCheck.user_email == email
@@ -387,6 +1599,595 @@ def get_user_logs(email, limit=50):
     finally:
         db.close()
 
+def _filter_price_checks(query, user_email=None, customer_type=None, is_valid=None,
+                         date_from=None, date_to=None, equipment=None):
+    """
+    ใส่เงื่อนไข filter มาตรฐานของ price_checks (date_from รวม, date_to ไม่รวม)
+
+    equipment: ชื่อ SKU หนึ่งตัว - ค้นผ่าน index ของ price_check_equipment
+    """
+    if user_email:
+        query = query.filter(PriceCheck.user_email == user_email)
+    if equipment:
+        query = query.filter(PriceCheck.id.in_(
+            select(PriceCheckEquipment.price_check_id)
+            .join(EquipmentSku, EquipmentSku.id == PriceCheckEquipment.sku_id)
+            .where(EquipmentSku.name == equipment)
+        ))
+    if customer_type:
+        query = query.filter(PriceCheck.customer_type == customer_type)
+    if is_valid is not None:
+        query = query.filter(PriceCheck.is_valid_weighted == is_valid)
+    if date_from is not None:
+        query = query.filter(PriceCheck.checked_at >= date_from)
+    if date_to is not None:
+        query = query.filter(PriceCheck.checked_at < date_to)
+    return query
+
+# ชุดคอลัมน์ที่แต่ละหน้าจอใช้จริง (อ่านเฉพาะคอลัมน์เหล่านี้แทน ORM object เต็มแถว)
+HISTORY_COLUMNS = (
+    'id', 'reference_id', 'checked_at', 'customer_type', 'speed', 'proposed_price',
+    'discount_percent', 'floor_weighted', 'margin_weighted_percent', 'is_valid_weighted',
+    'exported_at'
+)
+ADMIN_LOG_COLUMNS = (
+    'id', 'checked_at', 'user_email', 'customer_type', 'speed', 'distance', 'has_fixed_ip',
+    'equipment', 'contract_months', 'proposed_price', 'floor_weighted', 'is_valid_weighted',
+    'margin_weighted_percent', 'notes'
+)
+
+_projected_selects = {}
+
+def _projected_select(columns):
+    """SELECT เฉพาะคอลัมน์ที่ระบุ (สร้างครั้งเดียวต่อชุดคอลัมน์ แล้วใช้ compiled cache ของ SQLAlchemy ซ้ำ)"""
+    columns = tuple(columns)
+    statement = _projected_selects.get(columns)
+    if statement is None:
+        table = PriceCheck.__table__
+        statement = select(*[table.c[name] for name in columns])
+        _projected_selects[columns] = statement
+    return statement
+
+def get_price_checks_page(limit=50, cursor=None, user_email=None, customer_type=None,
+                          is_valid=None, date_from=None, date_to=None, equipment=None,
+                          columns=None):
+    """
+    ดึงประวัติการตรวจสอบทีละหน้าแบบ keyset บน (checked_at, id) เรียงจากใหม่ไปเก่า
+
+    Args:
+        cursor: (checked_at, id) ของแถวสุดท้ายในหน้าก่อนหน้า (None = หน้าแรก)
+        is_valid: True/False เพื่อกรองผลถัวเฉลี่ยผ่าน/ไม่ผ่าน (None = ทั้งหมด)
+        date_from, date_to: ช่วงเวลา checked_at (date_from รวม, date_to ไม่รวม)
+        equipment: ชื่ออุปกรณ์ (SKU) ที่ต้องมีใน price check
+        columns: ชื่อคอลัมน์ที่ต้องการ (เช่น HISTORY_COLUMNS) - ระบุแล้วจะได้ Row
+                 (tuple ที่อ้างด้วยชื่อคอลัมน์ได้) แทน PriceCheck object; None = ทุกคอลัมน์
+
+    Returns:
+        tuple: (logs, next_cursor) - next_cursor เป็น None เมื่อไม่มีหน้าถัดไป
+    """
+    db = _read_session()
+    try:
+        if columns is None:
+            query = db.query(PriceCheck)
+        else:
+            # cursor ต้องใช้ checked_at และ id เสมอ
+            columns = tuple(columns) + tuple(name for name in ('checked_at', 'id') if name not in columns)
+            query = _projected_select(columns)
+
+        query = _filter_price_checks(
+            query, user_email, customer_type, is_valid, date_from, date_to, equipment
+        )
+        if cursor is not None:
+            query = query.filter(tuple_(PriceCheck.checked_at, PriceCheck.id) < tuple(cursor))
+
+        # ดึงเกินมา 1 แถวเพื่อรู้ว่ามีหน้าถัดไปหรือไม่ (ไม่ต้อง COUNT)
+        query = query.order_by(PriceCheck.checked_at.desc(), PriceCheck.id.desc()).limit(limit + 1)
+        logs = query.all() if columns is None else db.execute(query).all()
+
+        next_cursor = None
+        if len(logs) > limit:
+            logs = logs[:limit]
+            next_cursor = (logs[-1].checked_at, logs[-1].id)
+        return logs, next_cursor
+    finally:
+        db.close()
+
+_price_checks_fts = table(PRICE_CHECKS_FTS, column('rowid'))
+_fts_available = {}  # engine -> มีตาราง FTS5 หรือไม่
+
+def _has_price_checks_fts(db):
+    """มีตาราง FTS5 ใน database ที่ session นี้อ่านหรือไม่ (ตรวจครั้งเดียวต่อ engine - primary กับ snapshot แยกกัน)"""
+    bind = db.get_bind()
+    available = _fts_available.get(bind)
+    if available is None:
+        available = bind.dialect.name == 'sqlite' and db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": PRICE_CHECKS_FTS}
+        ).first() is not None
+        _fts_available[bind] = available
+    return available
+
+def _fts_query(terms):
+    """
+    แปลงคำค้นเป็น FTS5 query: ทุกคำต้องพบ (AND) และแต่ละคำเป็น phrase
+    (กันไม่ให้ตัวอักษรพิเศษของ FTS5 เช่น - * : ถูกตีความ) ทุกคำต้องยาวอย่างน้อย 3 ตัวอักษร (trigram)
+    """
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+def search_price_checks(search_text, limit=50, user_email=None, customer_type=None, is_valid=None,
+                        date_from=None, date_to=None, equipment=None, columns=None):
+    """
+    ค้นประวัติการตรวจสอบจาก notes / equipment / user_email เรียงตามความเกี่ยวข้อง (bm25)
+
+    ทุกคำต้องพบ (AND) ใช้ FTS5 index กับคำที่ยาวอย่างน้อย 3 ตัวอักษร ส่วนคำที่สั้นกว่า
+    (trigram ค้นไม่ได้) เพิ่มเป็นเงื่อนไข LIKE ไม่มี FTS5 หรือทุกคำสั้น = LIKE ทั้งหมด เรียงจากใหม่ไปเก่า
+    filter และ columns ใช้แบบเดียวกับ get_price_checks_page()
+    """
+    search_text = (search_text or '').strip()
+    if not search_text:
+        return []
+
+    db = _read_session()
+    try:
+        query = db.query(PriceCheck) if columns is None else _projected_select(columns)
+        query = _filter_price_checks(
+            query, user_email, customer_type, is_valid, date_from, date_to, equipment
+        )
+
+        terms = search_text.split()
+        fts_terms = [term for term in terms if len(term) >= 3]
+        like_terms = terms
+        if fts_terms and _has_price_checks_fts(db):
+            fts_table = literal_column(PRICE_CHECKS_FTS)
+            query = query.join(_price_checks_fts, _price_checks_fts.c.rowid == PriceCheck.id)\
+                .filter(fts_table.op('MATCH')(_fts_query(fts_terms)))\
+                .order_by(func.bm25(fts_table))
+            like_terms = [term for term in terms if len(term) < 3]
+        else:
+            query = query.order_by(PriceCheck.checked_at.desc(), PriceCheck.id.desc())
+
+        for term in like_terms:
+            query = query.filter(or_(*[
+                getattr(PriceCheck, name).icontains(term, autoescape=True) for name in PRICE_CHECKS_FTS_COLUMNS
+            ]))
+
+        query = query.limit(limit)
+        return query.all() if columns is None else db.execute(query).all()
+    finally:
+        db.close()
+
+def iter_price_checks(batch_size=1000, columns=None, user_email=None, customer_type=None,
+                      is_valid=None, date_from=None, date_to=None, equipment=None):
+    """
+    วนอ่าน price_checks ทีละแถว (เรียงตาม checked_at, id) โดยไม่โหลดทั้งตารางเข้าหน่วยความจำ
+
+    ใช้ server-side cursor (stream_results) + yield_per จึงถือข้อมูลครั้งละไม่เกิน batch_size แถว
+
+    Yields:
+        Row ของคอลัมน์ที่ระบุ (None = ทุกคอลัมน์)
+    """
+    table = PriceCheck.__table__
+    columns = tuple(columns) if columns else tuple(column.key for column in table.columns)
+    statement = _filter_price_checks(
+        _projected_select(columns), user_email, customer_type, is_valid, date_from, date_to, equipment
+    ).order_by(PriceCheck.checked_at, PriceCheck.id)
+
+    with _read_bind().connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+        for partition in result.partitions():
+            yield from partition
+
+def _archive_page_statement(table, columns, user_email=None, customer_type=None, is_valid=None,
+                            date_from=None, date_to=None, equipment=None):
+    """SELECT ของตาราง archive รายปีพร้อม filter แบบเดียวกับ _filter_price_checks"""
+    statement = select(*[table.c[name] for name in columns])
+    if user_email:
+        statement = statement.where(table.c.user_email == user_email)
+    if equipment:
+        # archive ไม่มี price_check_equipment: กรองหยาบด้วย LIKE แล้วตรวจชื่อ SKU ตรงตัวอีกครั้งใน Python
+        statement = statement.where(table.c.equipment.contains(equipment, autoescape=True))
+    if customer_type:
+        statement = statement.where(table.c.customer_type == customer_type)
+    if is_valid is not None:
+        statement = statement.where(table.c.is_valid_weighted == is_valid)
+    if date_from is not None:
+        statement = statement.where(table.c.checked_at >= date_from)
+    if date_to is not None:
+        statement = statement.where(table.c.checked_at < date_to)
+    return statement
+
+def iter_price_check_pages(batch_size=1000, columns=None, include_archives=True, user_email=None,
+                           customer_type=None, is_valid=None, date_from=None, date_to=None, equipment=None):
+    """
+    อ่าน price_checks ทีละหน้าแบบ keyset บน (checked_at, id) เรียงจากเก่าไปใหม่
+
+    แต่ละหน้าอ่านใน session สั้นๆ ที่ปิดก่อน yield จึงไม่มี reader ค้างระหว่างที่ผู้เรียกประมวลผล
+    (ต่างจาก iter_price_checks ที่ถือ cursor ไว้จนอ่านครบ - SQLite แบบ rollback journal
+    จะเขียนไม่ได้ตลอดเวลานั้น)
+
+    Args:
+        include_archives: รวมตาราง archive รายปีที่คาบเกี่ยวช่วง date_from/date_to (อ่านก่อนตารางหลัก)
+
+    Yields:
+        list ของ dict (คอลัมน์ที่ระบุ, None = ทุกคอลัมน์) ไม่เกิน batch_size รายการต่อหน้า
+    """
+    filters = dict(user_email=user_email, customer_type=customer_type, is_valid=is_valid,
+                   date_from=date_from, date_to=date_to, equipment=equipment)
+    hot_table = PriceCheck.__table__
+    columns = tuple(columns) if columns else tuple(column.key for column in hot_table.columns)
+    # cursor ต้องใช้ checked_at และ id เสมอ (และ equipment เมื่อกรอง archive ตามอุปกรณ์)
+    required = ('checked_at', 'id', 'equipment') if equipment else ('checked_at', 'id')
+    selected = columns + tuple(name for name in required if name not in columns)
+
+    sources = []
+    if include_archives:
+        db = _read_session()
+        try:
+            years = sorted(_archive_years(db))
+        finally:
+            db.close()
+        for year in years:
+            if date_from is not None and year < date_from.year:
+                continue
+            if date_to is not None and datetime(year, 1, 1) >= date_to:
+                continue
+            table = archive_table(year)
+            sources.append((table, _archive_page_statement(table, selected, **filters)))
+    sources.append((hot_table, _filter_price_checks(_projected_select(selected), **filters)))
+
+    for table, statement in sources:
+        cursor = None
+        while True:
+            page = statement
+            if cursor is not None:
+                page = page.where(tuple_(table.c.checked_at, table.c.id) > cursor)
+            page = page.order_by(table.c.checked_at, table.c.id).limit(batch_size)
+            db = _read_session()
+            try:
+                rows = db.execute(page).mappings().all()
+            finally:
+                db.close()
+            if not rows:
+                break
+            cursor = (rows[-1]['checked_at'], rows[-1]['id'])
+            last_page = len(rows) < batch_size
+
+            if table is not hot_table and equipment:
+                rows = [row for row in rows if equipment in split_equipment(row['equipment'])]
+            if rows:
+                yield [{name: row[name] for name in columns} for row in rows]
+            if last_page:
+                break
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def export_price_checks(output, fmt='csv', compress=False, batch_size=1000, columns=None, **filters):
+    """
+    เขียน audit log ของ price_checks ลงไฟล์แบบ streaming (หน่วยความจำคงที่ไม่ขึ้นกับจำนวนแถว)
+
+    รวมตาราง archive รายปี และอ่านทีละหน้าด้วย iter_price_check_pages (ไม่ถือ reader ค้างระหว่างเขียนไฟล์)
+
+    Args:
+        output: file object แบบ binary (เช่น open(path, 'wb'))
+        fmt: 'csv' (UTF-8 BOM สำหรับ Excel) หรือ 'jsonl'
+        compress: True = บีบอัดด้วย gzip
+        **filters: user_email, customer_type, is_valid, date_from, date_to, equipment
+
+    Returns:
+        int: จำนวนแถวที่เขียน
+    """
+    if fmt not in ('csv', 'jsonl'):
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    table = PriceCheck.__table__
+    columns = tuple(columns) if columns else tuple(column.key for column in table.columns)
+
+    stream = gzip.GzipFile(fileobj=output, mode='wb') if compress else output
+    writer = io.TextIOWrapper(stream, encoding='utf-8-sig' if fmt == 'csv' else 'utf-8', newline='')
+    count = 0
+    try:
+        if fmt == 'csv':
+            csv_writer = csv.writer(writer)
+            csv_writer.writerow(columns)
+        for page in iter_price_check_pages(batch_size, columns, include_archives=True, **filters):
+            for row in page:
+                if fmt == 'csv':
+                    csv_writer.writerow(row[name] for name in columns)
+                else:
+                    writer.write(json.dumps(
+                        {name: _export_value(row[name]) for name in columns},
+                        ensure_ascii=False
+                    ))
+                    writer.write('\n')
+            count += len(page)
+        writer.flush()
+    finally:
+        # ปิด gzip ให้เขียน trailer แต่ไม่ปิด output ของผู้เรียก
+        writer.detach()
+        if compress:
+            stream.close()
+    return count
+
+# มิติที่ใช้แยกสถิติได้ (ชื่อ -> expression สำหรับ GROUP BY)
+PRICE_CHECK_DIMENSIONS = {
+    'customer_type': PriceCheck.customer_type,
+    'speed': PriceCheck.speed,
+    'contract_months': PriceCheck.contract_months,
+    'has_fixed_ip': PriceCheck.has_fixed_ip,
+    'user_email': PriceCheck.user_email,
+    'equipment': EquipmentSku.name,
+    'day': func.date(PriceCheck.checked_at),
+}
+
+def _price_check_aggregates():
+    """คอลัมน์สรุปผล (จำนวน, ผ่าน, margin เฉลี่ย) ที่ใช้ร่วมกันทุก query สถิติ"""
+    return [
+        func.count(PriceCheck.id).label('total'),
+        func.coalesce(func.sum(case((PriceCheck.is_valid_weighted == True, 1), else_=0)), 0).label('valid'),
+        func.avg(PriceCheck.margin_weighted_percent).label('avg_margin_percent'),
+        func.avg(PriceCheck.margin_weighted_baht).label('avg_margin_baht'),
+        func.avg(PriceCheck.proposed_price).label('avg_proposed_price'),
+    ]
+
+def _summary_from_row(row):
+    total = row.total or 0
+    valid = row.valid or 0
+    return {
+        'total': total,
+        'valid': valid,
+        'invalid': total - valid,
+        'pass_rate': (valid / total * 100) if total else 0.0,
+        'avg_margin_percent': row.avg_margin_percent or 0.0,
+        'avg_margin_baht': row.avg_margin_baht or 0.0,
+        'avg_proposed_price': row.avg_proposed_price or 0.0,
+    }
+
+def get_price_check_summary(user_email=None, customer_type=None, is_valid=None,
+                            date_from=None, date_to=None, equipment=None):
+    """
+    สรุปผลการตรวจสอบทั้งตาราง (ตาม filter) ด้วย query เดียว
+
+    Returns:
+        dict: total, valid, invalid, pass_rate (%), avg_margin_percent,
+              avg_margin_baht, avg_proposed_price
+    """
+    db = _read_session()
+    try:
+        query = _filter_price_checks(
+            db.query(*_price_check_aggregates()),
+            user_email, customer_type, is_valid, date_from, date_to, equipment
+        )
+        return _summary_from_row(query.one())
+    finally:
+        db.close()
+
+def get_price_check_breakdown(dimension, user_email=None, customer_type=None, is_valid=None,
+                              date_from=None, date_to=None, equipment=None):
+    """
+    สรุปผลการตรวจสอบแยกตามมิติ (ดู PRICE_CHECK_DIMENSIONS) ด้วย GROUP BY เดียว
+
+    มิติ 'equipment' นับหนึ่งครั้งต่อ SKU ที่อยู่ใน price check (ผ่าน price_check_equipment)
+
+    Returns:
+        list[dict]: summary ของแต่ละกลุ่ม พร้อม key 'value' เป็นค่าของมิตินั้น
+    """
+    if dimension not in PRICE_CHECK_DIMENSIONS:
+        raise ValueError(f"Unknown dimension: {dimension}")
+
+    group_column = PRICE_CHECK_DIMENSIONS[dimension].label('value')
+
+    db = _read_session()
+    try:
+        query = db.query(group_column, *_price_check_aggregates())
+        if dimension == 'equipment':
+            query = query.join(PriceCheckEquipment, PriceCheckEquipment.price_check_id == PriceCheck.id)\
+                .join(EquipmentSku, EquipmentSku.id == PriceCheckEquipment.sku_id)
+        query = _filter_price_checks(
+            query, user_email, customer_type, is_valid, date_from, date_to, equipment
+        )
+        rows = query.group_by(group_column).order_by(group_column).all()
+
+        breakdown = []
+        for row in rows:
+            summary = _summary_from_row(row)
+            summary['value'] = row.value
+            breakdown.append(summary)
+        return breakdown
+    finally:
+        db.close()
+
+# คอลัมน์ของ price_checks ที่ rollup รายวันต้องใช้
+_DAILY_STATS_SOURCE_COLUMNS = [
+    PriceCheck.id,
+    PriceCheck.checked_at,
+    PriceCheck.user_email,
+    PriceCheck.customer_type,
+    PriceCheck.speed,
+    PriceCheck.contract_months,
+    PriceCheck.is_valid_weighted,
+    PriceCheck.proposed_price,
+    PriceCheck.margin_weighted_baht,
+    PriceCheck.margin_weighted_percent,
+]
+
+_daily_stats = PriceCheckDailyStats.__table__
+
+# สร้าง statement ครั้งเดียว (ใช้ bind parameter) เพื่อให้ SQLAlchemy ใช้ compiled cache ซ้ำได้
+_DAILY_STATS_UPDATE = update(_daily_stats).where(
+    (_daily_stats.c.day == bindparam('key_day'))
+    & (_daily_stats.c.user_email == bindparam('key_user_email'))
+    & (_daily_stats.c.customer_type == bindparam('key_customer_type'))
+    & (_daily_stats.c.speed == bindparam('key_speed'))
+    & (_daily_stats.c.contract_months == bindparam('key_contract_months'))
+).values(
+    check_count=_daily_stats.c.check_count + bindparam('check_count'),
+    valid_count=_daily_stats.c.valid_count + bindparam('valid_count'),
+    proposed_price_sum=_daily_stats.c.proposed_price_sum + bindparam('proposed_price_sum'),
+    margin_weighted_baht_sum=_daily_stats.c.margin_weighted_baht_sum + bindparam('margin_weighted_baht_sum'),
+    margin_weighted_percent_sum=_daily_stats.c.margin_weighted_percent_sum + bindparam('margin_weighted_percent_sum'),
+)
+_DAILY_STATS_INSERT = insert(_daily_stats)
+
+def _apply_daily_stats(db, rows):
+    """รวม rows ของ price_checks เข้า price_check_daily_stats (UPDATE ถ้ามี key แล้ว ไม่งั้น INSERT)"""
+    deltas = {}
+    for row in rows:
+        key = (row.checked_at.date(), row.user_email, row.customer_type, row.speed, row.contract_months)
+        delta = deltas.setdefault(key, [0, 0, 0.0, 0.0, 0.0])
+        delta[0] += 1
+        delta[1] += 1 if row.is_valid_weighted else 0
+        delta[2] += row.proposed_price or 0.0
+        delta[3] += row.margin_weighted_baht or 0.0
+        delta[4] += row.margin_weighted_percent or 0.0
+
+    for (day, user_email, customer_type, speed, contract_months), delta in deltas.items():
+        values = {
+            'check_count': delta[0],
+            'valid_count': delta[1],
+            'proposed_price_sum': delta[2],
+            'margin_weighted_baht_sum': delta[3],
+            'margin_weighted_percent_sum': delta[4],
+        }
+        result = db.execute(_DAILY_STATS_UPDATE, dict(
+            values,
+            key_day=day,
+            key_user_email=user_email,
+            key_customer_type=customer_type,
+            key_speed=speed,
+            key_contract_months=contract_months,
+        ))
+        if result.rowcount == 0:
+            db.execute(_DAILY_STATS_INSERT, dict(
+                values,
+                day=day,
+                user_email=user_email,
+                customer_type=customer_type,
+                speed=speed,
+                contract_months=contract_months,
+            ))
+
+def _set_rollup_watermark(db, name, last_id):
+    updated = db.query(RollupWatermark).filter(RollupWatermark.name == name).update(
+        {'last_id': last_id, 'updated_at': datetime.utcnow()}
+    )
+    if not updated:
+        db.add(RollupWatermark(name=name, last_id=last_id))
+        db.flush()
+
+def _advance_daily_stats(db, logs):
+    """
+    อัปเดต rollup ใน transaction เดียวกับการ insert price checks ใหม่
+
+    ทำเฉพาะเมื่อ watermark ตามทันแถวก่อนหน้าแล้วเท่านั้น ถ้ายังมีแถวเก่าค้างอยู่
+    ให้ refresh_daily_stats() เป็นผู้รวม (ป้องกันการนับซ้ำ/นับข้าม)
+    """
+    if not logs:
+        return
+
+    first_id = min(log.id for log in logs)
+    last_id = max(log.id for log in logs)
+    previous_id = db.query(func.max(PriceCheck.id)).filter(PriceCheck.id < first_id).scalar() or 0
+
+    watermark = db.query(RollupWatermark.last_id).filter(
+        RollupWatermark.name == DAILY_STATS_ROLLUP
+    ).scalar() or 0
+    if watermark < previous_id:
+        return
+
+    _apply_daily_stats(db, logs)
+    _set_rollup_watermark(db, DAILY_STATS_ROLLUP, last_id)
+
+def refresh_daily_stats(batch_size=5000):
+    """
+    Catch-up job: รวม price_checks ที่ id มากกว่า watermark เข้า rollup ทีละ batch
+
+    แต่ละ batch commit พร้อม watermark จึงหยุดกลางทางแล้วรันต่อได้
+
+    Returns:
+        int: จำนวนแถวที่ประมวลผล
+    """
+    processed = 0
+    while True:
+        db = SessionLocal()
+        try:
+            watermark = db.query(RollupWatermark.last_id).filter(
+                RollupWatermark.name == DAILY_STATS_ROLLUP
+            ).scalar() or 0
+
+            rows = db.execute(
+                select(*_DAILY_STATS_SOURCE_COLUMNS)
+                .where(PriceCheck.id > watermark)
+                .order_by(PriceCheck.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return processed
+
+            _apply_daily_stats(db, rows)
+            _set_rollup_watermark(db, DAILY_STATS_ROLLUP, rows[-1].id)
+            db.commit()
+            processed += len(rows)
+        finally:
+            db.close()
+
+# มิติของ rollup ที่เลือก GROUP BY ได้
+DAILY_STATS_DIMENSIONS = ('day', 'user_email', 'customer_type', 'speed', 'contract_months')
+
+def get_daily_stats(group_by=('day',), date_from=None, date_to=None, user_email=None, customer_type=None):
+    """
+    อ่านสถิติจาก rollup รายวัน (date_from รวม, date_to ไม่รวม - เป็น date)
+
+    Returns:
+        list[dict]: ค่าของมิติใน group_by + total, valid, invalid, pass_rate,
+                    avg_margin_percent, avg_margin_baht, avg_proposed_price
+    """
+    for dimension in group_by:
+        if dimension not in DAILY_STATS_DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {dimension}")
+
+    group_columns = [getattr(PriceCheckDailyStats, dimension) for dimension in group_by]
+
+    db = _read_session()
+    try:
+        query = db.query(
+            *group_columns,
+            func.sum(PriceCheckDailyStats.check_count).label('total'),
+            func.sum(PriceCheckDailyStats.valid_count).label('valid'),
+            func.sum(PriceCheckDailyStats.proposed_price_sum).label('proposed_price_sum'),
+            func.sum(PriceCheckDailyStats.margin_weighted_baht_sum).label('margin_baht_sum'),
+            func.sum(PriceCheckDailyStats.margin_weighted_percent_sum).label('margin_percent_sum'),
+        )
+        if date_from is not None:
+            query = query.filter(PriceCheckDailyStats.day >= date_from)
+        if date_to is not None:
+            query = query.filter(PriceCheckDailyStats.day < date_to)
+        if user_email:
+            query = query.filter(PriceCheckDailyStats.user_email == user_email)
+        if customer_type:
+            query = query.filter(PriceCheckDailyStats.customer_type == customer_type)
+
+        results = []
+        for row in query.group_by(*group_columns).order_by(*group_columns).all():
+            total = row.total or 0
+            valid = row.valid or 0
+            item = {dimension: getattr(row, dimension) for dimension in group_by}
+            item.update({
+                'total': total,
+                'valid': valid,
+                'invalid': total - valid,
+                'pass_rate': (valid / total * 100) if total else 0.0,
+                'avg_margin_percent': (row.margin_percent_sum / total) if total else 0.0,
+                'avg_margin_baht': (row.margin_baht_sum / total) if total else 0.0,
+                'avg_proposed_price': (row.proposed_price_sum / total) if total else 0.0,
+            })
+            results.append(item)
+        return results
+    finally:
+        db.close()
+
 def update_user(email, is_admin=None, is_active=None):
     """อัปเดตข้อมูล user"""
     db = SessionLocal()
@@ -437,16 +2238,18 @@ def is_user_allowed(email):
 
 def get_user_stats():
     """สถิติ users"""
-    db = SessionLocal()
+    db = _read_session()
     try:
-        total = db.query(User).count()
-        active = db.query(User).filter(User.is_active == True).count()
-        admins = db.query(User).filter(User.is_admin == True).count()
+        row = db.query(
+            func.count(User.id).label('total'),
+            func.coalesce(func.sum(case((User.is_active == True, 1), else_=0)), 0).label('active'),
+            func.coalesce(func.sum(case((User.is_admin == True, 1), else_=0)), 0).label('admins'),
+        ).one()
         return {
-            'total': total,
-            'active': active,
-            'inactive': total - active,
-            'admins': admins
+            'total': row.total,
+            'active': row.active,
+            'inactive': row.total - row.active,
+            'admins': row.admins
         }
     finally:
         db.close()
\ No newline at end of file
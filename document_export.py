@@ -1,15 +1,28 @@
+import base64
+import gzip
+import hashlib
 import io
+import multiprocessing
+import os
+import threading
+import zipfile
 import qrcode
-from datetime import datetime
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+from html import escape as html_escape
+from xml.sax.saxutils import escape
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import mm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
+from reportlab.platypus import SimpleDocTemplate, BaseDocTemplate, PageTemplate, Frame, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 import database as db
+import verification_token
+from config import Config
 
 # ลงทะเบียน Thai fonts (ถ้ามี)
 try:
@@ -23,21 +36,114 @@ except:
     THAI_FONT_BOLD = 'Helvetica-Bold'
 
 
-def generate_qr_code(reference_id, size=100):
-    """สร้าง QR Code สำหรับ reference ID"""
+# QR ที่สร้างแล้ว: (รูปแบบ, ข้อความใน QR) -> bytes (LRU ไม่เกิน QR_CACHE_SIZE รายการ)
+_qr_cache = OrderedDict()
+_qr_cache_lock = threading.Lock()
+
+
+def _qr_matrix(payload):
     qr = qrcode.QRCode(version=1, box_size=10, border=2)
-    verification_url = f"https://floorprice.example.com/?reference_id={reference_id}"
-    qr.add_data(verification_url)
+    qr.add_data(payload)
     qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Convert to BytesIO
+    return qr
+
+
+def _render_qr_png(payload):
+    img = _qr_matrix(payload).make_image(fill_color="black", back_color="white")
     img_buffer = io.BytesIO()
     img.save(img_buffer, format='PNG')
-    img_buffer.seek(0)
-    
-    return img_buffer
+    return img_buffer.getvalue()
+
+
+def _render_qr_svg(payload):
+    """SVG แบบ vector (ไม่ผ่าน PIL): หนึ่งเส้นต่อช่วง module สีดำที่ติดกันในแต่ละแถว"""
+    matrix = _qr_matrix(payload).get_matrix()
+    size = len(matrix)
+    runs = []
+    for y, row in enumerate(matrix):
+        x = 0
+        pen = None  # ตำแหน่งปลายเส้นก่อนหน้าในแถวนี้ (ต่อเส้นถัดไปด้วย m แบบสัมพัทธ์ให้ path สั้นลง)
+        while x < size:
+            if row[x]:
+                start = x
+                while x < size and row[x]:
+                    x += 1
+                move = f"M{start} {y}.5" if pen is None else f"m{start - pen} 0"
+                runs.append(f"{move}h{x - start}")
+                pen = x
+            else:
+                x += 1
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<path fill="#fff" d="M0 0h{size}v{size}H0z"/><path stroke="#000" d="{"".join(runs)}"/></svg>'
+    ).encode('ascii')
+
+
+_QR_RENDERERS = {'png': _render_qr_png, 'svg': _render_qr_svg}
+
+
+def _qr_cache_path(payload, fmt):
+    """ไฟล์ใน QR_CACHE_DIR ตาม hash ของรูปแบบ + ข้อความ (ข้อความเดียวกันได้ไฟล์เดียวกันทุก process)"""
+    digest = hashlib.sha256(f"{fmt}\n{payload}".encode('utf-8')).hexdigest()
+    return os.path.join(Config.QR_CACHE_DIR, digest[:2], f"{digest}.{fmt}")
+
+
+def qr_code_image(payload, fmt='png'):
+    """
+    QR ของข้อความ (bytes ของ PNG หรือ SVG) ผ่าน cache ในหน่วยความจำและบน disk (QR_CACHE_DIR)
+    """
+    key = (fmt, payload)
+    with _qr_cache_lock:
+        content = _qr_cache.get(key)
+        if content is not None:
+            _qr_cache.move_to_end(key)
+            return content
+
+    path = _qr_cache_path(payload, fmt) if Config.QR_CACHE_DIR else None
+    if path:
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+        except OSError:
+            content = None
+    if content is None:
+        content = _QR_RENDERERS[fmt](payload)
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(temp_path, 'wb') as f:
+                    f.write(content)
+                os.replace(temp_path, path)
+            except OSError:
+                pass  # cache บน disk ใช้ไม่ได้ ยังใช้ cache ในหน่วยความจำได้
+
+    with _qr_cache_lock:
+        _qr_cache[key] = content
+        while len(_qr_cache) > Config.QR_CACHE_SIZE:
+            _qr_cache.popitem(last=False)
+    return content
+
+
+def generate_qr_code(reference_id, size=100, verification_url=None):
+    """
+    สร้าง QR Code (PNG ใน BytesIO) สำหรับ reference ID
+
+    verification_url: ลิงก์ที่จะใส่ใน QR (เช่น verification_token.verification_url(log) แบบมี token)
+    """
+    if verification_url is None:
+        verification_url = f"{Config.VERIFY_BASE_URL.rstrip('/')}/?reference_id={reference_id}"
+    return io.BytesIO(qr_code_image(verification_url, 'png'))
+
+
+def _qr_html(verification_url):
+    """QR สำหรับเอกสาร HTML: SVG ฝังในหน้า หรือ PNG แบบ data URI ตาม QR_HTML_FORMAT"""
+    if Config.QR_HTML_FORMAT == 'svg':
+        svg = qr_code_image(verification_url, 'svg').decode('ascii')
+        return svg.replace('<svg ', '<svg width="120" height="120" role="img" aria-label="QR Code" style="margin-top: 10px;" ', 1)
+    qr_png = qr_code_image(verification_url, 'png')
+    qr_data_uri = "data:image/png;base64," + base64.b64encode(qr_png).decode('ascii')
+    return f'<img src="{qr_data_uri}" alt="QR Code" style="width: 120px; height: 120px; margin-top: 10px;">'
 
 
 def format_currency(amount):
@@ -50,13 +156,20 @@ def generate_verification_document_html(log):
     สร้างเอกสารแบบ HTML สำหรับพิมพ์/บันทึก
     """
     customer_type_th = "🏠 Residential (บ้าน)" if log.customer_type == 'residential' else "🏢 Business (ธุรกิจ)"
+    verification_url = verification_token.verification_url(log)
+    qr_html = _qr_html(verification_url)
+    # ข้อความที่ผู้ใช้กรอก/มาจาก database ต้อง escape ก่อนใส่ใน HTML (verify_service เปิดหน้านี้แบบสาธารณะ)
+    reference_id = html_escape(log.reference_id)
+    user_email = html_escape(log.user_email)
+    equipment = html_escape(log.equipment or '-')
+    notes = html_escape(log.notes or '')
     
     html = f"""
     <!DOCTYPE html>
     <html>
     <head>
         <meta charset="UTF-8">
-        <title>เอกสารยืนยันการตรวจสอบราคา - {log.reference_id}</title>
+        <title>เอกสารยืนยันการตรวจสอบราคา - {reference_id}</title>
         <style>
             @media print {{
                 @page {{ margin: 20mm; }}
@@ -225,9 +338,10 @@ def generate_verification_document_html(log):
         
         <div class="reference-box">
             <div class="ref-label">รหัสอ้างอิง / Reference ID</div>
-            <div class="ref-id">{log.reference_id}</div>
-            <div style="margin-top: 10px; font-size: 9pt; color: #666;">
-                ตรวจสอบความถูกต้องได้ที่: https://floorprice.example.com/?reference_id={log.reference_id}
+            <div class="ref-id">{reference_id}</div>
+            {qr_html}
+            <div style="margin-top: 10px; font-size: 9pt; color: #666; word-break: break-all;">
+                ตรวจสอบความถูกต้องได้ที่: {html_escape(verification_url)}
             </div>
         </div>
         
@@ -237,7 +351,7 @@ def generate_verification_document_html(log):
             <table class="comparison-table">
                 <tr>
                     <td class="label">ผู้ตรวจสอบ</td>
-                    <td class="value">{log.user_email}</td>
+                    <td class="value">{user_email}</td>
                 </tr>
                 <tr>
                     <td class="label">วันที่ตรวจสอบ</td>
@@ -264,7 +378,7 @@ def generate_verification_document_html(log):
                 </tr>
                 <tr>
                     <td class="label">อุปกรณ์</td>
-                    <td class="value">{log.equipment}</td>
+                    <td class="value">{equipment}</td>
                 </tr>
                 <tr>
                     <td class="label">ระยะสัญญา</td>
@@ -380,7 +494,7 @@ def generate_verification_document_html(log):
         <div class="section">
             <div class="section-title">📝 หมายเหตุ</div>
             <div style="padding: 10px; background: #f9f9f9; border: 1px solid #ddd; border-radius: 4px;">
-                {log.notes}
+                {notes}
             </div>
         </div>
         ''' if log.notes else ''}
@@ -389,7 +503,7 @@ def generate_verification_document_html(log):
         <div class="signature-box no-print">
             <div class="signature">
                 <div class="signature-line">ผู้ตรวจสอบ / Checked by</div>
-                <div style="margin-top: 5px; font-size: 10pt;">{log.user_email}</div>
+                <div style="margin-top: 5px; font-size: 10pt;">{user_email}</div>
             </div>
             <div class="signature">
                 <div class="signature-line">ผู้อนุมัติ / Approved by</div>
@@ -400,8 +514,8 @@ def generate_verification_document_html(log):
         <!-- Footer -->
         <div class="footer">
             <p><strong>คำเตือน:</strong> เอกสารฉบับนี้ได้รับการตรวจสอบและบันทึกในระบบ Floor Price Validator</p>
-            <p>Reference ID: <code>{log.reference_id}</code> | 
-            สร้างเมื่อ: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}</p>
+            <p>Reference ID: <code>{reference_id}</code> | 
+            วันที่ตรวจสอบ: {log.checked_at.strftime('%d/%m/%Y %H:%M:%S')}</p>
             <p style="color: #999; font-size: 8pt;">
                 เอกสารนี้สามารถตรวจสอบความถูกต้องได้ทางระบบ<br>
                 หากพบการปลอมแปลงจะถือเป็นความผิดตามกฎหมาย
@@ -455,8 +569,341 @@ Reference ID: {log.reference_id}
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 ตรวจสอบได้ที่: 
-https://floorprice.example.com/?reference_id={log.reference_id}
+{verification_token.verification_url(log)}
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     """
     
-    return text.strip()
\ No newline at end of file
+    return text.strip()
+
+# PDF: style sheet และ table style สร้างครั้งเดียวต่อ process (getSampleStyleSheet/ParagraphStyle
+# ใช้เวลาพอสมควรถ้าสร้างทุกครั้ง) ส่วน PageTemplate สร้างครั้งเดียวต่อ thread เพราะ frame มีสถานะระหว่าง build
+_PDF_MARGIN = 18 * mm
+_PDF_GREEN = colors.HexColor('#28a745')
+_PDF_RED = colors.HexColor('#dc3545')
+_pdf_styles = None
+_pdf_local = threading.local()
+
+
+def _get_pdf_styles():
+    global _pdf_styles
+    if _pdf_styles is None:
+        base = getSampleStyleSheet()
+        styles = {
+            'title': ParagraphStyle('FPTitle', parent=base['Title'], fontName=THAI_FONT_BOLD,
+                                    fontSize=18, leading=24, spaceAfter=2),
+            'subtitle': ParagraphStyle('FPSubtitle', parent=base['Normal'], fontName=THAI_FONT,
+                                       fontSize=10, textColor=colors.grey, alignment=TA_CENTER),
+            'section': ParagraphStyle('FPSection', parent=base['Heading2'], fontName=THAI_FONT_BOLD,
+                                      fontSize=12, leading=16, spaceBefore=8, spaceAfter=4,
+                                      textColor=colors.HexColor('#0066cc')),
+            'cell': ParagraphStyle('FPCell', parent=base['Normal'], fontName=THAI_FONT, fontSize=10, leading=13),
+            'cell_bold': ParagraphStyle('FPCellBold', parent=base['Normal'], fontName=THAI_FONT_BOLD,
+                                        fontSize=10, leading=13),
+            'cell_right': ParagraphStyle('FPCellRight', parent=base['Normal'], fontName=THAI_FONT,
+                                         fontSize=10, leading=13, alignment=TA_RIGHT),
+            'ref': ParagraphStyle('FPRef', parent=base['Normal'], fontName='Courier-Bold', fontSize=12,
+                                  leading=16, alignment=TA_LEFT),
+            'result': ParagraphStyle('FPResult', parent=base['Normal'], fontName=THAI_FONT_BOLD,
+                                     fontSize=14, leading=20, alignment=TA_CENTER),
+            'small': ParagraphStyle('FPSmall', parent=base['Normal'], fontName=THAI_FONT, fontSize=8,
+                                    leading=11, textColor=colors.grey),
+        }
+        styles['details_table'] = TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), THAI_FONT),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#dddddd')),
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f5f5f5')),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ])
+        styles['result_table'] = TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), THAI_FONT),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#dddddd')),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ])
+        _pdf_styles = styles
+    return _pdf_styles
+
+
+def _draw_pdf_page(canvas, doc):
+    """ส่วนที่เหมือนกันทุกหน้า: watermark และ footer (reference ID มาจาก doc ที่กำลัง build)"""
+    styles = _get_pdf_styles()
+    width, height = A4
+    canvas.saveState()
+    canvas.setFont('Helvetica-Bold', 60)
+    canvas.setFillColor(colors.Color(0, 0.4, 0.8, alpha=0.05))
+    canvas.translate(width / 2, height / 2)
+    canvas.rotate(45)
+    canvas.drawCentredString(0, 0, 'VERIFIED')
+    canvas.restoreState()
+
+    canvas.saveState()
+    canvas.setFont(styles['small'].fontName, 8)
+    canvas.setFillColor(colors.grey)
+    canvas.drawString(_PDF_MARGIN, 10 * mm, f"Reference ID: {doc.reference_id}")
+    canvas.drawRightString(width - _PDF_MARGIN, 10 * mm, f"{doc.page}")
+    canvas.restoreState()
+
+
+def _get_pdf_page_template():
+    template = getattr(_pdf_local, 'page_template', None)
+    if template is None:
+        width, height = A4
+        frame = Frame(_PDF_MARGIN, _PDF_MARGIN, width - 2 * _PDF_MARGIN, height - 2 * _PDF_MARGIN, id='body')
+        template = PageTemplate(id='verification', frames=[frame], onPage=_draw_pdf_page)
+        _pdf_local.page_template = template
+    return template
+
+
+def _pdf_details_table(rows, styles, bold_rows=()):
+    data = []
+    for index, (label, value) in enumerate(rows):
+        cell_style = styles['cell_bold'] if index in bold_rows else styles['cell']
+        data.append([Paragraph(label, cell_style), Paragraph(value, cell_style)])
+    table = Table(data, colWidths=[70 * mm, None])
+    table.setStyle(styles['details_table'])
+    return table
+
+
+def generate_verification_document_pdf(log):
+    """
+    สร้างเอกสาร PDF (bytes) ข้อมูลเดียวกับ generate_verification_document_html
+
+    ใช้ font ที่ลงทะเบียนตอน import, style sheet และ PageTemplate ที่สร้างไว้แล้วซ้ำทุกครั้ง
+    """
+    styles = _get_pdf_styles()
+    customer_type_th = "Residential (บ้าน)" if log.customer_type == 'residential' else "Business (ธุรกิจ)"
+    verification_url = verification_token.verification_url(log)
+
+    def passed(is_valid):
+        color = '#28a745' if is_valid else '#dc3545'
+        return f'<font color="{color}"><b>{"ผ่าน" if is_valid else "ไม่ผ่าน"}</b></font>'
+
+    qr = Image(generate_qr_code(log.reference_id, verification_url=verification_url), 30 * mm, 30 * mm)
+    reference_table = Table(
+        [[[Paragraph("รหัสอ้างอิง / Reference ID", styles['small']),
+           Paragraph(escape(log.reference_id), styles['ref']),
+           Paragraph(escape(verification_url), styles['small'])], qr]],
+        colWidths=[None, 34 * mm]
+    )
+    reference_table.setStyle(TableStyle([
+        ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#0066cc')),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]))
+
+    discount = log.proposed_price * log.discount_percent / 100
+    result_rows = [
+        [Paragraph(f'<font color="white"><b>{label}</b></font>', styles['cell']) for label in
+         ("เปรียบเทียบกับ", "Margin (บาท)", "Margin (%)", "ผลการตรวจสอบ")],
+        [Paragraph("ลูกค้าเดิม", styles['cell']),
+         Paragraph(format_currency(log.margin_existing_baht), styles['cell_right']),
+         Paragraph(f"{log.margin_existing_percent:.2f}%", styles['cell_right']),
+         Paragraph(passed(log.is_valid_existing), styles['cell'])],
+        [Paragraph("ลูกค้าใหม่", styles['cell']),
+         Paragraph(format_currency(log.margin_new_baht), styles['cell_right']),
+         Paragraph(f"{log.margin_new_percent:.2f}%", styles['cell_right']),
+         Paragraph(passed(log.is_valid_new), styles['cell'])],
+        [Paragraph("ถัวเฉลี่ย", styles['cell_bold']),
+         Paragraph(f"<b>{format_currency(log.margin_weighted_baht)}</b>", styles['cell_right']),
+         Paragraph(f"<b>{log.margin_weighted_percent:.2f}%</b>", styles['cell_right']),
+         Paragraph(passed(log.is_valid_weighted), styles['cell'])],
+    ]
+    result_table = Table(result_rows, colWidths=[45 * mm, 40 * mm, 35 * mm, None])
+    result_table.setStyle(styles['result_table'])
+
+    result_color = _PDF_GREEN if log.is_valid_weighted else _PDF_RED
+    result_box = Table([[Paragraph(
+        f"{'ผ่านการตรวจสอบ - ราคาอนุมัติ' if log.is_valid_weighted else 'ไม่ผ่านการตรวจสอบ'}<br/>"
+        f"Margin: {log.margin_weighted_percent:.2f}% "
+        f"({'+' if log.margin_weighted_baht >= 0 else ''}{format_currency(log.margin_weighted_baht)} บาท)",
+        styles['result']
+    )]])
+    result_box.setStyle(TableStyle([
+        ('BOX', (0, 0), (-1, -1), 2, result_color),
+        ('TEXTCOLOR', (0, 0), (-1, -1), result_color),
+        ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ]))
+
+    story = [
+        Paragraph("เอกสารยืนยันการตรวจสอบราคา", styles['title']),
+        Paragraph("Floor Price Verification Document", styles['subtitle']),
+        Spacer(1, 6 * mm),
+        reference_table,
+        Paragraph("ข้อมูลการตรวจสอบ", styles['section']),
+        _pdf_details_table([
+            ("ผู้ตรวจสอบ", escape(log.user_email)),
+            ("วันที่ตรวจสอบ", log.checked_at.strftime('%d/%m/%Y %H:%M:%S')),
+            ("ประเภทลูกค้า", customer_type_th),
+        ], styles),
+        Paragraph("รายละเอียดแพ็คเกจ", styles['section']),
+        _pdf_details_table([
+            ("ความเร็วอินเทอร์เน็ต", f"{log.speed} Mbps"),
+            ("ระยะทางติดตั้ง", f"{log.distance} กม."),
+            ("อุปกรณ์", escape(log.equipment or '-')),
+            ("ระยะสัญญา", f"{log.contract_months} เดือน"),
+            ("Fixed IP", 'มี' if log.has_fixed_ip else 'ไม่มี'),
+        ], styles),
+        Paragraph("การคำนวณราคา", styles['section']),
+        _pdf_details_table([
+            ("ราคาที่เสนอขาย", f"{format_currency(log.proposed_price)} บาท/เดือน"),
+            (f"ส่วนลด ({log.discount_percent}%)", f"-{format_currency(discount)} บาท"),
+            ("ราคาหลังหักส่วนลด", f"{format_currency(log.proposed_price - discount)} บาท"),
+            ("หัก: ค่าธรรมเนียม กสทช. (4%)", f"-{format_currency(log.regulator_fee)} บาท"),
+            ("รายได้สุทธิ", f"{format_currency(log.net_revenue)} บาท/เดือน"),
+        ], styles, bold_rows=(2, 4)),
+        Paragraph("Floor Price (ราคาขั้นต่ำ)", styles['section']),
+        _pdf_details_table([
+            ("Floor - ลูกค้าเดิม (ไม่รวมค่าติดตั้ง)", f"{format_currency(log.floor_existing)} บาท/เดือน"),
+            ("Floor - ลูกค้าใหม่ (รวมค่าติดตั้ง amortized)", f"{format_currency(log.floor_new)} บาท/เดือน"),
+            (f"Floor - ถัวเฉลี่ย ({log.existing_customer_ratio*100:.0f}% เดิม / {log.new_customer_ratio*100:.0f}% ใหม่)",
+             f"{format_currency(log.floor_weighted)} บาท/เดือน"),
+        ], styles, bold_rows=(2,)),
+        Paragraph("ผลการตรวจสอบ", styles['section']),
+        result_table,
+        Spacer(1, 5 * mm),
+        result_box,
+    ]
+    if log.notes:
+        story += [Paragraph("หมายเหตุ", styles['section']), Paragraph(escape(log.notes), styles['cell'])]
+    story += [
+        Spacer(1, 8 * mm),
+        Paragraph("คำเตือน: เอกสารฉบับนี้ได้รับการตรวจสอบและบันทึกในระบบ Floor Price Validator "
+                  "สามารถตรวจสอบความถูกต้องได้ทางระบบ หากพบการปลอมแปลงจะถือเป็นความผิดตามกฎหมาย", styles['small']),
+        Paragraph(f"วันที่ตรวจสอบ: {log.checked_at.strftime('%d/%m/%Y %H:%M:%S')}", styles['small']),
+    ]
+
+    buffer = io.BytesIO()
+    doc = BaseDocTemplate(
+        buffer, pagesize=A4, pageTemplates=[_get_pdf_page_template()],
+        title=f"เอกสารยืนยันการตรวจสอบราคา - {log.reference_id}", author=log.user_email,
+        invariant=1
+    )
+    doc.reference_id = log.reference_id
+    doc.build(story)
+    return buffer.getvalue()
+
+
+# รูปแบบเอกสารสำหรับ export หลายฉบับ: นามสกุลไฟล์ -> ฟังก์ชันสร้างเอกสาร
+DOCUMENT_RENDERERS = {
+    'html': generate_verification_document_html,
+    'pdf': generate_verification_document_pdf,
+    'txt': generate_simple_summary_text,
+}
+
+
+# เพิ่มเมื่อแก้ template ของเอกสาร (เอกสารใน cache ของเวอร์ชันเก่าจะไม่ถูกใช้อีก)
+DOCUMENT_TEMPLATE_VERSION = 3
+
+
+def _document_cache_key(log, fmt):
+    # ลิงก์ตรวจสอบ (token/base URL) และรูปแบบ QR อยู่ในเนื้อหาเอกสาร จึงเป็นส่วนหนึ่งของ key
+    variant = hashlib.sha1(
+        f"{verification_token.verification_url(log)}\n{Config.QR_HTML_FORMAT}".encode('utf-8')
+    ).hexdigest()[:16]
+    return f"{log.reference_id}:{fmt}:{DOCUMENT_TEMPLATE_VERSION}:{variant}"
+
+
+def get_cached_document(log, fmt='html', bind=None):
+    """
+    เอกสารจาก cache ในตาราง rendered_documents (render และบันทึกเมื่อยังไม่มี)
+
+    Returns:
+        (เนื้อหาแบบ gzip, etag) ส่งให้ client ที่รับ gzip ได้โดยไม่ต้องคลายก่อน
+    """
+    cache_key = _document_cache_key(log, fmt)
+    row = db.get_rendered_document(cache_key, bind=bind)
+    if row is not None:
+        return row.content, row.etag
+
+    content = DOCUMENT_RENDERERS[fmt](log)
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    etag = '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+    compressed = gzip.compress(content, mtime=0)
+    db.save_rendered_document(
+        cache_key, log.reference_id, fmt, DOCUMENT_TEMPLATE_VERSION, compressed, etag, len(content)
+    )
+    return compressed, etag
+
+
+def render_document(log, fmt='html'):
+    """เนื้อหาเอกสาร (bytes) ผ่าน cache สำหรับปุ่มดาวน์โหลด"""
+    compressed, _ = get_cached_document(log, fmt)
+    return gzip.decompress(compressed)
+
+
+def _render_documents(records, formats):
+    """
+    สร้างเอกสารของ price check หลายรายการ (รันใน worker process)
+
+    Returns:
+        list ของ (reference_id, [(ชื่อไฟล์ใน ZIP, bytes), ...])
+    """
+    rendered = []
+    for fields in records:
+        log = SimpleNamespace(**fields)
+        folder = log.checked_at.strftime('%Y-%m-%d')
+        files = []
+        for fmt in formats:
+            content = DOCUMENT_RENDERERS[fmt](log)
+            if isinstance(content, str):
+                content = content.encode('utf-8')
+            files.append((f"{folder}/floor_price_{log.reference_id}.{fmt}", content))
+        rendered.append((log.reference_id, files))
+    return rendered
+
+
+def export_documents_zip(output, formats=('html', 'pdf', 'txt'), exported_by=None, workers=None,
+                         batch_size=25, progress=None, **filters):
+    """
+    Export เอกสารยืนยันของ price_checks ตาม filter (เหมือน db.iter_price_checks) เป็น ZIP แบบ streaming
+    รวมตาราง archive รายปีที่อยู่ในช่วงวันที่
+
+    อ่านข้อมูลทีละ batch ด้วย db.iter_price_check_pages (ไม่มี reader ค้างระหว่าง render) ส่งให้
+    process pool สร้างเอกสาร แล้วเขียนลง ZIP ตามลำดับทันทีที่เสร็จ (ถือเอกสารในหน่วยความจำไม่เกิน workers * 2 batch) เมื่อเขียนครบจึงบันทึกการ export
+    ด้วย db.mark_many_as_exported (UPDATE ทีละ chunk) แทน mark_as_exported ทีละฉบับ
+
+    Args:
+        output: file object ที่เปิดแบบ binary (ไม่ต้อง seek ได้)
+        exported_by: email ผู้ export (None = ไม่บันทึกการ export)
+        workers: จำนวน process (None = จำนวน CPU, 0 = สร้างใน process นี้)
+        progress: callback(จำนวนเอกสารที่เขียนแล้ว)
+
+    Returns:
+        int: จำนวน price check ที่ export
+    """
+    formats = tuple(formats)
+    unknown = set(formats) - set(DOCUMENT_RENDERERS)
+    if unknown:
+        raise ValueError(f"Unsupported document formats: {', '.join(sorted(unknown))}")
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    exported_ids = []
+
+    def write(rendered):
+        for reference_id, files in rendered:
+            for name, content in files:
+                archive.writestr(name, content)
+            exported_ids.append(reference_id)
+        if progress:
+            progress(len(exported_ids))
+
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        if workers == 0:
+            for batch in db.iter_price_check_pages(batch_size, db.VERIFICATION_COLUMNS, **filters):
+                write(_render_documents(batch, formats))
+        else:
+            # spawn: ปลอดภัยเมื่อเรียกจาก process ที่มีหลาย thread (เช่น Streamlit)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                pending = deque()
+                for batch in db.iter_price_check_pages(batch_size, db.VERIFICATION_COLUMNS, **filters):
+                    pending.append(pool.submit(_render_documents, batch, formats))
+                    if len(pending) >= workers * 2:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+
+    if exported_by and exported_ids:
+        db.mark_many_as_exported(exported_ids, exported_by)
+    return len(exported_ids)
@@ -0,0 +1,55 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+import document_export as doc_export
+
+def main():
+    """Export เอกสารยืนยัน (HTML/PDF/TXT) ของ price_checks ตาม filter เป็นไฟล์ ZIP"""
+    parser = argparse.ArgumentParser(description="Export verification documents to a ZIP archive")
+    parser.add_argument("output", help="ไฟล์ปลายทาง เช่น documents_2024_06.zip")
+    parser.add_argument("--formats", default="html,pdf,txt", help="รูปแบบเอกสาร คั่นด้วย comma (html,pdf,txt)")
+    parser.add_argument("--from", dest="date_from", help="วันที่เริ่ม (YYYY-MM-DD, รวม)")
+    parser.add_argument("--to", dest="date_to", help="วันที่สิ้นสุด (YYYY-MM-DD, รวม)")
+    parser.add_argument("--user", dest="user_email", help="กรองตาม email ผู้ตรวจสอบ")
+    parser.add_argument("--customer-type", choices=["residential", "business"], help="กรองตามประเภทลูกค้า")
+    parser.add_argument("--result", choices=["pass", "fail"], help="กรองตามผลถัวเฉลี่ย (ผ่าน/ไม่ผ่าน)")
+    parser.add_argument("--equipment", help="กรองตามอุปกรณ์ (SKU)")
+    parser.add_argument("--workers", type=int, default=None, help="จำนวน process (ค่าเริ่มต้น = จำนวน CPU, 0 = ไม่ใช้ pool)")
+    parser.add_argument("--exported-by", help="email ผู้ export (ระบุเพื่อบันทึก exported_at/export_count)")
+    args = parser.parse_args()
+    
+    filters = {
+        'user_email': args.user_email,
+        'customer_type': args.customer_type,
+        'is_valid': None if args.result is None else args.result == 'pass',
+        'equipment': args.equipment
+    }
+    if args.date_from:
+        filters['date_from'] = datetime.strptime(args.date_from, '%Y-%m-%d')
+    if args.date_to:
+        filters['date_to'] = datetime.strptime(args.date_to, '%Y-%m-%d') + timedelta(days=1)
+    formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    
+    print(f"📤 กำลัง export เอกสาร ({', '.join(formats)}) ไปที่ {args.output}...")
+    
+    def progress(count):
+        print(f"🔄 {count:,} เอกสาร", end="\r", flush=True)
+    
+    started = time.time()
+    try:
+        with open(args.output, 'wb') as output:
+            count = doc_export.export_documents_zip(
+                output, formats=formats, exported_by=args.exported_by, workers=args.workers,
+                progress=progress, **filters
+            )
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    elapsed = time.time() - started
+    
+    print(f"✅ Export {count:,} รายการใน {elapsed:.1f} วินาที")
+    if not args.exported_by:
+        print("⚠️  ไม่ได้ระบุ --exported-by จึงไม่ได้บันทึกสถานะ export")
+
+if __name__ == "__main__":
+    main()
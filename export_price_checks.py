@@ -0,0 +1,41 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+import database as db
+
+def main():
+    """Export audit log ของ price_checks ทั้งหมดเป็น CSV/JSONL แบบ streaming"""
+    parser = argparse.ArgumentParser(description="Export price_checks audit log")
+    parser.add_argument("output", help="ไฟล์ปลายทาง เช่น price_checks.csv.gz")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--gzip", action="store_true", help="บีบอัดด้วย gzip")
+    parser.add_argument("--from", dest="date_from", help="วันที่เริ่ม (YYYY-MM-DD, รวม)")
+    parser.add_argument("--to", dest="date_to", help="วันที่สิ้นสุด (YYYY-MM-DD, รวม)")
+    parser.add_argument("--user", dest="user_email", help="กรองตาม email ผู้ตรวจสอบ")
+    parser.add_argument("--customer-type", choices=["residential", "business"], help="กรองตามประเภทลูกค้า")
+    parser.add_argument("--result", choices=["pass", "fail"], help="กรองตามผลถัวเฉลี่ย (ผ่าน/ไม่ผ่าน)")
+    parser.add_argument("--equipment", help="กรองตามอุปกรณ์ (SKU)")
+    args = parser.parse_args()
+    
+    filters = {
+        'user_email': args.user_email,
+        'customer_type': args.customer_type,
+        'is_valid': None if args.result is None else args.result == 'pass',
+        'equipment': args.equipment
+    }
+    if args.date_from:
+        filters['date_from'] = datetime.strptime(args.date_from, '%Y-%m-%d')
+    if args.date_to:
+        filters['date_to'] = datetime.strptime(args.date_to, '%Y-%m-%d') + timedelta(days=1)
+    
+    print(f"📤 กำลัง export ไปที่ {args.output}...")
+    
+    started = time.time()
+    with open(args.output, 'wb') as output:
+        count = db.export_price_checks(output, fmt=args.format, compress=args.gzip, **filters)
+    elapsed = time.time() - started
+    
+    print(f"✅ Export {count:,} รายการใน {elapsed:.1f} วินาที")
+
+if __name__ == "__main__":
+    main()
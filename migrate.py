@@ -0,0 +1,59 @@
+import sys
+from sqlalchemy import text
+import database as db
+
+def show_status():
+    """แสดง schema version ปัจจุบันและ migration ที่ยังค้าง"""
+    current_version = db.get_schema_version()
+    print(f"📋 Schema version: {current_version} (ล่าสุด: {db.LATEST_SCHEMA_VERSION})")
+    
+    for version, description, _ in db.MIGRATIONS:
+        status = "✅" if version <= current_version else "⏳"
+        print(f"   {status} {version}: {description}")
+
+def migrate():
+    """Apply schema migrations ที่ยังค้างอยู่ (รันซ้ำได้ปลอดภัย)"""
+    
+    print("🔄 กำลัง migrate database...")
+    
+    try:
+        # import database จะ apply migration ที่ค้างให้อัตโนมัติอยู่แล้ว เรียกซ้ำเพื่อความชัดเจน
+        applied = db.run_migrations(verbose=True)
+        if not applied:
+            print("⚠️  Schema เป็นเวอร์ชันล่าสุดอยู่แล้ว")
+        
+        # เติมลิงก์อุปกรณ์ให้ price_checks เดิม (ทีละ chunk รันต่อจาก checkpoint)
+        backfilled = db.backfill_price_check_dictionaries(
+            progress=lambda total: print(f"   ... เติมลิงก์อุปกรณ์แล้ว {total:,} รายการ")
+        )
+        if backfilled:
+            print(f"✅ เติมลิงก์อุปกรณ์ {backfilled:,} รายการ")
+        
+        # เอกสารใน cache ที่ render ด้วย template เวอร์ชันเก่าจะไม่ถูกใช้อีก
+        import document_export as doc_export
+        purged = db.purge_rendered_documents(template_version=doc_export.DOCUMENT_TEMPLATE_VERSION)
+        if purged:
+            print(f"✅ ลบเอกสารใน cache ของ template เก่า {purged:,} รายการ")
+        
+        # อัปเดตสถิติให้ query planner เลือก index ได้ถูกต้อง
+        with db.engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        print("✅ อัปเดตสถิติ (ANALYZE) สำเร็จ")
+        
+        # snapshot สำหรับอ่านต้องมี schema เดียวกับ primary
+        if db.refresh_read_snapshot():
+            print("✅ อัปเดต read snapshot สำเร็จ")
+        
+        show_status()
+        print("✅ Migration สำเร็จ!")
+        
+    except Exception as e:
+        print(f"❌ Migration ล้มเหลว: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    if "--status" in sys.argv:
+        show_status()
+    else:
+        migrate()
@@ -0,0 +1,48 @@
+import argparse
+import database as db
+
+def _print_progress(rows_done, remaining, rows_per_second):
+    eta = remaining / rows_per_second if rows_per_second else 0
+    print(f"   ... ย้ายแล้ว {rows_done:,} รายการ | เหลือ {remaining:,} | "
+          f"{rows_per_second:,.0f} รายการ/วินาที | ETA {eta:,.0f} วินาที")
+
+def main():
+    """ย้าย price_checks_legacy เข้า price_checks (v2) ทีละ chunk (หยุดแล้วรันต่อได้)"""
+    parser = argparse.ArgumentParser(description="Migrate price_checks_legacy -> price_checks (v2)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="จำนวนแถวต่อ transaction")
+    parser.add_argument("--max-chunks", type=int, default=None, help="จำนวน chunk สูงสุดในการรันครั้งนี้")
+    parser.add_argument("--pause", type=float, default=0.0, help="พักระหว่าง chunk (วินาที)")
+    parser.add_argument("--status", action="store_true", help="แสดงความคืบหน้าเท่านั้น")
+    args = parser.parse_args()
+
+    checkpoint = db.get_data_migration_checkpoint()
+    if checkpoint:
+        print(f"📋 Checkpoint: id ล่าสุด {checkpoint.last_id}, ย้ายแล้ว {checkpoint.rows_done:,} รายการ "
+              f"(อัปเดต {checkpoint.updated_at:%d/%m/%Y %H:%M})")
+    else:
+        print("📋 ยังไม่เคยเริ่ม migration")
+    if args.status:
+        return
+
+    print("🔄 กำลังย้ายข้อมูล legacy...")
+    try:
+        result = db.migrate_legacy_price_checks(
+            chunk_size=args.chunk_size,
+            max_chunks=args.max_chunks,
+            pause_seconds=args.pause,
+            progress=_print_progress
+        )
+    except KeyboardInterrupt:
+        print("⚠️  หยุดกลางทาง - รันใหม่เพื่อทำต่อจาก checkpoint")
+        return
+
+    if not result['migrated']:
+        print("⚠️  ไม่มีข้อมูล legacy ที่ต้องย้าย")
+    elif result['remaining']:
+        print(f"✅ ย้าย {result['migrated']:,} รายการ (เหลือ {result['remaining']:,} - รันใหม่เพื่อทำต่อ)")
+    else:
+        print(f"✅ ย้ายครบแล้ว {result['rows_done']:,} รายการ "
+              f"({result['rows_per_second']:,.0f} รายการ/วินาที)")
+
+if __name__ == "__main__":
+    main()
@@ -113,7 +113,8 @@ def create_database_tables():
     
     try:
         import database as db
-        print_success("Database tables created successfully")
+        db.run_migrations()
+        print_success(f"Database schema at version {db.get_schema_version()}")
         return True
     except Exception as e:
         print_error(f"Failed to create tables: {str(e)}")
@@ -0,0 +1,236 @@
+"""
+Write-behind logger สำหรับ price checks
+
+รับ price check เข้าคิวในหน่วยความจำแล้วคืน reference ID ทันที จากนั้น background
+thread จะบันทึกเป็น batch ใน transaction เดียว (group commit) ภายในเวลาไม่เกิน
+WRITE_BEHIND_MAX_DELAY_MS มีการ flush ตอนปิดโปรแกรม และ flush() สำหรับผู้เรียก
+ที่ต้องอ่านข้อมูลที่เพิ่งเขียน (read-after-write)
+
+batch ที่บันทึกไม่สำเร็จจะ retry ไม่เกิน WRITE_BEHIND_MAX_RETRIES ครั้ง ระหว่างนั้น thread
+ไม่รับงานใหม่ (คิวเต็มแล้ว submit จะรอ) ถ้ายังไม่สำเร็จจะบันทึกทีละแถว และแถวที่ยังล้มเหลว
+ถูกเขียนลงไฟล์ dead-letter (JSONL) แทนการค้างอยู่ในหน่วยความจำ ถ้าคิวเต็มจนใส่คำสั่ง flush/stop
+ไม่ได้ ผู้เรียก flush()/close() จะบันทึกรายการในคิวเองแทนการรอไม่มีกำหนด
+"""
+import atexit
+import json
+import queue
+import threading
+import time
+import traceback
+from config import Config
+import database as db
+
+
+class _FlushRequest:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class PriceCheckWriter:
+    """คิว write-behind + background thread ที่บันทึกเป็น batch"""
+
+    def __init__(self, max_delay_ms=200, max_batch=500, max_queue=10000, retry_delay=1.0,
+                 max_retries=3, dead_letter_path='price_check_dead_letters.jsonl'):
+        self.max_delay = max_delay_ms / 1000
+        self.max_batch = max_batch
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+        self.dead_letter_path = dead_letter_path
+        self.dead_lettered = 0  # จำนวนแถวที่บันทึกไม่สำเร็จและถูกย้ายไป dead-letter
+        self._dead_letter_lock = threading.Lock()
+        # คิวมีขนาดจำกัด ถ้าเต็มผู้เรียกจะรอ (backpressure) แทนที่หน่วยความจำจะโตไม่จำกัด
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = []  # batch ที่กำลังบันทึก (ไม่เกิน max_batch แถว)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="price-check-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, **fields):
+        """
+        เข้าคิว price check (keyword arguments เดียวกับ db.build_price_check)
+
+        Returns:
+            PriceCheck ที่ยังไม่ถูกบันทึก (มี reference_id และ checked_at แล้ว แต่ id เป็น None)
+            ผู้เรียกที่จะอ่านแถวนี้กลับหรือแสดงลิงก์ตรวจสอบต้อง flush() ก่อน
+        """
+        if self._closed:
+            raise RuntimeError("PriceCheckWriter is closed")
+        log = db.build_price_check(**fields)
+        self._queue.put(db.price_check_values(log))
+        return log
+
+    def flush(self, timeout=None):
+        """รอจนทุกรายการที่เข้าคิวก่อนหน้านี้ถูกบันทึก (คืน False ถ้าหมดเวลาหรือมีแถวถูกย้ายไป dead-letter)"""
+        if not self._thread.is_alive():
+            return not self._pending and self._queue.empty()
+        dead_lettered = self.dead_lettered
+        request = _FlushRequest()
+        if not self._put_control(request, timeout):
+            return False
+        return request.done.wait(timeout) and self.dead_lettered == dead_lettered
+
+    def close(self, timeout=30):
+        """หยุดรับงานใหม่ บันทึกที่ค้างทั้งหมด แล้วหยุด thread"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._put_control(_STOP, timeout):
+            self._thread.join(timeout)
+        if self._pending:
+            print(f"❌ PriceCheckWriter: บันทึกไม่สำเร็จ {len(self._pending)} รายการตอนปิดระบบ")
+
+    def _put_control(self, item, timeout):
+        """
+        ใส่คำสั่ง flush/stop เข้าคิว (False = หมดเวลา)
+
+        ถ้าคิวเต็ม (เช่น thread กำลัง retry batch ที่ล้มเหลว) จะบันทึกรายการในคิวจาก thread
+        ของผู้เรียกเพื่อเปิดที่ว่าง แทนการรอ queue.put ไม่มีกำหนด
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                self._queue.put(item, timeout=self.max_delay)
+                return True
+            except queue.Full:
+                self._drain()
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def _drain(self):
+        """บันทึกรายการที่ค้างในคิวแบบ synchronous (คำสั่ง flush/stop ของผู้เรียกอื่นใส่กลับเข้าคิว)"""
+        rows = []
+        markers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP or isinstance(item, _FlushRequest):
+                markers.append(item)
+            else:
+                rows.append(item)
+
+        for start in range(0, len(rows), self.max_batch):
+            chunk = rows[start:start + self.max_batch]
+            try:
+                db.persist_price_checks(chunk)
+            except Exception as e:
+                print(f"❌ PriceCheckWriter: บันทึก {len(chunk)} รายการจากคิวไม่สำเร็จ: {e}")
+                self._write_rows(chunk)
+
+        for marker in markers:
+            try:
+                self._queue.put_nowait(marker)
+            except queue.Full:
+                if isinstance(marker, _FlushRequest):
+                    marker.done.set()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            markers = []
+            deadline = time.monotonic() + self.max_delay
+
+            # รวม batch จนครบขนาด หมดเวลา หรือเจอคำสั่ง flush/stop
+            while True:
+                if item is _STOP or isinstance(item, _FlushRequest):
+                    markers.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            self._pending = batch
+            self._write_pending()
+
+            for marker in markers:
+                if marker is _STOP:
+                    return
+                marker.done.set()
+
+    def _write_pending(self):
+        # ระหว่าง retry ไม่ดึงงานใหม่จากคิว ผู้เรียก submit จึงรอเมื่อคิวเต็มแทนการ buffer ไม่จำกัด
+        for attempt in range(self.max_retries):
+            try:
+                db.persist_price_checks(self._pending)
+                self._pending = []
+                return
+            except Exception as e:
+                print(f"❌ PriceCheckWriter: บันทึก {len(self._pending)} รายการไม่สำเร็จ "
+                      f"(ครั้งที่ {attempt + 1}/{self.max_retries}): {e}")
+                traceback.print_exc()
+                if attempt + 1 < self.max_retries:
+                    time.sleep(self.retry_delay * (attempt + 1))
+
+        self._write_rows(self._pending)
+        self._pending = []
+
+    def _write_rows(self, rows):
+        # บันทึกทีละแถวเพื่อแยกแถวที่มีปัญหา (เช่น ละเมิด constraint) ออกจากแถวที่ดี
+        for row in rows:
+            try:
+                db.persist_price_checks([row])
+            except Exception as e:
+                self._dead_letter(row, e)
+
+    def _dead_letter(self, row, error):
+        print(f"⚠️ PriceCheckWriter: ย้าย {row.get('reference_id')} ไป dead-letter: {error}")
+        with self._dead_letter_lock:
+            self.dead_lettered += 1
+            try:
+                with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+                    record = dict(row, error=str(error))
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            except OSError as e:
+                print(f"❌ PriceCheckWriter: เขียน dead-letter ไม่สำเร็จ: {e}")
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """คืน writer ตัวเดียวของ process (สร้างเมื่อเรียกครั้งแรก และ flush ตอนปิดโปรแกรม)"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = PriceCheckWriter(
+                max_delay_ms=Config.WRITE_BEHIND_MAX_DELAY_MS,
+                max_batch=Config.WRITE_BEHIND_MAX_BATCH,
+                max_queue=Config.WRITE_BEHIND_MAX_QUEUE,
+                max_retries=Config.WRITE_BEHIND_MAX_RETRIES,
+                dead_letter_path=Config.WRITE_BEHIND_DEAD_LETTER_PATH
+            )
+            atexit.register(_writer.close)
+        return _writer
+
+
+def log_price_check(**fields):
+    """
+    บันทึก price check ผ่าน write-behind ถ้าเปิด PRICE_CHECK_WRITE_BEHIND
+    ไม่งั้นบันทึกทันทีด้วย db.log_price_check_comprehensive
+
+    แบบ write-behind แถวอาจยังไม่อยู่ใน database ตอนคืนค่า ต้องเรียก flush() ก่อนอ่านกลับ
+    หรือแสดงลิงก์/QR สำหรับตรวจสอบ
+    """
+    if Config.PRICE_CHECK_WRITE_BEHIND:
+        return get_writer().submit(**fields)
+    return db.log_price_check_comprehensive(**fields)
+
+
+def flush(timeout=None):
+    """บังคับบันทึกรายการที่ค้างในคิว (ใช้ก่อนอ่านข้อมูลที่เพิ่งเขียน)"""
+    if _writer is None:
+        return True
+    return _writer.flush(timeout)
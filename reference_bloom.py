@@ -0,0 +1,194 @@
+"""
+Bloom filter ของ reference ID สำหรับหน้า verification
+
+ตอบได้ในระดับ microsecond ว่า reference ID "ไม่มีอยู่แน่นอน" (ไม่มี false negative) จึงปฏิเสธ ID
+ที่สุ่ม/เดาโดยไม่ต้องถาม database ส่วนคำตอบ "อาจมี" ต้องยืนยันกับ database ตามปกติ
+
+- สร้างจากการ stream reference ID ทั้งหมด (รวม archive) แล้วบันทึกลงไฟล์ REFERENCE_BLOOM_PATH
+- เปิดใหม่: โหลดไฟล์แล้วตามเก็บเฉพาะแถวที่ id มากกว่า last_id
+- price check ที่บันทึกใน process เดียวกันถูกเพิ่มทันทีผ่าน db.add_reference_listener
+- ID ที่ไม่พบใน filter จะตามเก็บรายการใหม่จาก database (id > last_id) ก่อนตอบทุกครั้ง เพื่อให้เอกสาร
+  ที่เพิ่งออกจาก process อื่นตรวจสอบได้ทันที ส่วน ID เดิมที่ไม่พบซ้ำถูกจำกัดด้วย negative cache
+  ของ verification_lookup
+"""
+import atexit
+import hashlib
+import json
+import math
+import os
+import struct
+import threading
+import time
+from sqlalchemy import select, func
+from config import Config
+import database as db
+
+_MAGIC = b'FPBLOOM1'
+_SAVE_INTERVAL_SECONDS = 60
+# server database: id จาก sequence อาจ commit ไม่เรียงลำดับ จึงอ่านย้อนทับช่วงท้ายทุกครั้งที่ตามเก็บ
+# (SQLite เขียนทีละ transaction id จึงเรียงเสมอ)
+_CATCH_UP_OVERLAP = 1000
+
+
+class ReferenceBloomFilter:
+    """Bloom filter (double hashing บน blake2b) พร้อม watermark last_id สำหรับตามเก็บแบบ incremental"""
+
+    def __init__(self, capacity, error_rate=0.001, num_bits=None, num_hashes=None, bits=None,
+                 last_id=0, count=0):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = num_bits or int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = num_hashes or max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.last_id = last_id
+        self.count = count  # จำนวนแถวที่อ่านจาก database (ไม่นับที่เพิ่มผ่าน listener ซึ่งจะถูกอ่านซ้ำตอนตามเก็บ)
+        self.path = None  # ไฟล์ที่บันทึกอัตโนมัติหลังตามเก็บ (ไม่เกินหนึ่งครั้งต่อ _SAVE_INTERVAL_SECONDS)
+        self._lock = threading.Lock()
+        self._catch_up_lock = threading.Lock()
+        self._last_save = time.monotonic()
+
+    def _positions(self, reference_id):
+        digest = hashlib.blake2b(reference_id.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, reference_id):
+        with self._lock:
+            for position in self._positions(reference_id):
+                self.bits[position >> 3] |= 1 << (position & 7)
+
+    def add_many(self, reference_ids):
+        for reference_id in reference_ids:
+            self.add(reference_id)
+
+    def __contains__(self, reference_id):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(reference_id))
+
+    def catch_up(self, bind=None):
+        """เพิ่ม reference ID ของแถวที่ id > last_id (คืนจำนวนแถวใหม่)"""
+        overlap = 0 if (bind or db.engine).dialect.name == 'sqlite' else _CATCH_UP_OVERLAP
+        added = 0
+        with self._catch_up_lock:
+            for row_id, reference_id in db.iter_reference_ids(max(self.last_id - overlap, 0), bind=bind):
+                self.add(reference_id)
+                if row_id > self.last_id:
+                    self.last_id = row_id
+                    added += 1
+            self.count += added
+        if added and self.path:
+            self.save_if_due(self.path)
+        return added
+
+    def might_exist(self, reference_id, bind=None):
+        """
+        False = ไม่มี reference ID นี้แน่นอน, True = อาจมี (ต้องตรวจกับ database)
+
+        ถ้าไม่พบจะตามเก็บแถวที่ id > last_id ก่อนตอบเสมอ (query ตาม primary key ที่อ่านเฉพาะแถวใหม่)
+        แถวที่ process อื่นเพิ่ง commit จึงไม่ถูกปฏิเสธ
+        """
+        if reference_id in self:
+            return True
+        if self.catch_up(bind=bind):
+            return reference_id in self
+        return False
+
+    @classmethod
+    def build(cls, capacity=None, error_rate=0.001, bind=None):
+        """สร้างจาก reference ID ทั้งหมดในตารางหลักและ archive (อ่านแบบ stream)"""
+        existing = sum(entry.row_count for entry in db.get_price_check_archives())
+        with (bind or db.engine).connect() as conn:
+            existing += conn.execute(select(func.count(db.PriceCheck.id))).scalar()
+        # เผื่อการเติบโต: filter ที่แน่นเกิน capacity จะมี false positive สูงขึ้น
+        bloom = cls(max(capacity or 0, existing * 2, 1000), error_rate)
+        for row_id, reference_id in db.iter_reference_ids(include_archives=True, bind=bind):
+            bloom.add(reference_id)
+            bloom.last_id = max(bloom.last_id, row_id)
+            bloom.count += 1
+        return bloom
+
+    def save(self, path):
+        """บันทึกลงไฟล์ (เขียนไฟล์ชั่วคราวแล้ว rename ทับ)"""
+        header = json.dumps({
+            'capacity': self.capacity,
+            'error_rate': self.error_rate,
+            'num_bits': self.num_bits,
+            'num_hashes': self.num_hashes,
+            'last_id': self.last_id,
+            'count': self.count,
+        }).encode('utf-8')
+        temp_path = f"{path}.tmp"
+        with self._lock, open(temp_path, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            f.write(self.bits)
+        os.replace(temp_path, path)
+        self._last_save = time.monotonic()
+
+    def save_if_due(self, path):
+        if time.monotonic() - self._last_save >= _SAVE_INTERVAL_SECONDS:
+            self.save(path)
+
+    @classmethod
+    def load(cls, path):
+        """โหลดจากไฟล์ (None = ไม่มีไฟล์หรือไฟล์ไม่ถูกต้อง)"""
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(_MAGIC)) != _MAGIC:
+                    return None
+                header_size, = struct.unpack('<I', f.read(4))
+                meta = json.loads(f.read(header_size))
+                bits = bytearray(f.read())
+        except (OSError, ValueError, struct.error):
+            return None
+        if len(bits) != (meta['num_bits'] + 7) // 8:
+            return None
+        return cls(bits=bits, **meta)
+
+
+def load_or_build(path, capacity=None, error_rate=0.001, bind=None):
+    """
+    โหลด filter จากไฟล์แล้วตามเก็บรายการใหม่ หรือสร้างใหม่ถ้าไฟล์ใช้ไม่ได้
+    (ไม่มีไฟล์, database ถูก reset จน last_id เกิน id ล่าสุด, หรือจำนวนเกิน capacity)
+    """
+    bloom = ReferenceBloomFilter.load(path) if path else None
+    if bloom is not None:
+        with (bind or db.engine).connect() as conn:
+            max_id = conn.execute(select(func.max(db.PriceCheck.id))).scalar() or 0
+        if bloom.last_id > max_id or bloom.error_rate != error_rate:
+            bloom = None
+        else:
+            bloom.catch_up(bind=bind)
+            if bloom.count > bloom.capacity:
+                bloom = None
+
+    if bloom is None:
+        bloom = ReferenceBloomFilter.build(capacity, error_rate, bind=bind)
+    if path:
+        bloom.path = path
+        bloom.save(path)
+    return bloom
+
+
+_filter = None
+_filter_lock = threading.Lock()
+
+
+def get_filter(bind=None):
+    """Bloom filter ตัวเดียวของ process (โหลด/สร้างครั้งแรกที่เรียก)"""
+    global _filter
+    with _filter_lock:
+        if _filter is None:
+            path = Config.REFERENCE_BLOOM_PATH
+            _filter = load_or_build(
+                path,
+                capacity=Config.REFERENCE_BLOOM_CAPACITY,
+                error_rate=Config.REFERENCE_BLOOM_ERROR_RATE,
+                bind=bind
+            )
+            db.add_reference_listener(_filter.add_many)
+            if path:
+                atexit.register(_filter.save, path)
+        return _filter
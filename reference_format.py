@@ -0,0 +1,140 @@
+"""
+รูปแบบ reference ID ของ price check
+
+- uuid4 (ค่าเริ่มต้นเดิม): UUID แบบสุ่ม 36 ตัวอักษร
+- compact: UUIDv7 (48 bit แรกเป็นเวลา millisecond) เข้ารหัส Crockford Base32 ตัวพิมพ์เล็ก 26 ตัวอักษร
+  เรียงตามเวลาที่สร้าง แถวใหม่จึงต่อท้าย B-tree ของ reference_id แทนการแทรกกระจายทั้ง index
+  key สั้นกว่า และ QR/ลิงก์ตรวจสอบสั้นลง
+
+เลือกรูปแบบของ ID ใหม่ด้วย REFERENCE_ID_FORMAT ส่วน ID ที่ออกไปแล้วทั้งสองแบบใช้ตรวจสอบได้ตามเดิม
+"""
+import secrets
+import time
+import uuid
+from config import Config
+
+COMPACT_LENGTH = 26
+_ALPHABET = '0123456789abcdefghjkmnpqrstvwxyz'
+_DECODE = {char: value for value, char in enumerate(_ALPHABET)}
+# ตัวอักษรที่ Crockford Base32 ให้อ่านแทนกันได้ (UUID แบบ hex ไม่มีตัวอักษรเหล่านี้)
+_ALIASES = str.maketrans({'i': '1', 'l': '1', 'o': '0'})
+
+
+def encode_compact(value):
+    """UUID -> Crockford Base32 26 ตัวอักษร (ความยาวคงที่ ลำดับตัวอักษรตรงกับลำดับ bytes)"""
+    number = value.int
+    chars = []
+    for _ in range(COMPACT_LENGTH):
+        number, remainder = divmod(number, 32)
+        chars.append(_ALPHABET[remainder])
+    return ''.join(reversed(chars))
+
+
+def decode_compact(reference_id):
+    """Crockford Base32 26 ตัวอักษร -> UUID (None ถ้าไม่ใช่รูปแบบนี้)"""
+    reference_id = reference_id.lower().translate(_ALIASES)
+    if len(reference_id) != COMPACT_LENGTH or reference_id[0] > '7':
+        return None
+    number = 0
+    for char in reference_id:
+        value = _DECODE.get(char)
+        if value is None:
+            return None
+        number = number * 32 + value
+    return uuid.UUID(int=number)
+
+
+def _uuid7(timestamp_ms, counter, random_bytes):
+    """UUIDv7: unix_ts_ms 48 bit, version, rand_a 12 bit (ใช้เป็นลำดับภายใน batch), variant, rand_b 62 bit"""
+    value = (timestamp_ms & 0xFFFFFFFFFFFF) << 80
+    value |= 0x7 << 76
+    value |= (counter & 0xFFF) << 64
+    value |= 0b10 << 62
+    value |= int.from_bytes(random_bytes, 'big') & ((1 << 62) - 1)
+    return uuid.UUID(int=value)
+
+
+def new_compact_ids(count):
+    """reference ID แบบ compact หลายตัว เรียงตามลำดับที่สร้าง (random bytes ก้อนเดียว)"""
+    random_bytes = secrets.token_bytes(8 * count)
+    timestamp_ms = time.time_ns() // 1_000_000
+    start = secrets.randbelow(0x800)  # เริ่มตัวนับแบบสุ่ม ให้ batch จาก process อื่นใน ms เดียวกันไม่ชนลำดับ
+    reference_ids = []
+    for i in range(count):
+        counter = start + i
+        # ตัวนับล้น 12 bit: ขยับไป millisecond ถัดไปเพื่อให้ยังเรียงต่อกัน
+        reference_ids.append(encode_compact(_uuid7(
+            timestamp_ms + (counter >> 12), counter, random_bytes[i * 8:(i + 1) * 8])))
+    return reference_ids
+
+
+def new_uuid4_ids(count):
+    """UUID4 หลายตัวจาก random bytes ก้อนเดียว"""
+    random_bytes = secrets.token_bytes(16 * count)
+    return [
+        str(uuid.UUID(bytes=random_bytes[i * 16:(i + 1) * 16], version=4))
+        for i in range(count)
+    ]
+
+
+def new_reference_ids(count):
+    """reference ID ใหม่ตาม REFERENCE_ID_FORMAT"""
+    if Config.REFERENCE_ID_FORMAT == 'compact':
+        return new_compact_ids(count)
+    return new_uuid4_ids(count)
+
+
+def to_uuid(reference_id):
+    """UUID ของ reference ID ทั้งสองรูปแบบ (None ถ้าไม่ใช่ทั้งสองแบบ เช่น ID ที่กำหนดเอง)"""
+    if len(reference_id) == COMPACT_LENGTH:
+        return decode_compact(reference_id)
+    try:
+        return uuid.UUID(reference_id)
+    except ValueError:
+        return None
+
+
+def from_uuid(value):
+    """reference ID ที่เก็บในระบบจาก UUID (UUIDv7 เก็บแบบ compact, แบบอื่นเก็บเป็น UUID string)"""
+    if value.version == 7:
+        return encode_compact(value)
+    return str(value)
+
+
+def normalize(reference_id):
+    """
+    รูปแบบที่เก็บในระบบของ ID ที่ผู้ใช้กรอก: ตัดช่องว่าง, compact ไม่สนตัวพิมพ์และแก้ I/L/O,
+    UUIDv7 ในรูป UUID string แปลงเป็น compact
+    """
+    reference_id = (reference_id or '').strip()
+    if len(reference_id) == COMPACT_LENGTH:
+        value = decode_compact(reference_id)
+        return encode_compact(value) if value is not None else reference_id
+    if len(reference_id) == 36:
+        try:
+            return from_uuid(uuid.UUID(reference_id))
+        except ValueError:
+            return reference_id
+    return reference_id
+
+
+def normalize_prefix(prefix):
+    """prefix ที่คัดลอกมา: ตัด '...' ท้าย, ตัวพิมพ์เล็ก และแก้ I/L/O ของ Crockford"""
+    prefix = (prefix or '').strip().rstrip('.…').strip().lower()
+    if '-' in prefix:  # UUID
+        return prefix
+    return prefix.translate(_ALIASES)
+
+
+def is_valid_prefix(prefix):
+    """prefix (หลัง normalize_prefix) ที่อาจเป็นส่วนต้นของ UUID หรือ compact ID"""
+    if '-' in prefix:
+        return all(char in '0123456789abcdef-' for char in prefix)
+    return all(char in _DECODE for char in prefix)
+
+
+def display(reference_id):
+    """ID แบบสั้นสำหรับตาราง: compact แสดงเต็ม (ส่วนต้นเป็นเวลา ซ้ำกันได้), UUID แสดง 8 ตัวแรก"""
+    if len(reference_id) == COMPACT_LENGTH:
+        return reference_id
+    return reference_id[:8] + '...'
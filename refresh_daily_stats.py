@@ -0,0 +1,19 @@
+import time
+import database as db
+
+def main():
+    """รวม price_checks ที่ยังไม่อยู่ใน rollup รายวัน (price_check_daily_stats)"""
+    
+    print("🔄 กำลังอัปเดต rollup รายวัน...")
+    
+    started = time.time()
+    processed = db.refresh_daily_stats()
+    elapsed = time.time() - started
+    
+    if processed:
+        print(f"✅ รวม {processed:,} รายการใน {elapsed:.1f} วินาที")
+    else:
+        print("⚠️  Rollup เป็นปัจจุบันอยู่แล้ว")
+
+if __name__ == "__main__":
+    main()
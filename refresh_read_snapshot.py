@@ -0,0 +1,33 @@
+import argparse
+import time
+import database as db
+from config import Config
+
+def refresh():
+    started = time.time()
+    if db.refresh_read_snapshot():
+        print(f"✅ อัปเดต snapshot {Config.READ_SNAPSHOT_PATH} ใน {time.time() - started:.1f} วินาที")
+        return True
+    print("⚠️  ไม่ได้ตั้งค่า READ_SNAPSHOT_PATH หรือฐานข้อมูลหลักไม่ใช่ SQLite")
+    return False
+
+def main():
+    """อัปเดตไฟล์ snapshot สำหรับ query อ่าน (รันครั้งเดียว หรือวนทุก --every วินาที)"""
+    parser = argparse.ArgumentParser(description="Refresh the read-only SQLite snapshot")
+    parser.add_argument("--every", type=int, default=None, help="วนอัปเดตทุกกี่วินาที (ไม่ระบุ = ครั้งเดียว)")
+    args = parser.parse_args()
+
+    if not refresh() or not args.every:
+        return
+    try:
+        while True:
+            time.sleep(args.every)
+            try:
+                refresh()
+            except Exception as e:
+                print(f"❌ อัปเดต snapshot ล้มเหลว: {e}")
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
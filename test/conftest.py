@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+
+# ใช้ฐานข้อมูลชั่วคราวแยกจาก floor_price.db ของจริง (ต้องตั้งก่อน import config)
+_test_db_dir = tempfile.mkdtemp(prefix="floor_price_test_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_test_db_dir, 'test.db')}"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_price_check_fields(user_email='user@example.com', **overrides):
+    """ค่าตั้งต้นของ log_price_check_comprehensive สำหรับใช้ใน test"""
+    fields = dict(
+        user_email=user_email,
+        customer_type='residential',
+        speed=500,
+        distance=0.315,
+        equipment='ONU ZTE F612 (No WiFi + 1POTS)',
+        contract_months=12,
+        has_fixed_ip=False,
+        proposed_price=500.0,
+        discount_percent=0.0,
+        floor_existing=300.0,
+        floor_new=400.0,
+        floor_weighted=330.0,
+        existing_customer_ratio=0.7,
+        new_customer_ratio=0.3,
+        net_revenue=480.0,
+        regulator_fee=20.0,
+        is_valid_existing=True,
+        is_valid_new=True,
+        is_valid_weighted=True,
+        margin_existing_baht=180.0,
+        margin_existing_percent=37.5,
+        margin_new_baht=80.0,
+        margin_new_percent=16.67,
+        margin_weighted_baht=150.0,
+        margin_weighted_percent=31.25,
+    )
+    fields.update(overrides)
+    return fields
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+import bulk_verification
+import database as db
+from conftest import make_price_check_fields
+
+
+def test_bulk_verification_resolves_in_input_order():
+    passed = db.log_price_check_comprehensive(**make_price_check_fields())
+    failed = db.log_price_check_comprehensive(**make_price_check_fields(is_valid_weighted=False))
+    db.mark_as_exported(passed.reference_id, 'exporter@example.com')
+
+    text = (
+        f"reference_id\n{failed.reference_id}\n"
+        f"https://floorprice.example.com/verify/{passed.reference_id}, missing-id\n"
+        f"https://floorprice.example.com/?reference_id={failed.reference_id}"
+    )
+    reference_ids = bulk_verification.parse_reference_ids(text.encode('utf-8-sig'))
+    assert reference_ids == [failed.reference_id, passed.reference_id, 'missing-id']
+
+    results = bulk_verification.verify_reference_ids(reference_ids, chunk_size=1)
+    assert [result['status'] for result in results] == [
+        bulk_verification.STATUS_FAIL, bulk_verification.STATUS_PASS, bulk_verification.STATUS_NOT_FOUND]
+    assert results[1]['export_count'] == 1
+    assert results[1]['floor_weighted'] == passed.floor_weighted
+
+    report = bulk_verification.report_csv(results).decode('utf-8-sig').splitlines()
+    assert len(report) == 4 and report[3].startswith('missing-id,')
+
+
+def test_bulk_verification_finds_archived_checks():
+    archived = db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email='bulk-archive@example.com', checked_at=datetime(2017, 5, 1)))
+    current = db.log_price_check_comprehensive(**make_price_check_fields(user_email='bulk-archive@example.com'))
+    assert db.archive_price_checks(datetime(2018, 1, 1)) >= 1
+
+    results = bulk_verification.verify_reference_ids([archived.reference_id, current.reference_id, 'missing-id'])
+    assert [result['status'] for result in results] == [
+        bulk_verification.STATUS_PASS, bulk_verification.STATUS_PASS, bulk_verification.STATUS_NOT_FOUND]
+    assert results[0]['checked_at'] == datetime(2017, 5, 1)
@@ -0,0 +1,48 @@
+import database as db
+from conftest import make_price_check_fields
+
+
+def _rollup_totals(email):
+    rows = db.get_daily_stats(group_by=('user_email',), user_email=email)
+    return rows[0] if rows else None
+
+
+def test_logging_updates_rollup_incrementally():
+    db.refresh_daily_stats()
+    email = 'rollup@example.com'
+    db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email=email, is_valid_weighted=True, margin_weighted_baht=100.0))
+    db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email=email, is_valid_weighted=False, margin_weighted_baht=-20.0))
+
+    totals = _rollup_totals(email)
+    assert totals['total'] == 2
+    assert totals['valid'] == 1
+    assert totals['avg_margin_baht'] == 40.0
+
+    # watermark ตามทันแล้ว catch-up job ไม่มีอะไรต้องทำ
+    assert db.refresh_daily_stats() == 0
+
+
+def test_catch_up_processes_rows_after_watermark_only():
+    db.refresh_daily_stats()
+    email = 'catchup@example.com'
+
+    # จำลองแถวที่ถูกเพิ่มโดยไม่ผ่าน rollup (เช่น จากระบบเก่า)
+    session = db.SessionLocal()
+    try:
+        fields = make_price_check_fields(user_email=email)
+        session.add(db.PriceCheck(reference_id='catchup-ref-1', floor_price=330.0, is_valid=True, **fields))
+        session.commit()
+    finally:
+        session.close()
+
+    # แถวใหม่หลังจากนั้นต้องไม่ถูกรวมเองจนกว่า catch-up จะรันก่อน (กันนับข้าม)
+    db.log_price_check_comprehensive(**make_price_check_fields(user_email=email))
+    assert _rollup_totals(email) is None
+
+    assert db.refresh_daily_stats(batch_size=1) == 2
+    assert _rollup_totals(email)['total'] == 2
+
+    db.log_price_check_comprehensive(**make_price_check_fields(user_email=email))
+    assert _rollup_totals(email)['total'] == 3
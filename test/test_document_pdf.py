@@ -0,0 +1,16 @@
+import database as db
+import document_export as doc_export
+from conftest import make_price_check_fields
+
+
+def test_pdf_document_reuses_styles_and_template():
+    log = db.log_price_check_comprehensive(**make_price_check_fields(notes='<script>หมายเหตุ</script>'))
+
+    pdf = doc_export.generate_verification_document_pdf(log)
+    styles = doc_export._get_pdf_styles()
+    template = doc_export._get_pdf_page_template()
+    again = doc_export.generate_verification_document_pdf(log)
+
+    assert pdf.startswith(b'%PDF') and again.startswith(b'%PDF')
+    assert doc_export._get_pdf_styles() is styles
+    assert doc_export._get_pdf_page_template() is template
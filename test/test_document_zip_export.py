@@ -0,0 +1,45 @@
+import io
+import zipfile
+from datetime import datetime
+import database as db
+import document_export as doc_export
+from conftest import make_price_check_fields
+
+
+def test_zip_export_renders_documents_and_marks_exported():
+    email = 'zip-export@example.com'
+    reference_ids = db.log_price_checks_bulk([make_price_check_fields(user_email=email) for _ in range(3)])
+    db.mark_as_exported(reference_ids[0], 'earlier@example.com')
+
+    for workers in (0, 1):
+        output = io.BytesIO()
+        count = doc_export.export_documents_zip(
+            output, formats=('html', 'txt'), exported_by='admin@example.com', workers=workers,
+            batch_size=2, user_email=email
+        )
+        assert count == 3
+        names = zipfile.ZipFile(output).namelist()
+        assert len(names) == 6
+        assert any(name.endswith(f"floor_price_{reference_ids[2]}.txt") for name in names)
+
+    records = db.get_verification_records(reference_ids)
+    assert records[reference_ids[0]].export_count == 3
+    assert records[reference_ids[1]].export_count == 2
+    assert db.get_price_check_by_reference(reference_ids[1]).exported_by == 'admin@example.com'
+
+
+def test_zip_export_includes_archived_years():
+    email = 'zip-archive@example.com'
+    old = db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email=email, checked_at=datetime(2018, 3, 1)))
+    db.log_price_check_comprehensive(**make_price_check_fields(user_email=email))
+    assert db.archive_price_checks(datetime(2019, 1, 1)) >= 1
+
+    output = io.BytesIO()
+    count = doc_export.export_documents_zip(
+        output, formats=('txt',), exported_by='admin@example.com', workers=0, batch_size=1,
+        user_email=email, date_from=datetime(2018, 1, 1), date_to=datetime(2019, 1, 1)
+    )
+    assert count == 1
+    assert zipfile.ZipFile(output).namelist() == [f"2018-03-01/floor_price_{old.reference_id}.txt"]
+    assert db.get_price_check_by_reference(old.reference_id).export_count == 1
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import database as db
+
+
+def _add_legacy_rows(email, count):
+    session = db.SessionLocal()
+    try:
+        session.add_all([
+            db.PriceCheckLegacy(
+                user_email=email, customer_type='residential', has_fixed_ip=False,
+                speed=500, distance=1.0, equipment='ONU', contract_months=12,
+                proposed_price=400.0 + i, floor_price=380.0, is_valid=True,
+                margin_percent=5.0, checked_at=datetime(2022, 1, 1 + i)
+            )
+            for i in range(count)
+        ])
+        session.commit()
+    finally:
+        session.close()
+
+
+def _v2_rows(email):
+    session = db.SessionLocal()
+    try:
+        return session.query(db.PriceCheck).filter(db.PriceCheck.user_email == email)\
+            .order_by(db.PriceCheck.checked_at).all()
+    finally:
+        session.close()
+
+
+def test_legacy_migration_is_chunked_and_resumable():
+    email = 'legacy@example.com'
+    db.migrate_legacy_price_checks()  # เคลียร์แถว legacy ที่อาจค้างจาก test อื่น
+    _add_legacy_rows(email, 5)
+
+    first = db.migrate_legacy_price_checks(chunk_size=2, max_chunks=1)
+    assert first['migrated'] == 2
+    assert first['remaining'] == 3
+    assert len(_v2_rows(email)) == 2
+
+    rest = db.migrate_legacy_price_checks(chunk_size=2)
+    assert rest['migrated'] == 3
+    assert rest['remaining'] == 0
+    assert db.migrate_legacy_price_checks(chunk_size=2)['migrated'] == 0
+
+    rows = _v2_rows(email)
+    assert len(rows) == 5
+    assert rows[0].checked_at == datetime(2022, 1, 1)
+    # คำนวณใหม่ตามกติกา v2: รายได้สุทธิหลังหักค่าธรรมเนียม 4% (400 * 0.96 = 384 >= 380)
+    assert rows[0].net_revenue == 384.0
+    assert rows[0].is_valid_weighted
+    assert all(row.reference_id for row in rows)
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import database as db
+from conftest import make_price_check_fields
+
+
+def test_archived_checks_stay_reachable_by_reference():
+    old = db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email='archive@example.com', checked_at=datetime(2019, 6, 1)))
+    newest = db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email='archive@example.com'))
+
+    assert db.archive_price_checks(datetime(2020, 1, 1)) >= 1
+
+    logs, _ = db.get_price_checks_page(user_email='archive@example.com')
+    assert [log.reference_id for log in logs] == [newest.reference_id]
+
+    entry = {entry.year: entry for entry in db.get_price_check_archives()}[2019]
+    assert entry.table_name == 'price_checks_archive_2019'
+    assert entry.row_count >= 1
+
+    found = db.get_price_check_by_reference(old.reference_id)
+    assert found.checked_at == datetime(2019, 6, 1)
+    assert found.user_email == 'archive@example.com'
+
+    assert db.mark_as_exported(old.reference_id, 'auditor@example.com')
+    assert db.get_price_check_by_reference(old.reference_id).export_count == 1
+
+
+def test_expired_otps_are_purged():
+    db.create_otp('otp-purge@example.com')
+    session = db.SessionLocal()
+    try:
+        session.add(db.OTP(email='otp-purge@example.com', otp_code='000000',
+                           expires_at=datetime.utcnow() - timedelta(days=3)))
+        session.commit()
+    finally:
+        session.close()
+
+    assert db.purge_expired_otps() >= 1
+
+    session = db.SessionLocal()
+    try:
+        remaining = session.query(db.OTP).filter(db.OTP.email == 'otp-purge@example.com').count()
+    finally:
+        session.close()
+    assert remaining == 1
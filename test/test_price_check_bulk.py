@@ -0,0 +1,14 @@
+import database as db
+from conftest import make_price_check_fields
+
+
+def test_bulk_insert_returns_reference_ids_in_order():
+    email = 'bulk@example.com'
+    rows = [make_price_check_fields(user_email=email, speed=100 + i) for i in range(25)]
+
+    reference_ids = db.log_price_checks_bulk(rows, chunk_size=10)
+
+    assert len(reference_ids) == 25
+    assert len(set(reference_ids)) == 25
+    assert db.get_price_check_by_reference(reference_ids[7]).speed == 107
+    assert db.get_daily_stats(group_by=('user_email',), user_email=email)[0]['total'] == 25
@@ -0,0 +1,74 @@
+from sqlalchemy import text
+
+import database as db
+from conftest import make_price_check_fields
+
+F612 = 'ONU ZTE F612 (No WiFi + 1POTS)'
+ROUTER = 'WiFi 6 Router (AX.3000)'
+
+
+def test_equipment_is_linked_on_insert():
+    email = 'dict@example.com'
+    db.create_user(email)
+    log = db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email=email, equipment=f'{F612},{ROUTER}'))
+    db.log_price_checks_bulk([make_price_check_fields(user_email=email, equipment=ROUTER)])
+
+    logs, _ = db.get_price_checks_page(user_email=email, equipment=F612)
+    assert [row.reference_id for row in logs] == [log.reference_id]
+    assert db.get_price_check_summary(user_email=email, equipment=ROUTER)['total'] == 2
+
+    usage = {row['value']: row['total'] for row in db.get_price_check_breakdown('equipment', user_email=email)}
+    assert usage == {F612: 1, ROUTER: 2}
+
+
+def test_backfill_links_rows_written_before_migration():
+    email = 'dict-backfill@example.com'
+    db.create_user(email)
+    log = db.log_price_check_comprehensive(**make_price_check_fields(user_email=email, equipment=F612))
+
+    # จำลองแถวที่บันทึกก่อน migration 9
+    with db.engine.begin() as conn:
+        conn.execute(text("DELETE FROM price_check_equipment WHERE price_check_id = :id"), {"id": log.id})
+        conn.execute(text("DELETE FROM data_migration_checkpoints WHERE name = :name"),
+                     {"name": db.DICTIONARY_BACKFILL})
+    assert db.get_price_check_summary(user_email=email, equipment=F612)['total'] == 0
+
+    assert db.backfill_price_check_dictionaries() >= 1
+    assert db.get_price_check_summary(user_email=email, equipment=F612)['total'] == 1
+    assert db.backfill_price_check_dictionaries() == 0
+
+
+def test_sku_ids_are_cached_only_after_commit():
+    name = 'Rolled Back SKU (test)'
+    session = db.SessionLocal()
+    try:
+        db._equipment_sku_ids(session, [name])
+        session.rollback()
+    finally:
+        session.close()
+    assert name not in db._equipment_sku_cache
+
+    email = 'dict-rollback@example.com'
+    db.log_price_check_comprehensive(**make_price_check_fields(user_email=email, equipment=name))
+    assert name in db._equipment_sku_cache
+    assert db.get_price_check_summary(user_email=email, equipment=name)['total'] == 1
+
+
+def test_existing_sku_created_elsewhere_is_reused():
+    name = 'Shared SKU (test)'
+    ids = []
+    # process อื่นสร้าง SKU เดียวกันไปแล้ว (ไม่อยู่ใน cache ของ process นี้)
+    for _ in range(2):
+        session = db.SessionLocal()
+        try:
+            ids.append(db._equipment_sku_ids(session, [name])[name])
+            session.commit()
+        finally:
+            session.close()
+        db._equipment_sku_cache.pop(name, None)
+
+    assert ids[0] == ids[1]
+    with db.engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM equipment_skus WHERE name = :name"),
+                            {"name": name}).scalar() == 1
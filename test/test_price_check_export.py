@@ -0,0 +1,50 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+import database as db
+from conftest import make_price_check_fields
+
+
+def test_streaming_export_csv_and_jsonl():
+    email = 'export@example.com'
+    db.log_price_checks_bulk([
+        make_price_check_fields(user_email=email, notes='หมายเหตุ' if i == 0 else None)
+        for i in range(5)
+    ])
+
+    output = io.BytesIO()
+    count = db.export_price_checks(output, fmt='csv', user_email=email, batch_size=2)
+    assert count == 5
+    rows = list(csv.DictReader(io.StringIO(output.getvalue().decode('utf-8-sig'))))
+    assert len(rows) == 5
+    assert rows[0]['user_email'] == email
+    assert rows[0]['notes'] == 'หมายเหตุ'
+
+    output = io.BytesIO()
+    count = db.export_price_checks(output, fmt='jsonl', compress=True, user_email=email)
+    assert count == 5
+    lines = gzip.decompress(output.getvalue()).decode('utf-8').splitlines()
+    records = [json.loads(line) for line in lines]
+    assert {record['user_email'] for record in records} == {email}
+    assert not output.closed
+
+
+def test_export_includes_archived_years():
+    email = 'export-archive@example.com'
+    archived = db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email=email, checked_at=datetime(2016, 2, 1)))
+    current = db.log_price_check_comprehensive(**make_price_check_fields(user_email=email))
+    assert db.archive_price_checks(datetime(2017, 1, 1)) >= 1
+
+    output = io.BytesIO()
+    assert db.export_price_checks(output, fmt='csv', user_email=email, batch_size=1) == 2
+    rows = list(csv.DictReader(io.StringIO(output.getvalue().decode('utf-8-sig'))))
+    assert [row['reference_id'] for row in rows] == [archived.reference_id, current.reference_id]
+
+    output = io.BytesIO()
+    assert db.export_price_checks(output, fmt='jsonl', user_email=email) == 2
+    records = [json.loads(line) for line in output.getvalue().decode('utf-8').splitlines()]
+    assert records[0]['checked_at'] == '2016-02-01T00:00:00'
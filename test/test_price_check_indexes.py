@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from sqlalchemy import text, tuple_
+
+import database as db
+from database import PriceCheck
+
+
+def _query_plan(query):
+    """คืน EXPLAIN QUERY PLAN ของ ORM query เป็นข้อความเดียว"""
+    statement = query.statement.compile(db.engine, compile_kwargs={"literal_binds": True})
+    with db.engine.connect() as conn:
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {statement}")).fetchall()
+    return "\n".join(row[-1] for row in rows)
+
+
+def test_indexes_exist():
+    assert db.get_schema_version() == db.LATEST_SCHEMA_VERSION
+    with db.engine.begin() as conn:
+        assert db.ensure_price_checks_indexes(conn) == []
+
+    index_names = {index.name for index in PriceCheck.__table__.indexes}
+    assert {
+        'idx_price_checks_user_checked_at_id',
+        'idx_price_checks_checked_at',
+        'idx_price_checks_valid_checked_at',
+    } <= index_names
+
+
+def test_user_logs_uses_user_index():
+    session = db.SessionLocal()
+    try:
+        query = session.query(PriceCheck).filter(
+            PriceCheck.user_email == 'user@example.com'
+        ).order_by(PriceCheck.checked_at.desc()).limit(50)
+        plan = _query_plan(query)
+    finally:
+        session.close()
+
+    assert 'idx_price_checks_user_checked_at_id' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_all_logs_uses_checked_at_index():
+    session = db.SessionLocal()
+    try:
+        query = session.query(PriceCheck).order_by(PriceCheck.checked_at.desc()).limit(500)
+        plan = _query_plan(query)
+    finally:
+        session.close()
+
+    assert 'idx_price_checks_checked_at' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_validity_filter_uses_valid_index():
+    session = db.SessionLocal()
+    try:
+        query = session.query(PriceCheck).filter(
+            PriceCheck.is_valid_weighted == False
+        ).order_by(PriceCheck.checked_at.desc()).limit(100)
+        plan = _query_plan(query)
+    finally:
+        session.close()
+
+    assert 'idx_price_checks_valid_checked_at' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_keyset_page_uses_user_index_without_sort():
+    cursor = (datetime(2025, 1, 1), 100)
+    session = db.SessionLocal()
+    try:
+        query = session.query(PriceCheck).filter(
+            PriceCheck.user_email == 'user@example.com',
+            tuple_(PriceCheck.checked_at, PriceCheck.id) < cursor
+        ).order_by(PriceCheck.checked_at.desc(), PriceCheck.id.desc()).limit(51)
+        plan = _query_plan(query)
+    finally:
+        session.close()
+
+    assert 'idx_price_checks_user_checked_at_id' in plan
+    assert 'TEMP B-TREE' not in plan
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import database as db
+from conftest import make_price_check_fields
+
+
+def _seed(user_email, count):
+    for i in range(count):
+        db.log_price_check_comprehensive(**make_price_check_fields(
+            user_email=user_email,
+            is_valid_weighted=(i % 2 == 0),
+        ))
+
+
+def test_keyset_pages_cover_all_rows_once():
+    _seed('pager@example.com', 7)
+
+    seen = []
+    cursor = None
+    while True:
+        logs, cursor = db.get_price_checks_page(limit=3, cursor=cursor, user_email='pager@example.com')
+        seen.extend(log.id for log in logs)
+        if cursor is None:
+            break
+
+    assert len(seen) == 7
+    assert len(set(seen)) == 7
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_page_filters():
+    _seed('filter@example.com', 4)
+
+    passed, _ = db.get_price_checks_page(user_email='filter@example.com', is_valid=True)
+    failed, _ = db.get_price_checks_page(user_email='filter@example.com', is_valid=False)
+    assert len(passed) == 2
+    assert len(failed) == 2
+
+    tomorrow = datetime.utcnow() + timedelta(days=1)
+    future, cursor = db.get_price_checks_page(user_email='filter@example.com', date_from=tomorrow)
+    assert future == []
+    assert cursor is None
+
+
+def test_projected_page_returns_only_requested_columns():
+    _seed('projected@example.com', 3)
+
+    rows, cursor = db.get_price_checks_page(
+        limit=2, user_email='projected@example.com', columns=('reference_id', 'speed')
+    )
+
+    assert len(rows) == 2
+    assert set(rows[0]._fields) == {'reference_id', 'speed', 'checked_at', 'id'}
+    assert cursor == (rows[-1].checked_at, rows[-1].id)
+
+    rest, cursor = db.get_price_checks_page(
+        limit=2, cursor=cursor, user_email='projected@example.com', columns=db.HISTORY_COLUMNS
+    )
+    assert len(rest) == 1
+    assert cursor is None
@@ -0,0 +1,48 @@
+import database as db
+from conftest import make_price_check_fields
+
+
+def test_search_ranks_matches_and_follows_updates():
+    email = 'search@example.com'
+    db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email=email, equipment='ONU Huawei HG8145X6 (AX3000 + 1POTS)', notes='ลูกค้าโรงแรมริมทะเล'))
+    target = db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email=email, equipment='ONU ZTE F612 (No WiFi + 1POTS)', notes='ZTE F612 สำหรับโรงแรม'))
+    db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email='other@example.com', notes='โรงแรมอื่น'))
+
+    results = db.search_price_checks('F612', user_email=email, columns=db.HISTORY_COLUMNS)
+    assert [row.reference_id for row in results] == [target.reference_id]
+
+    # ค้นคำไทยบางส่วนได้ และจำกัดเฉพาะของ user
+    assert len(db.search_price_checks('โรงแรม', user_email=email)) == 2
+
+    # trigger ลบข้อมูลเก่าออกจาก index เมื่อแก้ไข notes
+    session = db.SessionLocal()
+    try:
+        session.query(db.PriceCheck).filter(db.PriceCheck.id == target.id).update({'notes': 'ยกเลิก'})
+        session.commit()
+    finally:
+        session.close()
+    assert db.search_price_checks('สำหรับโรงแรม', user_email=email) == []
+
+    # คำค้นสั้นใช้ LIKE แทน
+    assert db.search_price_checks('AX', user_email=email)
+
+
+def test_short_terms_narrow_fts_results():
+    email = 'search-short@example.com'
+    both = db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email=email, notes='AP 5G router router ชั้น 2'))
+    router_only = db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email=email, notes='router สำรอง'))
+    weaker = db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email=email, notes='AP 5G router พร้อมอุปกรณ์เสริมและสายแลนยาวสำหรับติดตั้งหลายชั้นในอาคาร'))
+
+    # ทุกคำต้องพบ รวมคำที่สั้นกว่า 3 ตัวอักษร และเรียงตามความเกี่ยวข้อง
+    results = db.search_price_checks('AP 5G router', user_email=email)
+    assert [log.reference_id for log in results] == [both.reference_id, weaker.reference_id]
+
+    assert {log.reference_id for log in db.search_price_checks('router', user_email=email)} == {
+        both.reference_id, router_only.reference_id, weaker.reference_id
+    }
@@ -0,0 +1,38 @@
+import database as db
+from conftest import make_price_check_fields
+
+
+def test_summary_and_breakdown():
+    email = 'stats@example.com'
+    db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email=email, speed=500, is_valid_weighted=True, margin_weighted_percent=20.0))
+    db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email=email, speed=500, is_valid_weighted=False, margin_weighted_percent=-10.0))
+    db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email=email, speed=1000, is_valid_weighted=True, margin_weighted_percent=30.0))
+
+    summary = db.get_price_check_summary(user_email=email)
+    assert summary['total'] == 3
+    assert summary['valid'] == 2
+    assert summary['invalid'] == 1
+    assert round(summary['pass_rate'], 2) == 66.67
+    assert round(summary['avg_margin_percent'], 2) == 13.33
+
+    breakdown = {row['value']: row for row in db.get_price_check_breakdown('speed', user_email=email)}
+    assert breakdown[500]['total'] == 2
+    assert breakdown[500]['valid'] == 1
+    assert breakdown[1000]['pass_rate'] == 100.0
+
+
+def test_summary_empty():
+    summary = db.get_price_check_summary(user_email='nobody@example.com')
+    assert summary['total'] == 0
+    assert summary['pass_rate'] == 0.0
+
+
+def test_user_stats_single_query():
+    db.create_user('stats-admin@example.com', is_admin=True)
+    stats = db.get_user_stats()
+    assert stats['total'] >= 1
+    assert stats['admins'] >= 1
+    assert stats['inactive'] == stats['total'] - stats['active']
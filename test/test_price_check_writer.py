@@ -0,0 +1,81 @@
+import threading
+import time
+import database as db
+from conftest import make_price_check_fields
+from price_check_writer import PriceCheckWriter
+
+
+def test_write_behind_returns_reference_and_flushes_batch():
+    writer = PriceCheckWriter(max_delay_ms=5000, max_batch=100)
+    try:
+        logs = [writer.submit(**make_price_check_fields(user_email='writer@example.com')) for _ in range(5)]
+        assert all(log.reference_id and log.id is None for log in logs)
+
+        assert writer.flush(timeout=10)
+        for log in logs:
+            assert db.get_price_check_by_reference(log.reference_id) is not None
+    finally:
+        writer.close()
+
+
+def test_close_flushes_pending_rows():
+    writer = PriceCheckWriter(max_delay_ms=5000, max_batch=100)
+    log = writer.submit(**make_price_check_fields(user_email='writer-close@example.com'))
+    writer.close()
+
+    assert db.get_price_check_by_reference(log.reference_id) is not None
+    assert db.get_price_check_summary(user_email='writer-close@example.com')['total'] == 1
+
+
+def test_poison_row_is_dead_lettered_without_blocking_batch(tmp_path):
+    existing = db.log_price_check_comprehensive(**make_price_check_fields(user_email='writer-poison@example.com'))
+    dead_letters = tmp_path / 'dead.jsonl'
+    writer = PriceCheckWriter(max_delay_ms=5000, max_batch=100, retry_delay=0, dead_letter_path=str(dead_letters))
+    try:
+        good = writer.submit(**make_price_check_fields(user_email='writer-poison@example.com'))
+        # reference_id ซ้ำละเมิด unique constraint ทำให้ทั้ง batch ล้มเหลว
+        writer.submit(**make_price_check_fields(user_email='writer-poison@example.com',
+                                                reference_id=existing.reference_id))
+        assert not writer.flush(timeout=10)
+
+        assert db.get_price_check_by_reference(good.reference_id) is not None
+        assert writer.dead_lettered == 1
+        assert existing.reference_id in dead_letters.read_text(encoding='utf-8')
+
+        later = writer.submit(**make_price_check_fields(user_email='writer-poison@example.com'))
+        assert writer.flush(timeout=10)
+        assert db.get_price_check_by_reference(later.reference_id) is not None
+    finally:
+        writer.close()
+
+
+def test_flush_and_close_drain_a_full_queue_while_worker_retries(monkeypatch, tmp_path):
+    persist = db.persist_price_checks
+    worker_blocked = threading.Event()
+    worker_blocked.set()
+
+    def failing_in_worker(rows):
+        # background thread ติด retry อยู่ แต่ thread ของผู้เรียกยังบันทึกได้
+        if worker_blocked.is_set() and threading.current_thread().name == 'price-check-writer':
+            raise RuntimeError("database unavailable")
+        persist(rows)
+
+    monkeypatch.setattr(db, 'persist_price_checks', failing_in_worker)
+    writer = PriceCheckWriter(max_delay_ms=50, max_batch=1, max_queue=2, retry_delay=0.05, max_retries=1000,
+                              dead_letter_path=str(tmp_path / 'dead.jsonl'))
+    try:
+        first = writer.submit(**make_price_check_fields(user_email='writer-full@example.com'))
+        time.sleep(0.2)
+        queued = [writer.submit(**make_price_check_fields(user_email='writer-full@example.com')) for _ in range(2)]
+
+        started = time.monotonic()
+        assert not writer.flush(timeout=1)
+        assert time.monotonic() - started < 5
+        for log in queued:
+            assert db.get_price_check_by_reference(log.reference_id) is not None
+    finally:
+        worker_blocked.clear()
+        writer.close(timeout=10)
+
+    assert db.get_price_check_by_reference(first.reference_id) is not None
+    assert writer.dead_lettered == 0
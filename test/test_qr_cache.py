@@ -0,0 +1,31 @@
+import os
+import document_export as doc_export
+import database as db
+from conftest import make_price_check_fields
+
+
+def test_qr_codes_are_cached_in_memory_and_on_disk(monkeypatch, tmp_path):
+    monkeypatch.setattr(db.Config, 'QR_CACHE_DIR', str(tmp_path))
+    payload = 'https://floorprice.example.com/?reference_id=qr-cache-test'
+
+    png = doc_export.qr_code_image(payload)
+    assert png.startswith(b'\x89PNG')
+    assert doc_export.qr_code_image(payload) is png
+    cached_file = doc_export._qr_cache_path(payload, 'png')
+    assert os.path.exists(cached_file)
+
+    # process ใหม่ (cache ในหน่วยความจำว่าง) อ่านจาก disk
+    doc_export._qr_cache.clear()
+    with open(cached_file, 'wb') as f:
+        f.write(b'from-disk')
+    assert doc_export.qr_code_image(payload) == b'from-disk'
+    doc_export._qr_cache.clear()
+
+
+def test_html_document_embeds_vector_qr(monkeypatch):
+    monkeypatch.setattr(db.Config, 'QR_HTML_FORMAT', 'svg')
+    log = db.log_price_check_comprehensive(**make_price_check_fields())
+
+    html = doc_export.generate_verification_document_html(log)
+    assert '<svg width="120" height="120"' in html
+    assert 'data:image/png' not in html
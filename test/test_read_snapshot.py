@@ -0,0 +1,32 @@
+import database as db
+from conftest import make_price_check_fields
+
+
+def test_reads_use_snapshot_and_verification_falls_back_to_primary(tmp_path, monkeypatch):
+    monkeypatch.setattr(db.Config, 'READ_SNAPSHOT_PATH', str(tmp_path / 'snapshot.db'))
+    monkeypatch.setattr(db, 'read_engine', db._create_read_engine())
+    email = 'snapshot@example.com'
+
+    # ยังไม่มี snapshot: อ่านจาก primary
+    assert db._read_bind() is db.engine
+
+    first = db.log_price_check_comprehensive(**make_price_check_fields(user_email=email))
+    assert db.refresh_read_snapshot()
+    assert db._read_bind() is db.read_engine
+
+    second = db.log_price_check_comprehensive(**make_price_check_fields(user_email=email))
+
+    # ประวัติอ่านจาก snapshot จึงยังไม่เห็นรายการที่บันทึกหลัง refresh
+    logs, _ = db.get_price_checks_page(user_email=email)
+    assert [log.reference_id for log in logs] == [first.reference_id]
+
+    # verification ค้นต่อที่ primary เมื่อ snapshot ยังไม่มี
+    assert db.get_price_check_by_reference(second.reference_id).id == second.id
+
+    # คัดลอกทีละ page ได้ snapshot ครบเหมือนคัดลอกครั้งเดียว
+    assert db.refresh_read_snapshot(pages=1, sleep=0)
+    assert db.get_price_check_summary(user_email=email)['total'] == 2
+
+    # การมี FTS ถูกจำแยกตาม engine ที่อ่าน
+    assert db.search_price_checks(email)
+    assert db.read_engine in db._fts_available
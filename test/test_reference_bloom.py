@@ -0,0 +1,61 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+import reference_bloom
+import verification_lookup
+import database as db
+from conftest import make_price_check_fields
+
+
+def test_filter_persists_and_catches_up(tmp_path):
+    path = str(tmp_path / 'refs.bloom')
+    existing = db.log_price_check_comprehensive(**make_price_check_fields())
+
+    bloom = reference_bloom.load_or_build(path)
+    assert existing.reference_id in bloom
+    assert not bloom.might_exist('00000000-0000-0000-0000-000000000000')
+
+    newer = db.log_price_check_comprehensive(**make_price_check_fields())
+    reloaded = reference_bloom.load_or_build(path)
+    assert reloaded.last_id == newer.id
+    assert existing.reference_id in reloaded and newer.reference_id in reloaded
+
+    # ID ที่บันทึกหลังสร้าง filter ถูกตามเก็บก่อนตอบว่าไม่มี
+    latest = db.log_price_check_comprehensive(**make_price_check_fields())
+    assert reloaded.might_exist(latest.reference_id)
+
+
+def test_lookup_rejects_unknown_ids_without_database(monkeypatch):
+    bloom = reference_bloom.load_or_build(None)
+    log = db.log_price_check_comprehensive(**make_price_check_fields())
+    lookup = verification_lookup.VerificationLookup(reference_filter=bloom)
+    assert lookup.get(log.reference_id).reference_id == log.reference_id
+
+    def fail(*args, **kwargs):
+        raise AssertionError("database should not be queried")
+
+    monkeypatch.setattr(db, 'get_verification_record', fail)
+    assert lookup.get('ffffffff-ffff-ffff-ffff-ffffffffffff') is None
+
+    # ID เดิมที่ไม่พบซ้ำตอบจาก negative cache โดยไม่ตามเก็บใหม่
+    monkeypatch.setattr(db, 'iter_reference_ids', fail)
+    assert lookup.get('ffffffff-ffff-ffff-ffff-ffffffffffff') is None
+
+
+def test_row_committed_through_another_engine_verifies_immediately():
+    bloom = reference_bloom.load_or_build(None)
+    lookup = verification_lookup.VerificationLookup(reference_filter=bloom)
+    assert lookup.get('eeeeeeee-eeee-eeee-eeee-eeeeeeeeeeee') is None
+
+    # engine แยกแทน process อื่น: ไม่ผ่าน db.add_reference_listener ของ process นี้
+    other_engine = create_engine(db.engine.url)
+    try:
+        log = db.build_price_check(**make_price_check_fields())
+        with Session(other_engine) as session:
+            session.add(log)
+            session.commit()
+            reference_id = log.reference_id
+    finally:
+        other_engine.dispose()
+
+    assert reference_id not in bloom
+    assert lookup.get(reference_id).reference_id == reference_id
@@ -0,0 +1,33 @@
+import database as db
+import reference_format
+import verification_token
+from conftest import make_price_check_fields
+
+
+def test_compact_ids_are_time_ordered_and_round_trip():
+    first = reference_format.new_compact_ids(5000)
+    second = reference_format.new_compact_ids(10)
+    reference_ids = first + second
+    assert reference_ids == sorted(reference_ids)
+    assert len(set(reference_ids)) == len(reference_ids)
+
+    value = reference_format.decode_compact(reference_ids[0])
+    assert value.version == 7
+    assert len(reference_ids[0]) == 26
+    assert reference_format.from_uuid(value) == reference_ids[0]
+    # ตัวพิมพ์ใหญ่ / UUID string ของ ID เดียวกัน / I-L-O ที่อ่านสับสน ใช้ค้นได้
+    assert reference_format.normalize(str(value)) == reference_ids[0]
+    assert reference_format.normalize(reference_ids[0].upper().replace('1', 'I')) == reference_ids[0]
+
+
+def test_compact_reference_ids_verify_alongside_uuid4(monkeypatch):
+    monkeypatch.setattr(db.Config, 'REFERENCE_ID_FORMAT', 'compact')
+    monkeypatch.setattr(db.Config, 'SECRET_KEY', 'test-secret')
+    log = db.log_price_check_comprehensive(**make_price_check_fields())
+    old = db.log_price_check_comprehensive(**make_price_check_fields(
+        reference_id='6f1c2a9e-3b7d-4c11-9a8e-2d4b6c8e0f12'))
+
+    assert len(log.reference_id) == 26
+    assert db.get_price_check_by_reference(log.reference_id.upper()).id == log.id
+    assert db.get_price_check_by_reference(old.reference_id).id == old.id
+    assert verification_token.decode_token(verification_token.create_token(log)).reference_id == log.reference_id
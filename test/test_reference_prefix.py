@@ -0,0 +1,14 @@
+import database as db
+from conftest import make_price_check_fields
+
+
+def test_prefix_lookup_resolves_unique_and_reports_ambiguous():
+    first = db.log_price_check_comprehensive(**make_price_check_fields(reference_id='abcdef12-0000-4000-8000-000000000001'))
+    db.log_price_check_comprehensive(**make_price_check_fields(reference_id='abcdef12-0000-4000-8000-000000000002'))
+
+    assert db.find_reference_ids_by_prefix('ABCDEF12-0000-4000-8000-000000000001') == [first.reference_id]
+    assert db.find_reference_ids_by_prefix(' abcdef12-0000-4000-8000-0000000000... ') == [
+        'abcdef12-0000-4000-8000-000000000001', 'abcdef12-0000-4000-8000-000000000002']
+    assert db.find_reference_ids_by_prefix('abcdef12', limit=1) == [first.reference_id]
+    # prefix สั้นเกินไม่ค้น
+    assert db.find_reference_ids_by_prefix('abcdef') == []
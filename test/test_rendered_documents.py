@@ -0,0 +1,24 @@
+import database as db
+import document_export as doc_export
+from conftest import make_price_check_fields
+
+
+def test_rendered_document_is_stored_once_and_reused(monkeypatch):
+    log = db.log_price_check_comprehensive(**make_price_check_fields())
+
+    first = doc_export.render_document(log, 'html')
+    assert log.reference_id.encode('utf-8') in first
+    # เอกสารถูก cache ตลอดไป จึงแสดงเวลาตรวจสอบแทนเวลาที่ render
+    assert log.checked_at.strftime('%d/%m/%Y %H:%M:%S').encode('utf-8') in first
+    assert 'สร้างเมื่อ'.encode('utf-8') not in first
+
+    calls = []
+    monkeypatch.setitem(doc_export.DOCUMENT_RENDERERS, 'html', lambda log: calls.append(log) or 'changed')
+    assert doc_export.render_document(log, 'html') == first
+    assert not calls
+
+    # template เวอร์ชันใหม่ render ใหม่ และลบของเวอร์ชันเก่าได้
+    monkeypatch.setattr(doc_export, 'DOCUMENT_TEMPLATE_VERSION', doc_export.DOCUMENT_TEMPLATE_VERSION + 1)
+    assert doc_export.render_document(log, 'html') == b'changed'
+    assert db.purge_rendered_documents(template_version=doc_export.DOCUMENT_TEMPLATE_VERSION) >= 1
+    assert doc_export.render_document(log, 'html') == b'changed'
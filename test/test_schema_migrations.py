@@ -0,0 +1,66 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, exc, inspect, text
+
+import database as db
+
+
+def test_startup_is_a_version_read_once_migrated():
+    assert db.get_schema_version() == db.LATEST_SCHEMA_VERSION
+    assert db.run_migrations() == []
+
+
+def test_migrations_upgrade_legacy_database(tmp_path, monkeypatch):
+    legacy_engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with legacy_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR NOT NULL)"))
+        conn.execute(text(
+            "CREATE TABLE price_checks (id INTEGER PRIMARY KEY, user_email VARCHAR NOT NULL, "
+            "checked_at DATETIME, speed INTEGER, distance FLOAT, contract_months INTEGER, "
+            "proposed_price FLOAT)"
+        ))
+        conn.execute(text("INSERT INTO users (email) VALUES ('old@example.com')"))
+        conn.execute(text(
+            "INSERT INTO price_checks (user_email, checked_at, speed, distance, contract_months, proposed_price) "
+            "VALUES ('old@example.com', '2024-01-01 00:00:00', 500, 0.3, 12, 500)"
+        ))
+
+    monkeypatch.setattr(db, 'engine', legacy_engine)
+
+    assert db.get_schema_version() == 0
+    applied = db.run_migrations()
+    assert [version for version, _ in applied] == [version for version, _, _ in db.MIGRATIONS]
+    assert db.get_schema_version() == db.LATEST_SCHEMA_VERSION
+
+    with legacy_engine.connect() as conn:
+        row = conn.execute(text(
+            "SELECT customer_type, reference_id, is_valid_weighted FROM price_checks"
+        )).one()
+        assert row.customer_type == 'residential'
+        assert row.reference_id
+        assert conn.execute(text("SELECT is_active FROM users")).scalar() == 1
+
+    index_names = {index['name'] for index in inspect(legacy_engine).get_indexes('price_checks')}
+    assert 'idx_price_checks_checked_at' in index_names
+    assert 'user_id' not in {column['name'] for column in inspect(legacy_engine).get_columns('price_checks')}
+
+    # รันซ้ำไม่มีอะไรต้องทำ
+    assert db.run_migrations() == []
+
+
+def test_locked_database_is_not_reported_as_unmigrated(tmp_path, monkeypatch):
+    path = tmp_path / 'locked.db'
+    locked_engine = create_engine(f"sqlite:///{path}", connect_args={'timeout': 0.1})
+    monkeypatch.setattr(db, 'engine', locked_engine)
+    db.run_migrations()
+
+    holder = sqlite3.connect(path)
+    try:
+        holder.execute("BEGIN EXCLUSIVE")
+        with pytest.raises(exc.OperationalError):
+            db.get_schema_version()
+    finally:
+        holder.rollback()
+        holder.close()
+    assert db.get_schema_version() == db.LATEST_SCHEMA_VERSION
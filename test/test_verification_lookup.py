@@ -0,0 +1,40 @@
+import database as db
+import verification_lookup
+from conftest import make_price_check_fields
+
+
+def test_lookup_caches_hits_and_misses():
+    lookup = verification_lookup.VerificationLookup(
+        negative_ttl=60, export_ttl=60, bind=verification_lookup.create_lookup_engine())
+    log = db.log_price_check_comprehensive(**make_price_check_fields(
+        user_email='verify-cache@example.com', ip_address='10.0.0.1'))
+
+    record = lookup.get(log.reference_id)
+    assert record.proposed_price == log.proposed_price
+    assert not hasattr(record, 'ip_address')
+
+    # ผลที่พบถูก cache: ไม่อ่าน database ซ้ำ
+    session = db.SessionLocal()
+    try:
+        session.query(db.PriceCheck).filter(db.PriceCheck.id == log.id).update({'proposed_price': 1.0})
+        session.commit()
+    finally:
+        session.close()
+    assert lookup.get(log.reference_id).proposed_price == log.proposed_price
+
+    # ID ที่ไม่พบถูก cache ตาม negative_ttl
+    assert lookup.get('does-not-exist') is None
+    late = db.log_price_check_comprehensive(**make_price_check_fields(reference_id='does-not-exist'))
+    assert lookup.get('does-not-exist') is None
+    lookup.negative_ttl = 0
+    lookup.invalidate('does-not-exist')
+    assert lookup.get('does-not-exist').reference_id == late.reference_id
+
+
+def test_export_status_is_refreshed():
+    lookup = verification_lookup.VerificationLookup(export_ttl=0)
+    log = db.log_price_check_comprehensive(**make_price_check_fields())
+
+    assert lookup.get(log.reference_id).exported_by is None
+    db.mark_as_exported(log.reference_id, 'exporter@example.com')
+    assert lookup.get(log.reference_id).exported_by == 'exporter@example.com'
@@ -0,0 +1,34 @@
+import verification_token
+import database as db
+from conftest import make_price_check_fields
+
+
+def test_token_round_trip_and_tamper_detection(monkeypatch):
+    monkeypatch.setattr(db.Config, 'SECRET_KEY', 'test-secret')
+    monkeypatch.setattr(db.Config, 'VERIFY_SIGNED_TOKENS', True)
+    log = db.log_price_check_comprehensive(**make_price_check_fields(
+        customer_type='business', proposed_price=1234.56, is_valid_new=False))
+
+    url = verification_token.verification_url(log)
+    token = url.split('?t=', 1)[1]
+    assert len(url) < 120
+
+    claims = verification_token.decode_token(token)
+    assert claims.reference_id == log.reference_id
+    assert claims.checked_at == log.checked_at.replace(microsecond=0)
+    assert claims.customer_type == 'business'
+    assert claims.proposed_price == 1234.56
+    assert claims.floor_weighted == log.floor_weighted
+    assert claims.is_valid_weighted and not claims.is_valid_new
+
+    tampered = token[:-2] + ('AA' if token[-2:] != 'AA' else 'BB')
+    assert verification_token.decode_token(tampered) is None
+
+    monkeypatch.setattr(db.Config, 'SECRET_KEY', 'other-secret')
+    assert verification_token.decode_token(token) is None
+
+
+def test_plain_url_without_signed_tokens(monkeypatch):
+    monkeypatch.setattr(db.Config, 'VERIFY_SIGNED_TOKENS', False)
+    log = db.log_price_check_comprehensive(**make_price_check_fields())
+    assert verification_token.verification_url(log).endswith(f"?reference_id={log.reference_id}")
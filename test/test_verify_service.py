@@ -0,0 +1,105 @@
+import gzip
+import json
+from wsgiref.util import setup_testing_defaults
+import database as db
+import document_export as doc_export
+import verification_lookup
+import verify_service
+from conftest import make_price_check_fields
+
+
+def _get(path, query='', method='GET', **headers):
+    environ = {'PATH_INFO': path, 'QUERY_STRING': query, 'REQUEST_METHOD': method}
+    environ.update({f'HTTP_{name.upper()}': value for name, value in headers.items()})
+    setup_testing_defaults(environ)
+    response = {}
+
+    def start_response(status, response_headers):
+        response['status'] = status
+        response['headers'] = dict(response_headers)
+
+    response['body'] = b''.join(verify_service.application(environ, start_response))
+    return response
+
+
+def test_verify_html_json_and_conditional_get(monkeypatch):
+    monkeypatch.setattr(verification_lookup, '_lookup', verification_lookup.VerificationLookup())
+    log = db.log_price_check_comprehensive(**make_price_check_fields(ip_address='10.0.0.9'))
+
+    html = _get(f'/verify/{log.reference_id}')
+    assert html['status'].startswith('200')
+    assert html['headers']['Content-Type'].startswith('text/html')
+    assert log.reference_id in html['body'].decode('utf-8')
+    assert 'max-age' in html['headers']['Cache-Control']
+
+    api = _get(f'/api/verify/{log.reference_id}')
+    payload = json.loads(api['body'])
+    assert payload['found'] and payload['proposed_price'] == log.proposed_price
+    assert 'ip_address' not in payload
+
+    etag = html['headers']['ETag']
+    assert _get(f'/verify/{log.reference_id}', if_none_match=etag)['status'].startswith('304')
+
+    # เอกสารไม่เปลี่ยนหลัง export แต่ JSON (มีสถานะ export) ได้ ETag ใหม่
+    api_etag = api['headers']['ETag']
+    db.mark_as_exported(log.reference_id, 'exporter@example.com')
+    verification_lookup._lookup.invalidate(log.reference_id)
+    assert _get(f'/verify/{log.reference_id}', if_none_match=etag)['status'].startswith('304')
+    assert _get(f'/api/verify/{log.reference_id}', if_none_match=api_etag)['status'].startswith('200')
+
+    pdf = _get(f'/verify/{log.reference_id}.pdf', accept_encoding='gzip')
+    assert pdf['headers']['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(pdf['body']).startswith(b'%PDF')
+
+    assert _get('/verify/missing-reference')['status'].startswith('404')
+    redirect = _get('/verify', f'reference_id={log.reference_id}')
+    assert redirect['headers']['Location'] == f'/verify/{log.reference_id}'
+
+
+def test_verify_html_escapes_user_fields(monkeypatch):
+    monkeypatch.setattr(verification_lookup, '_lookup', verification_lookup.VerificationLookup())
+    log = db.log_price_check_comprehensive(**make_price_check_fields(
+        notes='<script>alert(1)</script>', equipment='<img src=x onerror=alert(1)>'
+    ))
+
+    body = _get(f'/verify/{log.reference_id}')['body'].decode('utf-8')
+    assert '<script>alert(1)</script>' not in body
+    assert '&lt;script&gt;alert(1)&lt;/script&gt;' in body
+    assert '<img src=x' not in body
+
+
+def test_long_uuid_prefix_redirects_but_complete_missing_id_does_not(monkeypatch):
+    monkeypatch.setattr(verification_lookup, '_lookup', verification_lookup.VerificationLookup())
+    log = db.log_price_check_comprehensive(**make_price_check_fields(
+        reference_id='5f0c1a2b-3c4d-4e5f-8a6b-7c8d9e0f1a2b'))
+
+    # prefix ยาวกว่า compact ID (26 ตัวอักษร) ยังค้นแบบ prefix ได้
+    redirect = _get(f'/api/verify/{log.reference_id[:30]}')
+    assert redirect['status'].startswith('302')
+    assert redirect['headers']['Location'] == f'/api/verify/{log.reference_id}'
+
+    missing = _get('/api/verify/5f0c1a2b-3c4d-4e5f-8a6b-7c8d9e0f1a2c')
+    assert missing['status'].startswith('404')
+
+
+def test_rendered_lru_follows_template_version(monkeypatch):
+    monkeypatch.setattr(verification_lookup, '_lookup', verification_lookup.VerificationLookup())
+    log = db.log_price_check_comprehensive(**make_price_check_fields())
+    assert log.reference_id in _get(f'/verify/{log.reference_id}.txt')['body'].decode('utf-8')
+
+    # เปลี่ยนเวอร์ชัน template แล้ว LRU ของ process ต้องไม่ส่งเอกสารเดิม
+    monkeypatch.setattr(doc_export, 'DOCUMENT_TEMPLATE_VERSION', doc_export.DOCUMENT_TEMPLATE_VERSION + 1)
+    monkeypatch.setitem(doc_export.DOCUMENT_RENDERERS, 'txt', lambda record: 'template ใหม่')
+    assert _get(f'/verify/{log.reference_id}.txt')['body'].decode('utf-8') == 'template ใหม่'
+
+
+def test_head_returns_headers_without_body(monkeypatch):
+    monkeypatch.setattr(verification_lookup, '_lookup', verification_lookup.VerificationLookup())
+    log = db.log_price_check_comprehensive(**make_price_check_fields())
+
+    get = _get(f'/verify/{log.reference_id}')
+    head = _get(f'/verify/{log.reference_id}', method='HEAD')
+    assert head['status'].startswith('200')
+    assert head['body'] == b''
+    assert head['headers']['Content-Length'] == get['headers']['Content-Length'] != '0'
+    assert head['headers']['ETag'] == get['headers']['ETag']
@@ -0,0 +1,154 @@
+"""
+Lookup สำหรับหน้า verification (verify_app.py)
+
+ข้อมูลการตรวจสอบไม่เปลี่ยนหลังบันทึก ยกเว้นสถานะ export จึง cache ผลที่พบไว้ใน LRU
+(สถานะ export อ่านใหม่เมื่อเกิน VERIFY_EXPORT_TTL_SECONDS) และ cache reference ID ที่ไม่พบ
+แบบมีอายุ (VERIFY_NEGATIVE_TTL_SECONDS) เพื่อไม่ให้การสุ่ม/สแกน ID ยิง database ทุกครั้ง
+
+SQLite อ่านผ่าน connection แบบ read-only ที่เปิด mmap (VERIFY_MMAP_SIZE)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+from sqlalchemy import create_engine, event
+from config import Config
+import database as db
+import reference_format
+
+
+def create_lookup_engine():
+    """
+    Engine read-only + mmap บนไฟล์ SQLite หลัก (None = ไม่ใช่ SQLite ไฟล์ ให้ใช้ read engine ปกติ)
+
+    อ่านจากไฟล์หลักโดยตรงแทน snapshot เพื่อให้เอกสารที่เพิ่งออกตรวจสอบได้ทันที
+    """
+    database_path = db.engine.url.database
+    if db.engine.dialect.name != 'sqlite' or not database_path or database_path == ':memory:':
+        return None
+
+    lookup_engine = create_engine(f"sqlite:///file:{os.path.abspath(database_path)}?mode=ro&uri=true")
+
+    @event.listens_for(lookup_engine, "connect")
+    def _enable_mmap(dbapi_connection, connection_record):
+        dbapi_connection.execute(f"PRAGMA mmap_size = {int(Config.VERIFY_MMAP_SIZE)}")
+
+    return lookup_engine
+
+
+class VerificationLookup:
+    """LRU ของผลที่พบ + negative cache แบบมีอายุ (thread-safe)"""
+
+    def __init__(self, max_entries=10000, negative_ttl=60, export_ttl=30, bind=None,
+                 reference_filter=None):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.export_ttl = export_ttl
+        self.bind = bind
+        # reference_bloom.ReferenceBloomFilter: ID ที่ไม่อยู่ใน filter ไม่ต้องถาม database
+        self.reference_filter = reference_filter
+        self._found = OrderedDict()  # reference_id -> [record, เวลาที่อ่านสถานะ export]
+        self._missing = OrderedDict()  # reference_id -> เวลาหมดอายุ
+        self._lock = threading.Lock()
+
+    def get(self, reference_id):
+        """
+        ข้อมูลการตรวจสอบของ reference ID (SimpleNamespace ของ db.VERIFICATION_COLUMNS) หรือ None
+        """
+        reference_id = reference_format.normalize(reference_id)
+        if not reference_id:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._found.get(reference_id)
+            if entry is not None:
+                self._found.move_to_end(reference_id)
+            else:
+                expires_at = self._missing.get(reference_id)
+                if expires_at is not None:
+                    if expires_at > now:
+                        return None
+                    del self._missing[reference_id]
+
+        if entry is not None:
+            record, export_checked_at = entry
+            if now - export_checked_at >= self.export_ttl:
+                self._refresh_export_status(reference_id, entry, now)
+            return record
+
+        # ID ที่ Bloom filter ปฏิเสธ (หลังตามเก็บแถวใหม่แล้ว) เข้า negative cache เหมือนที่ database ไม่พบ
+        # การสุ่ม ID เดิมซ้ำจึงไม่ทำให้ตามเก็บทุกครั้ง
+        if self.reference_filter is not None and not self.reference_filter.might_exist(
+                reference_id, bind=self.bind):
+            row = None
+        else:
+            row = db.get_verification_record(reference_id, bind=self.bind)
+        with self._lock:
+            if row is None:
+                self._missing[reference_id] = now + self.negative_ttl
+                self._missing.move_to_end(reference_id)
+                while len(self._missing) > self.max_entries:
+                    self._missing.popitem(last=False)
+                return None
+
+            record = SimpleNamespace(**row._mapping)
+            self._found[reference_id] = [record, now]
+            while len(self._found) > self.max_entries:
+                self._found.popitem(last=False)
+            return record
+
+    def _refresh_export_status(self, reference_id, entry, now):
+        row = db.get_verification_record(reference_id, bind=self.bind, columns=db.EXPORT_STATUS_COLUMNS)
+        with self._lock:
+            if row is not None:
+                record = entry[0]
+                for name in db.EXPORT_STATUS_COLUMNS:
+                    setattr(record, name, getattr(row, name))
+            entry[1] = now
+
+    def invalidate(self, reference_id):
+        """ลบ reference ID ออกจาก cache ทั้งสองแบบ"""
+        with self._lock:
+            self._found.pop(reference_id, None)
+            self._missing.pop(reference_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._found.clear()
+            self._missing.clear()
+
+
+_lookup = None
+_lookup_lock = threading.Lock()
+
+
+def get_lookup():
+    """VerificationLookup ตัวเดียวของ process (สร้างครั้งแรกที่เรียก)"""
+    global _lookup
+    with _lookup_lock:
+        if _lookup is None:
+            bind = create_lookup_engine()
+            reference_filter = None
+            if Config.REFERENCE_BLOOM_ENABLED:
+                import reference_bloom
+                reference_filter = reference_bloom.get_filter(bind=bind)
+            _lookup = VerificationLookup(
+                max_entries=Config.VERIFY_CACHE_SIZE,
+                negative_ttl=Config.VERIFY_NEGATIVE_TTL_SECONDS,
+                export_ttl=Config.VERIFY_EXPORT_TTL_SECONDS,
+                bind=bind,
+                reference_filter=reference_filter
+            )
+        return _lookup
+
+
+def get_price_check(reference_id):
+    """ข้อมูลสำหรับหน้า verification ผ่าน cache ของ process"""
+    return get_lookup().get(reference_id)
+
+
+def find_reference_ids_by_prefix(prefix, limit=2):
+    """reference ID ที่ขึ้นต้นด้วย prefix (ได้มากกว่าหนึ่งรายการ = กำกวม) ไม่ผ่าน cache และ Bloom filter"""
+    return db.find_reference_ids_by_prefix(prefix, limit=limit, bind=get_lookup().bind)
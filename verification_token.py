@@ -0,0 +1,146 @@
+"""
+Token ยืนยันเอกสารแบบลงลายเซ็น (HMAC-SHA256 ด้วย SECRET_KEY) สำหรับ QR code / ลิงก์ตรวจสอบ
+
+Token บรรจุผลการตรวจสอบหลัก (ราคาเสนอ, floor ทั้งสามแบบ, ผลผ่าน/ไม่ผ่าน, เวลา) ในรูปแบบ binary
+ขนาดคงที่ หน้า verification จึงแสดงผลจากลายเซ็นได้โดยไม่ต้องอ่าน database ส่วนสถานะ export
+หรือการตรวจว่าเอกสารยังอยู่ในระบบยังต้องอ่านจาก database ตามปกติ
+
+เปิดใช้ด้วย VERIFY_SIGNED_TOKENS=true (ต้องตั้ง SECRET_KEY)
+"""
+import base64
+import calendar
+import hashlib
+import hmac
+import struct
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from urllib.parse import quote
+from config import Config
+import reference_format
+
+TOKEN_VERSION = 1
+# version, reference_id (UUID 16 bytes), checked_at (unix seconds), flags, speed, contract_months,
+# proposed_price, floor_existing, floor_new, floor_weighted (สตางค์)
+_PAYLOAD = struct.Struct('<B16sIBHBIIII')
+_SIGNATURE_SIZE = 16
+
+_FLAG_BUSINESS = 1
+_FLAG_VALID_EXISTING = 2
+_FLAG_VALID_NEW = 4
+_FLAG_VALID_WEIGHTED = 8
+
+_EPOCH = datetime(1970, 1, 1)  # checked_at เก็บเป็น UTC แบบ naive
+
+
+def _signing_key():
+    if not Config.SECRET_KEY:
+        return None
+    # แยก key ตามวัตถุประสงค์ ไม่ใช้ SECRET_KEY ตรงๆ
+    return hashlib.sha256(b'floor-price-verification-token:' + Config.SECRET_KEY.encode('utf-8')).digest()
+
+
+def _sign(key, payload):
+    return hmac.new(key, payload, hashlib.sha256).digest()[:_SIGNATURE_SIZE]
+
+
+def _satang(amount):
+    return int(round((amount or 0) * 100))
+
+
+def create_token(log):
+    """
+    สร้าง token จาก price check (ต้องมี reference_id แบบ UUID หรือ compact)
+
+    Raises:
+        ValueError: ไม่ได้ตั้ง SECRET_KEY, reference_id ไม่ใช่ UUID/compact หรือค่าเกินช่วงของ token
+    """
+    key = _signing_key()
+    if key is None:
+        raise ValueError("SECRET_KEY is required for signed verification tokens")
+
+    flags = 0
+    if log.customer_type == 'business':
+        flags |= _FLAG_BUSINESS
+    if log.is_valid_existing:
+        flags |= _FLAG_VALID_EXISTING
+    if log.is_valid_new:
+        flags |= _FLAG_VALID_NEW
+    if log.is_valid_weighted:
+        flags |= _FLAG_VALID_WEIGHTED
+
+    reference_uuid = reference_format.to_uuid(log.reference_id)
+    if reference_uuid is None:
+        raise ValueError("Verification tokens require a UUID or compact reference ID")
+
+    try:
+        payload = _PAYLOAD.pack(
+            TOKEN_VERSION,
+            reference_uuid.bytes,
+            calendar.timegm(log.checked_at.utctimetuple()),
+            flags,
+            log.speed,
+            log.contract_months,
+            _satang(log.proposed_price),
+            _satang(log.floor_existing),
+            _satang(log.floor_new),
+            _satang(log.floor_weighted),
+        )
+    except struct.error as e:
+        raise ValueError(f"Price check cannot be encoded in a verification token: {e}")
+    return base64.urlsafe_b64encode(payload + _sign(key, payload)).rstrip(b'=').decode('ascii')
+
+
+def decode_token(token):
+    """
+    ตรวจลายเซ็นและถอด token
+
+    Returns:
+        SimpleNamespace ของข้อมูลใน token หรือ None ถ้า token ไม่ถูกต้อง/ลายเซ็นไม่ตรง
+    """
+    key = _signing_key()
+    if key is None or not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+    except (ValueError, TypeError):
+        return None
+    if len(raw) != _PAYLOAD.size + _SIGNATURE_SIZE:
+        return None
+
+    payload, signature = raw[:_PAYLOAD.size], raw[_PAYLOAD.size:]
+    if not hmac.compare_digest(signature, _sign(key, payload)):
+        return None
+
+    (version, reference_bytes, checked_at, flags, speed, contract_months,
+     proposed_price, floor_existing, floor_new, floor_weighted) = _PAYLOAD.unpack(payload)
+    if version != TOKEN_VERSION:
+        return None
+
+    return SimpleNamespace(
+        reference_id=reference_format.from_uuid(uuid.UUID(bytes=reference_bytes)),
+        checked_at=_EPOCH + timedelta(seconds=checked_at),
+        customer_type='business' if flags & _FLAG_BUSINESS else 'residential',
+        speed=speed,
+        contract_months=contract_months,
+        proposed_price=proposed_price / 100,
+        floor_existing=floor_existing / 100,
+        floor_new=floor_new / 100,
+        floor_weighted=floor_weighted / 100,
+        is_valid_existing=bool(flags & _FLAG_VALID_EXISTING),
+        is_valid_new=bool(flags & _FLAG_VALID_NEW),
+        is_valid_weighted=bool(flags & _FLAG_VALID_WEIGHTED),
+    )
+
+
+def verification_url(log):
+    """
+    ลิงก์ตรวจสอบเอกสาร: แบบมี token เมื่อเปิด VERIFY_SIGNED_TOKENS ไม่เช่นนั้นใช้ reference_id
+    """
+    base_url = Config.VERIFY_BASE_URL.rstrip('/')
+    if Config.VERIFY_SIGNED_TOKENS:
+        try:
+            return f"{base_url}/?t={create_token(log)}"
+        except ValueError:
+            pass
+    return f"{base_url}/?reference_id={quote(str(log.reference_id))}"
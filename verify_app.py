@@ -1,7 +1,9 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import database as db
+import bulk_verification
 import document_export as doc_export
+import verification_lookup
+import verification_token
 
 
 st.set_page_config(page_title="Floor Price Verification", page_icon="🔍", layout="wide")
@@ -49,10 +51,32 @@ def _extract_reference_id():
     return ref.strip()
 
 
+def _extract_token():
+    params = st.experimental_get_query_params()
+    token_list = params.get("t")
+    token = token_list[0] if token_list else ""
+    return token.strip()
+
+
 def _load_price_check(reference_id: str):
     if not reference_id:
         return None
-    return db.get_price_check_by_reference(reference_id)
+    return verification_lookup.get_price_check(reference_id)
+
+
+def _resolve_reference_id(value: str):
+    """
+    Reference ID เต็มจากค่าที่กรอก (ID เต็ม หรือ prefix อย่างน้อย 8 ตัวอักษร)
+
+    Returns:
+        (reference_id หรือ None, True ถ้า prefix ตรงกับหลายเอกสาร)
+    """
+    if _load_price_check(value):
+        return value, False
+    matches = verification_lookup.find_reference_ids_by_prefix(value)
+    if len(matches) == 1:
+        return matches[0], False
+    return None, len(matches) > 1
 
 
 def _render_verification_result(log):
@@ -121,9 +145,9 @@ def _render_verification_result(log):
     )
 
     st.write("---")
-    col_download1, col_download2 = st.columns(2)
+    col_download1, col_download_pdf, col_download2 = st.columns(3)
     with col_download1:
-        html_content = doc_export.generate_verification_document_html(log)
+        html_content = doc_export.render_document(log, 'html')
         st.download_button(
             label="📄 ดาวน์โหลดเอกสาร HTML",
             data=html_content,
@@ -132,6 +156,15 @@ def _render_verification_result(log):
             use_container_width=True
         )
 
+    with col_download_pdf:
+        st.download_button(
+            label="📑 ดาวน์โหลดเอกสาร PDF",
+            data=lambda: doc_export.render_document(log, 'pdf'),
+            file_name=f"floor_price_{log.reference_id[:8]}.pdf",
+            mime="application/pdf",
+            use_container_width=True
+        )
+
     with col_download2:
         text_summary = doc_export.generate_simple_summary_text(log)
         st.download_button(
@@ -152,6 +185,54 @@ def _render_verification_result(log):
         st.rerun()
 
 
+def _render_token_result(claims):
+    """แสดงผลจาก token ที่ลงลายเซ็น (ไม่อ่าน database)"""
+    st.subheader("ผลการตรวจสอบเอกสาร")
+    if claims.is_valid_weighted:
+        st.success("✅ เอกสารนี้ได้รับการอนุมัติ")
+    else:
+        st.error("❌ เอกสารนี้ไม่ผ่านการตรวจสอบ")
+    st.caption("🔏 ข้อมูลนี้ยืนยันจากลายเซ็นดิจิทัลใน QR code/ลิงก์")
+
+    col_meta1, col_meta2 = st.columns(2)
+    with col_meta1:
+        st.write(f"**Reference ID:** `{claims.reference_id}`")
+        st.write(f"**วันที่ตรวจสอบ:** {claims.checked_at.strftime('%d/%m/%Y %H:%M')} น.")
+    with col_meta2:
+        st.write("**รายละเอียดแพ็กเกจ:**")
+        st.write(f"• ประเภทลูกค้า: {'🏠 Residential' if claims.customer_type == 'residential' else '🏢 Business'}")
+        st.write(f"• ความเร็ว: {claims.speed} Mbps")
+        st.write(f"• สัญญา: {claims.contract_months} เดือน")
+        st.write(f"• ราคาเสนอ: {claims.proposed_price:,.2f} ฿")
+
+    st.write("---")
+
+    col_floor1, col_floor2, col_floor3 = st.columns(3)
+    col_floor1.metric("Floor - ลูกค้าเดิม", f"{claims.floor_existing:,.2f} ฿", "ผ่าน" if claims.is_valid_existing else "ไม่ผ่าน")
+    col_floor2.metric("Floor - ลูกค้าใหม่", f"{claims.floor_new:,.2f} ฿", "ผ่าน" if claims.is_valid_new else "ไม่ผ่าน")
+    col_floor3.metric(
+        "Floor - ถัวเฉลี่ย",
+        f"{claims.floor_weighted:,.2f} ฿",
+        "ผ่าน" if claims.is_valid_weighted else "ไม่ผ่าน"
+    )
+
+    st.write("---")
+    # รายละเอียดเต็ม สถานะ export และการตรวจว่าเอกสารยังอยู่ในระบบ ต้องอ่านจาก database
+    if st.button("🔎 ดูรายละเอียดเต็มและสถานะล่าสุดจากระบบ", key="btn_token_details"):
+        log = _load_price_check(claims.reference_id)
+        if log:
+            st.experimental_set_query_params(reference_id=claims.reference_id)
+            st.rerun()
+        else:
+            st.error("❌ ไม่พบเอกสารนี้ในระบบ (อาจถูกยกเลิก)")
+
+
+def _render_bulk_verification():
+    """ตรวจสอบหลายเอกสารจากรายการ reference ID ที่วางหรืออัปโหลด"""
+    with st.expander("📋 ตรวจสอบหลายเอกสารพร้อมกัน"):
+        bulk_verification.render_bulk_verification(bind=verification_lookup.get_lookup().bind)
+
+
 def main():
     st.title("🔍 Floor Price Verification Portal")
     st.caption("สำหรับผู้ตรวจสอบเอกสารยืนยันการตรวจสอบราคา")
@@ -160,8 +241,21 @@ def main():
         st.markdown(f"[⬅️ กลับสู่ระบบตรวจสอบราคา]({MAIN_APP_URL})")
 
     _ensure_query_redirect()
+
+    token = _extract_token()
+    if token:
+        claims = verification_token.decode_token(token)
+        if claims:
+            _render_token_result(claims)
+            return
+        st.error("❌ ลายเซ็นของลิงก์/QR code ไม่ถูกต้อง")
+
     reference_id = _extract_reference_id()
     log = _load_price_check(reference_id)
+    if log is None and reference_id:
+        full_reference_id, _ = _resolve_reference_id(reference_id)
+        if full_reference_id:
+            log = _load_price_check(full_reference_id)
 
     if log:
         _render_verification_result(log)
@@ -172,6 +266,7 @@ def main():
         "Reference ID",
         value=reference_id,
         placeholder="xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx",
+        help="กรอก Reference ID เต็ม หรืออย่างน้อย 8 ตัวอักษรแรก",
         key="reference_input"
     )
     submit = st.button("ตรวจสอบ", type="primary")
@@ -180,14 +275,17 @@ def main():
         ref_to_check = manual_ref.strip()
         if not ref_to_check:
             st.error("❌ กรุณากรอก Reference ID")
-            return
-
-        result = _load_price_check(ref_to_check)
-        if result:
-            st.experimental_set_query_params(reference_id=result.reference_id)
-            st.rerun()
         else:
-            st.error("❌ ไม่พบข้อมูลสำหรับ Reference ID นี้")
+            full_reference_id, ambiguous = _resolve_reference_id(ref_to_check)
+            if full_reference_id:
+                st.experimental_set_query_params(reference_id=full_reference_id)
+                st.rerun()
+            elif ambiguous:
+                st.warning("⚠️ Reference ID ที่กรอกตรงกับหลายเอกสาร กรุณากรอกให้ยาวขึ้น")
+            else:
+                st.error("❌ ไม่พบข้อมูลสำหรับ Reference ID นี้")
+
+    _render_bulk_verification()
 
 
 if __name__ == "__main__":
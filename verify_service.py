@@ -0,0 +1,246 @@
+"""
+บริการตรวจสอบเอกสารแบบ WSGI (ไม่ต้องเปิด Streamlit session ต่อผู้เข้าชม)
+
+    GET /verify/<reference_id>        เอกสาร HTML (generate_verification_document_html)
+    GET /verify/<reference_id>.pdf    เอกสาร PDF (หรือ .txt)
+    GET /api/verify/<reference_id>    JSON ของข้อมูลที่หน้า verification แสดง
+    GET /api/verify?t=<token>         JSON จาก token ที่ลงลายเซ็น (ไม่อ่าน database)
+    GET /verify?t=<token>             เอกสาร HTML ของ reference ID ใน token
+    GET /verify?reference_id=<id>     redirect ไป /verify/<id> (ลิงก์รูปแบบเดิมใน QR/เอกสาร)
+
+reference_id ที่ไม่พบแต่เป็น prefix (อย่างน้อย 8 ตัวอักษร) ของเอกสารเดียว redirect ไป ID เต็ม
+
+อ่านผ่าน verification_lookup (LRU + negative cache + Bloom filter) และตอบพร้อม ETag /
+Cache-Control ให้ browser และ reverse proxy cache ต่อได้ เอกสารอ่านจาก cache ที่ render แล้ว
+(document_export.get_cached_document) แบบ gzip ส่งให้ client ได้โดยไม่ต้องคลาย
+
+รันทดสอบ:  python verify_service.py --port 8502
+Production: gunicorn -w 4 verify_service:application
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, quote
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler, make_server
+import document_export as doc_export
+import reference_format
+import verification_lookup
+import verification_token
+
+FOUND_MAX_AGE = 60
+MISSING_MAX_AGE = 30
+_RENDER_CACHE_SIZE = 1000
+
+_STATUS_TEXT = {
+    200: '200 OK',
+    301: '301 Moved Permanently',
+    302: '302 Found',
+    304: '304 Not Modified',
+    400: '400 Bad Request',
+    404: '404 Not Found',
+    405: '405 Method Not Allowed',
+}
+
+_DOCUMENT_TYPES = {
+    'html': 'text/html; charset=utf-8',
+    'pdf': 'application/pdf',
+    'txt': 'text/plain; charset=utf-8',
+}
+
+# เอกสารที่ render แล้ว: key เดียวกับตาราง rendered_documents (reference_id, รูปแบบ, เวอร์ชัน template,
+# ลิงก์ตรวจสอบ/QR) -> (เนื้อหาแบบ gzip, etag)
+_rendered = OrderedDict()
+_rendered_lock = threading.Lock()
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _etag(*parts):
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def _record_etag(record):
+    return _etag(record.reference_id, record.exported_at, record.exported_by)
+
+
+def _respond(start_response, status, body=b'', content_type='text/plain; charset=utf-8',
+             max_age=None, etag=None, extra_headers=()):
+    headers = [('Content-Type', content_type), ('Content-Length', str(len(body)))]
+    if max_age is not None:
+        headers.append(('Cache-Control', f'public, max-age={max_age}'))
+    if etag:
+        headers.append(('ETag', etag))
+    headers.extend(extra_headers)
+    start_response(_STATUS_TEXT[status], headers)
+    return [body]
+
+
+def _not_modified(environ, etag):
+    return etag in [tag.strip() for tag in environ.get('HTTP_IF_NONE_MATCH', '').split(',')]
+
+
+def _cached_document(record, fmt):
+    """(เนื้อหาแบบ gzip, etag) จาก LRU ของ process หรือตาราง rendered_documents"""
+    key = doc_export._document_cache_key(record, fmt)
+    with _rendered_lock:
+        cached = _rendered.get(key)
+        if cached is not None:
+            _rendered.move_to_end(key)
+            return cached
+
+    cached = doc_export.get_cached_document(record, fmt, bind=verification_lookup.get_lookup().bind)
+    with _rendered_lock:
+        _rendered[key] = cached
+        while len(_rendered) > _RENDER_CACHE_SIZE:
+            _rendered.popitem(last=False)
+    return cached
+
+
+def _serve_document(environ, start_response, record, fmt):
+    """เอกสารที่ render แล้ว: ETag ตามเนื้อหา และส่ง gzip ที่เก็บไว้ตรงๆ ถ้า client รับได้"""
+    compressed, etag = _cached_document(record, fmt)
+    if _not_modified(environ, etag):
+        return _respond(start_response, 304, max_age=FOUND_MAX_AGE, etag=etag)
+
+    headers = [('Vary', 'Accept-Encoding')]
+    if 'gzip' in environ.get('HTTP_ACCEPT_ENCODING', ''):
+        body = compressed
+        headers.append(('Content-Encoding', 'gzip'))
+    else:
+        body = gzip.decompress(compressed)
+    if fmt != 'html':
+        headers.append(('Content-Disposition', f'attachment; filename="floor_price_{record.reference_id}.{fmt}"'))
+    return _respond(start_response, 200, body, _DOCUMENT_TYPES[fmt], max_age=FOUND_MAX_AGE, etag=etag,
+                    extra_headers=headers)
+
+
+def _serve_record(environ, start_response, reference_id, as_json, fmt='html'):
+    record = verification_lookup.get_price_check(reference_id)
+    if record is None:
+        # ID เต็ม (UUID หรือ compact) ที่ไม่พบไม่ต้องค้นแบบ prefix (ให้ Bloom filter ปฏิเสธได้โดยไม่ถาม database)
+        is_prefix = reference_format.to_uuid(reference_id) is None
+        matches = verification_lookup.find_reference_ids_by_prefix(reference_id) if is_prefix else []
+        if len(matches) == 1:
+            location = ('/api/verify/' if as_json else '/verify/') + quote(matches[0])
+            if fmt != 'html':
+                location += f'.{fmt}'
+            return _respond(start_response, 302, extra_headers=[('Location', location)])
+        if as_json:
+            body = json.dumps({'found': False, 'reference_id': reference_id}).encode('utf-8')
+            return _respond(start_response, 404, body, 'application/json', max_age=MISSING_MAX_AGE)
+        return _respond(start_response, 404, 'ไม่พบข้อมูลสำหรับ Reference ID นี้'.encode('utf-8'),
+                        max_age=MISSING_MAX_AGE)
+
+    if not as_json:
+        return _serve_document(environ, start_response, record, fmt)
+
+    etag = _record_etag(record)
+    if _not_modified(environ, etag):
+        return _respond(start_response, 304, max_age=FOUND_MAX_AGE, etag=etag)
+
+    payload = {name: _json_value(value) for name, value in vars(record).items()}
+    payload['found'] = True
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    return _respond(start_response, 200, body, 'application/json', max_age=FOUND_MAX_AGE, etag=etag)
+
+
+def _serve_token(environ, start_response, token):
+    claims = verification_token.decode_token(token)
+    if claims is None:
+        body = json.dumps({'valid': False}).encode('utf-8')
+        return _respond(start_response, 400, body, 'application/json')
+
+    etag = _etag(token)
+    if _not_modified(environ, etag):
+        return _respond(start_response, 304, etag=etag, max_age=FOUND_MAX_AGE)
+    payload = {name: _json_value(value) for name, value in vars(claims).items()}
+    payload['valid'] = True
+    payload['source'] = 'token'
+    body = json.dumps(payload).encode('utf-8')
+    # ข้อมูลใน token ไม่เปลี่ยน จึง cache ได้นาน
+    return _respond(start_response, 200, body, 'application/json', max_age=86400, etag=etag)
+
+
+def application(environ, start_response):
+    """WSGI entry point (HEAD ได้ header เดียวกับ GET แต่ไม่มี body)"""
+    method = environ.get('REQUEST_METHOD', 'GET')
+    if method not in ('GET', 'HEAD'):
+        return _respond(start_response, 405, extra_headers=[('Allow', 'GET, HEAD')])
+
+    body = _route(environ, start_response)
+    if method == 'HEAD':
+        return [b'']
+    return body
+
+
+def _route(environ, start_response):
+    path = environ.get('PATH_INFO', '').rstrip('/')
+    query = parse_qs(environ.get('QUERY_STRING', ''))
+
+    if path.startswith('/api/verify/'):
+        return _serve_record(environ, start_response, path[len('/api/verify/'):], as_json=True)
+    if path == '/api/verify':
+        if query.get('t'):
+            return _serve_token(environ, start_response, query['t'][0])
+        if query.get('reference_id'):
+            return _serve_record(environ, start_response, query['reference_id'][0], as_json=True)
+        return _respond(start_response, 400, b'reference_id or t is required')
+    if path.startswith('/verify/'):
+        reference_id, _, fmt = path[len('/verify/'):].partition('.')
+        if fmt and fmt not in _DOCUMENT_TYPES:
+            return _respond(start_response, 404, b'Not Found')
+        return _serve_record(environ, start_response, reference_id, as_json=False, fmt=fmt or 'html')
+    if path in ('', '/verify') and query.get('t'):
+        claims = verification_token.decode_token(query['t'][0])
+        if claims is None:
+            return _respond(start_response, 400, 'Token ไม่ถูกต้อง'.encode('utf-8'))
+        return _serve_record(environ, start_response, claims.reference_id, as_json=False)
+    if path in ('', '/verify') and query.get('reference_id'):
+        location = f"/verify/{quote(query['reference_id'][0].strip())}"
+        return _respond(start_response, 301, extra_headers=[('Location', location)])
+
+    return _respond(start_response, 404, b'Not Found')
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def make_threaded_server(host, port, quiet=False):
+    """WSGI server ของ standard library แบบหนึ่ง thread ต่อ connection (สำหรับทดสอบ/benchmark)"""
+    handler = _QuietHandler if quiet else WSGIRequestHandler
+    return make_server(host, port, application, server_class=_ThreadingWSGIServer, handler_class=handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Floor price verification service (WSGI)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args()
+
+    verification_lookup.get_lookup()  # โหลด Bloom filter / engine ก่อนรับ request แรก
+    server = make_threaded_server(args.host, args.port)
+    print(f"✅ Verification service: http://{args.host}:{args.port}/verify/<reference_id>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()